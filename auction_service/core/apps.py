@@ -9,8 +9,11 @@ class CoreConfig(AppConfig):
     def ready(self):
         # Import inside ready() to avoid circular imports
         try:
-            from core.models import Bid
-            from core.services.recommender_client import recommender_client
+            from django.db import transaction
+            from core.models import Bid, Item
+            from core.services.event_pipeline import interaction_events
+            from core.services.live_updates import live_updates
+            from core.services.status_scheduler import status_scheduler
         except ImportError:
             return
 
@@ -20,22 +23,54 @@ class CoreConfig(AppConfig):
         # The RecommenderClient now handles syncing automatically.
         # ---------------------------------------------------------------
 
-        # Signal: Automatically push new bids to Recommender in real-time
+        # Signal: Queue new bids for the Recommender (see event_pipeline.py).
+        # Only newly created rows matter, so status updates (bid.save()
+        # after accept/reject) are ignored. Only the foreign key ids are
+        # read, so no related rows are fetched, and the event is queued
+        # once the transaction commits so the flusher can see the row.
         @receiver(post_save, sender=Bid)
-        def push_new_bid(sender, instance, **kwargs):
-            try:
-                # Only push if we have a valid amount
-                if not instance.amount:
-                    return
-
-                interaction = {
-                    "user_id": instance.buyer.id,
-                    "item_id": instance.item.id,
-                    "rating": float(instance.amount)
-                }
-                # Send as a list, as expected by the server
-                recommender_client.load_interactions([interaction])
-                print(f"[DEBUG] Pushed new bid to Recommender: {interaction}")
-            except Exception as e:
-                # Fail silently to keep Auction Service robust
-                print(f"[ERROR] Failed to push new bid to Recommender: {e}")
\ No newline at end of file
+        def push_new_bid(sender, instance, created, **kwargs):
+            if not created:
+                return
+            event = (
+                instance.id, instance.buyer_id, instance.item_id,
+                instance.amount, instance.timestamp.timestamp(),
+            )
+            transaction.on_commit(lambda: interaction_events.bid_created(*event))
+
+        # Signal: Announce new listings so they can be recommended before any
+        # bid, and closed ones (once, when they change to ENDED) so they stop
+        # being recommended as trending. The previous status is the one the
+        # row was loaded with (Item.from_db); the status scheduler announces
+        # the auctions it ends itself.
+        @receiver(post_save, sender=Item)
+        def push_new_item(sender, instance, created, update_fields=None, **kwargs):
+            item_id = instance.id
+            if created:
+                transaction.on_commit(lambda: interaction_events.item_created(item_id))
+            elif (
+                instance.status == Item.Status.ENDED
+                and getattr(instance, "_stored_status", None) != Item.Status.ENDED
+                and (update_fields is None or "status" in update_fields)
+            ):
+                transaction.on_commit(lambda: interaction_events.item_ended(item_id))
+
+        # Signal: Schedule the status transitions of new listings
+        @receiver(post_save, sender=Item)
+        def schedule_new_item(sender, instance, created, **kwargs):
+            if not created or not status_scheduler.running:
+                return
+            args = (instance.id, instance.start_time, instance.end_time, instance.status)
+            transaction.on_commit(lambda: status_scheduler.schedule(*args))
+
+        # Signals: Push changed auctions to live update streams (see live_updates.py).
+        # Covers bids placed and decided, and listings created or updated.
+        @receiver(post_save, sender=Item)
+        def publish_item_change(sender, instance, **kwargs):
+            item_id = instance.id
+            transaction.on_commit(lambda: live_updates.items_changed([item_id]))
+
+        @receiver(post_save, sender=Bid)
+        def publish_bid_change(sender, instance, **kwargs):
+            item_id = instance.item_id
+            transaction.on_commit(lambda: live_updates.items_changed([item_id]))
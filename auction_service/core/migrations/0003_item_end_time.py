@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:58
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_end_time(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    batch = []
+    for item in Item.objects.only('id', 'start_time', 'duration_seconds').iterator(chunk_size=1000):
+        item.end_time = item.start_time + timedelta(seconds=int(item.duration_seconds))
+        batch.append(item)
+        if len(batch) >= 1000:
+            Item.objects.bulk_update(batch, ['end_time'])
+            batch = []
+    if batch:
+        Item.objects.bulk_update(batch, ['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='item',
+            name='end_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['item', 'status'], name='bid_item_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['item', '-timestamp'], name='bid_item_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['status', 'end_time'], name='item_status_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['seller', 'status'], name='item_seller_status_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_change_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProtocolSession',
+            fields=[
+                ('session_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('state', models.CharField(max_length=20)),
+                ('updated_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_protocol_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
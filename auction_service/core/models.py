@@ -1,4 +1,6 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.utils import timezone
 
 
@@ -16,6 +18,46 @@ class Seller(models.Model):
         return f"Seller({self.username})"
 
 
+class ChangeCounter(models.Model):
+    """
+    Single row holding the last change version stamped on an Item or Bid.
+    Pollers pass the version they have seen as ?since= and only get what
+    changed after it.
+    """
+    value = models.BigIntegerField(default=0)
+
+
+def next_change_version() -> int:
+    """
+    Takes the next change version. Must run inside the transaction that
+    writes the stamped rows, after all of its other writes: the counter row
+    stays locked until it commits, so versions become visible in increasing
+    order and a client that has seen version N has seen every change up to
+    N. Taking it last keeps that lock to the stamping and the commit, and
+    after it a transaction only updates rows it has already written, so it
+    never waits on another lock while holding the counter.
+    """
+    if not ChangeCounter.objects.filter(pk=1).update(value=models.F("value") + 1):
+        ChangeCounter.objects.get_or_create(pk=1)
+        ChangeCounter.objects.filter(pk=1).update(value=models.F("value") + 1)
+    return ChangeCounter.objects.values_list("value", flat=True).get(pk=1)
+
+
+def stamp_change_version(*querysets: models.QuerySet) -> int:
+    """
+    Takes the next change version and stamps it on the rows of `querysets`,
+    which the current transaction has already written. Returns the version.
+    """
+    version = next_change_version()
+    for rows in querysets:
+        rows.update(change_version=version)
+    return version
+
+
+def current_change_version() -> int:
+    return ChangeCounter.objects.filter(pk=1).values_list("value", flat=True).first() or 0
+
+
 class Item(models.Model):
     class Status(models.TextChoices):
         COMING_SOON = "COMING_SOON", "Coming soon"
@@ -29,6 +71,8 @@ class Item(models.Model):
     # Auction timing (seller sets these)
     start_time = models.DateTimeField(default=timezone.now)
     duration_seconds = models.PositiveIntegerField(default=3600)  # 1 hour
+    # start_time + duration_seconds, stored so it can be filtered and indexed
+    end_time = models.DateTimeField(editable=False)
 
     # Auction state (for UI + rules)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.COMING_SOON)
@@ -40,9 +84,41 @@ class Item(models.Model):
     # Winner tracking (updated when bids are accepted)
     highest_bidder = models.ForeignKey(Buyer, null=True, blank=True, on_delete=models.SET_NULL)
 
+    # Change version of the last write (see next_change_version)
+    change_version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Changed auctions (?since=)
+            models.Index(fields=["change_version"], name="item_change_version_idx"),
+            # Listings by status, and the status scheduler's due items
+            models.Index(fields=["status", "end_time"], name="item_status_end_idx"),
+            # Seller dashboard
+            models.Index(fields=["seller", "status"], name="item_seller_status_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Item({self.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored status, so a save can tell if it changes it (see apps.py)
+        instance._stored_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.end_time = self.start_time + timedelta(seconds=int(self.duration_seconds))
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"start_time", "duration_seconds"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "end_time"}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Stamped after the write: the change version is the last lock taken
+            self.change_version = stamp_change_version(Item.objects.filter(pk=self.pk))
+        if update_fields is None or "status" in update_fields:
+            self._stored_status = self.status
+
 
 class Bid(models.Model):
     class Status(models.TextChoices):
@@ -54,10 +130,40 @@ class Bid(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
 
     amount = models.FloatField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, which would overwrite the time the order book accepted it
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     # For COMING_SOON: bids start pending until seller (or auto-logic) decides
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
 
+    # Change version of the last write (see next_change_version)
+    change_version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Changed bids of an item (?since=)
+            models.Index(fields=["item", "change_version"], name="bid_item_change_version_idx"),
+            # Pending bids of an item (seller dashboard, bid decisions)
+            models.Index(fields=["item", "status"], name="bid_item_status_idx"),
+            # Most recent bids of an item
+            models.Index(fields=["item", "-timestamp"], name="bid_item_recent_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Bid(buyer={self.buyer}, item={self.item}, amount={self.amount}, status={self.status})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Stamped after the write: the change version is the last lock taken
+            self.change_version = stamp_change_version(Bid.objects.filter(pk=self.pk))
+
+
+class ProtocolSession(models.Model):
+    """
+    Bidding protocol state per client session, for the shared monitor store
+    (PROTOCOL_MONITOR_BACKEND = "database", see services/monitor_store.py).
+    """
+    session_id = models.CharField(max_length=64, primary_key=True)
+    state = models.CharField(max_length=20)
+    updated_at = models.DateTimeField(db_index=True)  # expiry
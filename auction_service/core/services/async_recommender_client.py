@@ -0,0 +1,68 @@
+"""
+asyncio front end of the Recommendation Service client, for async views.
+
+RPyC is blocking, so calls run on a small dedicated thread pool (bounded
+by RECOMMENDER_ASYNC_WORKERS) and are awaited with a deadline. A slow or
+unreachable recommender then costs the event loop nothing, and a request
+gives up after RECOMMENDER_ASYNC_TIMEOUT_SECONDS instead of holding a
+worker for the whole RPyC timeout.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from django.conf import settings
+
+from .recommender_client import RecommendationClient, recommender_client
+
+
+class AsyncRecommendationClient:
+    """Awaitable versions of the RecommendationClient query methods."""
+
+    def __init__(self, client: RecommendationClient, max_workers: Optional[int] = None) -> None:
+        self._client = client
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # One thread per pooled connection; more would only queue on the pool
+                workers = self._max_workers or getattr(
+                    settings, "RECOMMENDER_ASYNC_WORKERS", getattr(settings, "RECOMMENDER_POOL_SIZE", 8)
+                )
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommender")
+            return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        timeout = getattr(
+            settings, "RECOMMENDER_ASYNC_TIMEOUT_SECONDS",
+            getattr(settings, "RECOMMENDER_TIMEOUT_SECONDS", 5),
+        )
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+        # On timeout the RPyC call finishes in the background; the caller moves on
+        return await asyncio.wait_for(future, timeout)
+
+    async def get_recommendations_for_user(self, user_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        return await self._run(self._client.get_recommendations_for_user, user_id, top_n)
+
+    async def get_similar_items(self, item_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        return await self._run(self._client.get_similar_items, item_id, top_n)
+
+    async def get_recommendations_for_users(
+        self, user_ids: List[int], top_n: int = 10
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        return await self._run(self._client.get_recommendations_for_users, user_ids, top_n)
+
+    async def get_similar_items_many(
+        self, item_ids: List[int], top_n: int = 10
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        return await self._run(self._client.get_similar_items_many, item_ids, top_n)
+
+
+# Singleton instance, sharing the connection pool of the sync client
+async_recommender_client = AsyncRecommendationClient(recommender_client)
@@ -0,0 +1,92 @@
+"""
+Circuit breaker for calls to the Recommendation Service.
+
+    closed    – calls go through; consecutive failures are counted.
+    open      – after `failure_threshold` failures in a row, calls fail
+                at once with CircuitOpen for `reset_seconds`.
+    half-open – then up to `half_open_calls` trial calls are let through:
+                one success closes the circuit, a failure opens it again.
+
+While it is open an outage costs callers nothing but a lock acquisition,
+instead of a connect and a sync timeout per call.
+"""
+
+import threading
+import time
+from typing import Dict, Union
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(Exception):
+    """The recommender is considered down; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_seconds: float = 10.0,
+        half_open_calls: int = 1,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0  # trial calls in flight while half-open
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def before_call(self) -> None:
+        """Raises CircuitOpen unless a call may be attempted now."""
+        with self._lock:
+            self._advance()
+            if self._state == OPEN:
+                raise CircuitOpen("Recommendation Service unavailable (circuit open)")
+            if self._state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    raise CircuitOpen("Recommendation Service unavailable (circuit half-open)")
+                self._trials += 1
+
+    def release(self) -> None:
+        """
+        The call was let through but never reached the recommender (e.g. no
+        pooled connection was free): gives back its half-open trial slot.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trials = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trials = 0
+
+    def stats(self) -> Dict[str, Union[str, int]]:
+        with self._lock:
+            self._advance()
+            return {"state": self._state, "failures": self._failures}
+
+    def _advance(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
@@ -0,0 +1,150 @@
+"""
+Bounded pool of RPyC connections for the Recommendation Service client.
+
+Each thread checks out its own connection for the duration of a call, so
+concurrent views no longer share (and serialise on) one socket, and a
+broken connection is discarded without affecting other threads.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+import logging
+import rpyc
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    At most `max_size` connections are checked out at once, and new ones
+    are only opened when no idle one is left, so that also bounds how many
+    exist. Idle connections are kept LIFO (so surplus ones age out),
+    pinged before reuse once they have been idle for
+    `health_check_seconds`, and closed after `idle_seconds` without use.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], rpyc.Connection],
+        max_size: int = 8,
+        idle_seconds: float = 60.0,
+        health_check_seconds: float = 30.0,
+        checkout_timeout: float = 2.0,
+    ) -> None:
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.health_check_seconds = health_check_seconds
+        self.checkout_timeout = checkout_timeout
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        # (connection, time it was returned)
+        self._idle: List[Tuple[rpyc.Connection, float]] = []
+        # Connection held by the current thread, for nested calls
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self) -> Iterator[rpyc.Connection]:
+        """
+        Checks out a connection for the current thread. A nested checkout
+        on the same thread reuses it. If the block raises, the connection
+        is closed instead of returned to the pool.
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            self._local.conn = None
+            self._discard(conn)
+            raise
+        self._local.conn = None
+        self._checkin(conn)
+
+    def close(self) -> None:
+        """Closes every idle connection (checked-out ones close on return)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "max_size": self.max_size}
+
+    # ------------------------------------------------------------------
+
+    def _checkout(self) -> rpyc.Connection:
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeout(
+                f"No recommender connection available within {self.checkout_timeout}s"
+            )
+
+        try:
+            while True:
+                entry = self._pop_idle()
+                if entry is None:
+                    return self._factory()
+                conn, returned_at = entry
+                if self._healthy(conn, time.monotonic() - returned_at):
+                    return conn
+                self._close(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _pop_idle(self) -> Optional[Tuple[rpyc.Connection, float]]:
+        now = time.monotonic()
+        expired: List[rpyc.Connection] = []
+        with self._lock:
+            # Oldest entries sit at the front; evict those idle for too long
+            while self._idle and now - self._idle[0][1] > self.idle_seconds:
+                expired.append(self._idle.pop(0)[0])
+            entry = self._idle.pop() if self._idle else None
+
+        for conn in expired:
+            self._close(conn)
+        return entry
+
+    def _healthy(self, conn: rpyc.Connection, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_seconds:
+            return True
+        try:
+            conn.ping(timeout=self.checkout_timeout)
+            return True
+        except Exception as e:
+            logger.info(f"Dropping stale recommender connection: {e}")
+            return False
+
+    def _checkin(self, conn: rpyc.Connection) -> None:
+        if conn.closed:
+            self._slots.release()
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, conn: rpyc.Connection) -> None:
+        self._close(conn)
+        self._slots.release()
+
+    @staticmethod
+    def _close(conn: rpyc.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
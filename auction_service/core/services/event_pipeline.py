@@ -0,0 +1,166 @@
+"""
+Batched delivery of new bids, new listings and closed listings to the
+Recommendation Service.
+
+The post_save signals only enqueue a small event; a background flusher
+ships everything that arrived within RECOMMENDER_EVENT_FLUSH_MS (or as
+soon as RECOMMENDER_EVENT_BATCH_SIZE events are waiting) in one sync. A
+slow or unreachable recommender therefore never delays saving a bid.
+
+The buffer is bounded. When it is full, further events are not kept:
+the next flush falls back to a full versioned sync from the database,
+which picks them up anyway. A failed flush is retried the same way,
+with a growing delay. Closed listings are not covered by the sync
+version, so they are kept until a sync that carries them succeeds.
+"""
+
+import queue
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+import logging
+from django.conf import settings
+
+from .recommender_client import BidEvent, RecommendationClient, recommender_client
+
+logger = logging.getLogger(__name__)
+
+# ("bid", (bid_id, buyer_id, item_id, amount, timestamp)), ("item", item_id)
+# or ("ended", item_id)
+Event = Tuple[str, object]
+
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+
+class InteractionEventPipeline:
+    """Bounded event buffer plus the thread that flushes it."""
+
+    def __init__(
+        self,
+        client: RecommendationClient,
+        flush_ms: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        self._client = client
+        self.flush_seconds = (
+            flush_ms if flush_ms is not None else getattr(settings, "RECOMMENDER_EVENT_FLUSH_MS", 200)
+        ) / 1000.0
+        self.batch_size = batch_size or getattr(settings, "RECOMMENDER_EVENT_BATCH_SIZE", 100)
+        self._events: "queue.Queue[Event]" = queue.Queue(
+            maxsize=max_pending or getattr(settings, "RECOMMENDER_EVENT_QUEUE_SIZE", 10000)
+        )
+
+        # Set when events were dropped or a flush failed: resync from the DB
+        self._resync = False
+        # Closed listings not shipped yet (flusher thread only)
+        self._ended: Set[int] = set()
+        self._wakeup = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Producers (signal handlers)
+    # ------------------------------------------------------------------
+
+    def bid_created(self, bid_id: int, buyer_id: int, item_id: int, amount: float, timestamp: float) -> None:
+        self._put(("bid", (bid_id, buyer_id, item_id, float(amount), timestamp)))
+
+    def item_created(self, item_id: int) -> None:
+        self._put(("item", item_id))
+
+    def item_ended(self, item_id: int) -> None:
+        self._put(("ended", item_id))
+
+    def _put(self, event: Event) -> None:
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            # Never block the request: the database still has the row
+            self._resync = True
+            self._wakeup.set()
+        else:
+            if self._events.qsize() >= self.batch_size:
+                self._wakeup.set()
+        self._ensure_started()
+
+    # ------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every event queued so far has been shipped (or the
+        timeout passes). Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._busy or not self._events.empty() or self._resync:
+                if self._thread is None:
+                    return False
+                self._wakeup.set()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def _ensure_started(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="recommender-events", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        delay = self.flush_seconds
+        while True:
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+            with self._idle:
+                batch = self._drain()
+                if not batch and not self._resync:
+                    delay = self.flush_seconds
+                    self._idle.notify_all()
+                    continue
+                self._busy = True
+
+            try:
+                self._ship(batch)
+                delay = self.flush_seconds
+            except Exception as e:
+                # Whatever was drained is still in the DB; resync it later
+                logger.error(f"Failed to push events to Recommender: {e}")
+                self._resync = True
+                delay = min(max(delay * 2, self.flush_seconds, 0.1), MAX_RETRY_DELAY_SECONDS)
+
+            with self._idle:
+                self._busy = False
+                self._idle.notify_all()
+
+    def _drain(self) -> List[Event]:
+        batch: List[Event] = []
+        while True:
+            try:
+                batch.append(self._events.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _ship(self, batch: List[Event]) -> None:
+        bids: List[BidEvent] = [payload for kind, payload in batch if kind == "bid"]
+        self._ended.update(payload for kind, payload in batch if kind == "ended")
+        if self._resync or self._ended or len(bids) != len(batch):
+            # Dropped events, or listings to announce: sync from the DB
+            self._resync = False
+            self._client.sync_interactions(sorted(self._ended))
+            self._ended.clear()
+        else:
+            self._client.sync_bids(bids)
+
+
+# Singleton instance, fed by the post_save signals in apps.py
+interaction_events = InteractionEventPipeline(recommender_client)
@@ -0,0 +1,207 @@
+"""
+In-process pub/sub behind the live update stream (/api/live/, SSE).
+
+Writers only report which auctions changed: the post_save signals in
+apps.py (bids placed and decided, listings updated) and the status
+scheduler call `items_changed`. A dispatcher thread collects them for
+LIVE_UPDATES_BATCH_MS, loads those auctions once, with their pending
+bids, and fans the rows out to every subscribed stream. Database work
+therefore follows the rate of changes, not the number of open pages,
+and nothing at all is loaded while nobody is subscribed.
+
+Subscribers are asyncio streams, so events are handed to their event
+loop with call_soon_threadsafe. A subscriber that falls more than
+LIVE_UPDATES_QUEUE_SIZE events behind gets a single "reset" event
+instead, and resynchronizes over the JSON endpoints.
+
+Only changes made by this process are seen; pages keep a slow ?since=
+poll for the rest (other workers, management commands).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+import logging
+from django.conf import settings
+from django.db import close_old_connections
+
+from core.models import Bid, Item
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+
+RECENT_BIDS = 10
+
+
+class Subscription:
+    """One stream's event queue, plus the auctions it wants to hear about."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        item_id: Optional[int] = None,
+        seller_id: Optional[int] = None,
+        max_pending: int = 100,
+    ) -> None:
+        self.loop = loop
+        self.item_id = item_id
+        self.seller_id = seller_id
+        self._queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=max_pending)
+
+    def matches(self, event: Event) -> bool:
+        auction = event["auction"]
+        if self.item_id is not None and auction["id"] != self.item_id:
+            return False
+        if self.seller_id is not None and auction["seller_id"] != self.seller_id:
+            return False
+        return True
+
+    async def get(self) -> Event:
+        return await self._queue.get()
+
+    def deliver(self, event: Event) -> None:
+        # Runs on the subscriber's event loop
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow: drop the backlog, the client reloads instead
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait({"type": "reset"})
+
+
+class LiveUpdateHub:
+    def __init__(self, max_pending: Optional[int] = None) -> None:
+        self.max_pending = max_pending or getattr(settings, "LIVE_UPDATES_QUEUE_SIZE", 100)
+        self.batch_seconds = getattr(settings, "LIVE_UPDATES_BATCH_MS", 50) / 1000.0
+        self._subscriptions: Set[Subscription] = set()
+        self._changed: Set[int] = set()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Subscribers (async views)
+    # ------------------------------------------------------------------
+
+    def subscribe(self, item_id: Optional[int] = None, seller_id: Optional[int] = None) -> Subscription:
+        """Must be called from the subscriber's event loop."""
+        subscription = Subscription(
+            asyncio.get_running_loop(), item_id=item_id, seller_id=seller_id, max_pending=self.max_pending
+        )
+        with self._cond:
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-updates", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._cond:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._cond:
+            return len(self._subscriptions)
+
+    # ------------------------------------------------------------------
+    # Publishers (signals, status scheduler)
+    # ------------------------------------------------------------------
+
+    def items_changed(self, item_ids: Iterable[int]) -> None:
+        """Reports committed changes to these auctions or their bids."""
+        with self._cond:
+            if not self._subscriptions:
+                return
+            self._changed.update(item_ids)
+            self._cond.notify()
+
+    # ------------------------------------------------------------------
+    # Dispatcher thread
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._changed:
+                    self._cond.wait()
+            # Let the other writes of the same request (bid, then auction) join the batch
+            time.sleep(self.batch_seconds)
+            with self._cond:
+                item_ids, self._changed = self._changed, set()
+                subscriptions = list(self._subscriptions)
+            if not subscriptions:
+                continue
+
+            try:
+                events = _load_events(item_ids, subscriptions)
+            except Exception as e:
+                logger.error(f"Failed to load live auction updates: {e}")
+                events = []
+            finally:
+                close_old_connections()
+
+            for subscription in subscriptions:
+                for event in events:
+                    if not subscription.matches(event):
+                        continue
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+                    except RuntimeError:
+                        # Its event loop is gone
+                        self.unsubscribe(subscription)
+                        break
+
+
+def _load_events(item_ids: Set[int], subscriptions: List[Subscription]) -> List[Event]:
+    """One "auction" event per changed auction (two queries, plus one per watched auction)."""
+    # Imported here: views imports this module
+    from core.views import _item_time_remaining_seconds
+
+    items = Item.objects.select_related("seller", "highest_bidder").filter(id__in=item_ids)
+    pending: Dict[int, List[Dict[str, Any]]] = {}
+    for b in (
+        Bid.objects.select_related("buyer")
+        .filter(item_id__in=item_ids, status=Bid.Status.PENDING)
+        .order_by("-timestamp")
+    ):
+        pending.setdefault(b.item_id, []).append(
+            {"id": b.id, "buyer": b.buyer.username, "amount": float(b.amount), "timestamp": b.timestamp.isoformat()}
+        )
+    # Only the detail page shows recent bids, and only for its own auction
+    watched = {s.item_id for s in subscriptions if s.item_id is not None}
+
+    events: List[Event] = []
+    for it in items:
+        auction: Dict[str, Any] = {
+            "id": it.id,
+            "name": it.name,
+            "description": it.description,
+            "seller": it.seller.username,
+            "seller_id": it.seller_id,
+            "status": it.status,
+            "current_price": float(it.current_price),
+            "starting_price": float(it.starting_price),
+            "highest_bidder": it.highest_bidder.username if it.highest_bidder else None,
+            "time_remaining_seconds": _item_time_remaining_seconds(it),
+            "pending_bids": pending.get(it.id, []),
+        }
+        if it.id in watched:
+            auction["recent_bids"] = [
+                {
+                    "id": b.id,
+                    "buyer": b.buyer.username,
+                    "amount": float(b.amount),
+                    "status": b.status,
+                    "timestamp": b.timestamp.isoformat(),
+                }
+                for b in Bid.objects.select_related("buyer").filter(item=it).order_by("-timestamp")[:RECENT_BIDS]
+            ]
+        events.append({"type": "auction", "auction": auction})
+    return events
+
+
+# Singleton instance, fed by the signals in apps.py and the status scheduler
+live_updates = LiveUpdateHub()
@@ -0,0 +1,204 @@
+"""
+Per-session bidding protocol monitors (see protocol_checker.py).
+
+Sessions are named by the client, so the store must stay bounded:
+
+    MonitorStore          – in process (default). Thread-safe LRU map of at
+                            most PROTOCOL_MONITOR_MAX_SESSIONS monitors;
+                            sessions idle for PROTOCOL_MONITOR_TTL_SECONDS
+                            start over. Concurrent requests of a session
+                            share its monitor, which checks and moves its
+                            state under a per-session lock.
+    DatabaseMonitorStore  – shared by every worker process
+                            (PROTOCOL_MONITOR_BACKEND = "database"). The
+                            state lives in the ProtocolSession table and
+                            every transition is a conditional write from
+                            the state it was checked in, so of two
+                            concurrent requests only one can move it;
+                            expired rows are purged at most once a minute.
+
+Either way an evicted or expired session simply starts a new protocol run,
+as a first request would.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import ProtocolSession
+from .protocol_checker import AuctionBiddingMonitor, ProtocolViolation
+
+PURGE_INTERVAL_SECONDS = 60
+
+# Longer client session ids are stored by digest
+MAX_KEY_LENGTH = ProtocolSession._meta.get_field("session_id").max_length
+
+
+def _key(session_id: str) -> str:
+    if len(session_id) <= MAX_KEY_LENGTH:
+        return session_id
+    return "sha1:" + hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+
+
+def _ttl_seconds() -> float:
+    return getattr(settings, "PROTOCOL_MONITOR_TTL_SECONDS", 1800)
+
+
+class LockedBiddingMonitor(AuctionBiddingMonitor):
+    """A monitor whose every check-and-transition holds the session's lock."""
+
+    __slots__ = ("_lock",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def recv_bid_from_buyer(self):
+        with self._lock:
+            super().recv_bid_from_buyer()
+
+    def recv_confirm_from_seller(self):
+        with self._lock:
+            super().recv_confirm_from_seller()
+
+    def recv_reject_from_seller(self):
+        with self._lock:
+            super().recv_reject_from_seller()
+
+    def send_bidinfo_to_seller(self):
+        with self._lock:
+            super().send_bidinfo_to_seller()
+
+    def send_acceptbid_to_buyer(self):
+        with self._lock:
+            super().send_acceptbid_to_buyer()
+
+    def send_rejectbid_to_buyer(self):
+        with self._lock:
+            super().send_rejectbid_to_buyer()
+
+
+class MonitorStore:
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[float] = None) -> None:
+        self.max_sessions = max_sessions or getattr(settings, "PROTOCOL_MONITOR_MAX_SESSIONS", 10000)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _ttl_seconds()
+        # session key -> (monitor, last use), least recently used first
+        self._monitors: "OrderedDict[str, Tuple[LockedBiddingMonitor, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, strict: bool = False) -> AuctionBiddingMonitor:
+        """
+        The session's monitor. A finished run (DONE) is replaced by a new one
+        unless `strict`, so repeated bids work in the UI demo.
+        """
+        key = _key(session_id)
+        now = time.monotonic()
+        with self._lock:
+            # Expired sessions are the least recently used ones
+            while self._monitors:
+                _, (_, last_used) = next(iter(self._monitors.items()))
+                if now - last_used <= self.ttl_seconds:
+                    break
+                self._monitors.popitem(last=False)
+
+            entry = self._monitors.pop(key, None)
+            monitor = entry[0] if entry is not None else None
+            if monitor is None or (not strict and monitor.state == "DONE"):
+                monitor = LockedBiddingMonitor()
+            self._monitors[key] = (monitor, now)
+
+            while len(self._monitors) > self.max_sessions:
+                self._monitors.popitem(last=False)
+        return monitor
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._monitors)
+
+
+class SharedBiddingMonitor(AuctionBiddingMonitor):
+    """
+    A monitor whose every state change is written to the shared store,
+    on condition that the stored state is still the one it was read in.
+    """
+
+    __slots__ = ("_store", "_key", "_state", "_stored")
+
+    def __init__(self, store: "DatabaseMonitorStore", key: str, state: str, stored: Optional[str]) -> None:
+        # The base __init__ would write "START" through
+        self._store = store
+        self._key = key
+        self._state = state
+        # The stored row's state (None: no row), which the next write expects
+        self._stored = stored
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @state.setter
+    def state(self, value: str) -> None:
+        self._store._write(self._key, self._stored, value)
+        self._state = self._stored = value
+
+
+class DatabaseMonitorStore:
+    def __init__(self, ttl_seconds: Optional[float] = None) -> None:
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _ttl_seconds()
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, strict: bool = False) -> AuctionBiddingMonitor:
+        """Same contract as MonitorStore.get (one query, plus the purge)."""
+        key = _key(session_id)
+        cutoff = timezone.now() - timedelta(seconds=self.ttl_seconds)
+        self._purge(cutoff)
+
+        row = ProtocolSession.objects.filter(session_id=key).values_list("state", "updated_at").first()
+        stored = row[0] if row is not None else None
+        state = stored
+        if row is None or row[1] < cutoff or (not strict and state == "DONE"):
+            state = "START"
+        return SharedBiddingMonitor(self, key, state, stored)
+
+    def _write(self, key: str, expected: Optional[str], state: str) -> None:
+        """
+        Moves the session from the `expected` stored state (None: no row) to
+        `state`. Raises ProtocolViolation if another request moved it first.
+        """
+        now = timezone.now()
+        if expected is not None and ProtocolSession.objects.filter(session_id=key, state=expected).update(
+            state=state, updated_at=now
+        ):
+            return
+        try:
+            # No row yet, or purged since it was read (it had expired)
+            with transaction.atomic():
+                ProtocolSession.objects.create(session_id=key, state=state, updated_at=now)
+        except IntegrityError:
+            raise ProtocolViolation(
+                f"Session {key} left state {expected or 'START'} concurrently, cannot move it to {state}"
+            )
+
+    def _purge(self, cutoff) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_purge:
+                return
+            self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        ProtocolSession.objects.filter(updated_at__lt=cutoff).delete()
+
+
+def _create_store():
+    if getattr(settings, "PROTOCOL_MONITOR_BACKEND", "memory") == "database":
+        return DatabaseMonitorStore()
+    return MonitorStore()
+
+
+# Singleton instance, used by the bidding views
+monitor_store = _create_store()
@@ -0,0 +1,334 @@
+"""
+In-memory order book for LIVE auctions: the bid hot path when
+AUCTION_ORDER_BOOK is enabled.
+
+Each LIVE auction's price, highest bidder and end time are kept in a
+small object, so a bid is validated and accepted in memory, under a
+per-auction lock, without touching the database. Every bid (accepted or
+rejected) is then written behind: a flusher thread inserts the bids of
+the last AUCTION_ORDER_BOOK_FLUSH_MS with one bulk INSERT and moves each
+auction's price once, with a conditional UPDATE that never lowers it.
+Each bid keeps the time the book decided it, not the time it was written.
+
+Nothing is lost on restart except bids still waiting to be flushed
+(they are flushed at normal interpreter exit). A batch that keeps failing
+is retried MAX_FLUSH_ATTEMPTS times, then written one bid at a time; bids
+that still fail are logged and kept in `dead_letters` instead of blocking
+the ones behind them. An auction missing from the book is rebuilt from
+its Item row (and its last RECENT_BIDS bids) on first use, and `load()`
+warms every LIVE auction at startup. The database, and so the JSON
+endpoints, lags the book by at most one flush interval.
+
+The book is per process: enable it only when one process serves bids,
+or bids on the same auction in different processes could both win.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+import logging
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from core.models import Bid, Buyer, Item, stamp_change_version
+from .event_pipeline import interaction_events
+from .live_updates import live_updates
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 30.0
+MAX_FLUSH_ATTEMPTS = 5
+MAX_DEAD_LETTERS = 1000
+RECENT_BIDS = getattr(settings, "AUCTION_ORDER_BOOK_RECENT_BIDS", 10)
+
+# (item id, buyer id, amount, Bid.Status, time it was decided)
+PendingBid = Tuple[int, int, float, str, datetime]
+# (buyer id, amount, Bid.Status, time it was decided)
+RecentBid = Tuple[int, float, str, datetime]
+
+RECENT_BID_FIELDS = ("buyer_id", "amount", "status", "timestamp")
+
+
+class LiveAuction:
+    __slots__ = ("seller_id", "end_time", "current_price", "highest_bidder_id", "recent_bids", "lock")
+
+    def __init__(
+        self,
+        seller_id: int,
+        end_time: float,
+        current_price: float,
+        highest_bidder_id: Optional[int],
+        recent_bids: Optional[List[RecentBid]] = None,
+    ) -> None:
+        self.seller_id = seller_id
+        self.end_time = end_time  # epoch seconds
+        self.current_price = current_price
+        self.highest_bidder_id = highest_bidder_id
+        # Oldest first; the newest RECENT_BIDS bids, flushed or not
+        self.recent_bids: Deque[RecentBid] = deque(recent_bids or (), maxlen=RECENT_BIDS)
+        self.lock = threading.Lock()
+
+
+class BidOutcome(NamedTuple):
+    accepted: bool
+    seller_id: int
+    current_price: float
+    highest_bidder_id: Optional[int]
+
+
+class OrderBook:
+    def __init__(self, flush_ms: Optional[int] = None) -> None:
+        self.flush_seconds = (
+            flush_ms if flush_ms is not None else getattr(settings, "AUCTION_ORDER_BOOK_FLUSH_MS", 100)
+        ) / 1000.0
+        self._auctions: Dict[int, LiveAuction] = {}
+        self._buyers: Set[int] = set()
+        self._lock = threading.Lock()
+
+        self._pending: List[PendingBid] = []
+        self._failed: List[PendingBid] = []  # the batch being retried, ahead of _pending
+        self.dead_letters: Deque[PendingBid] = deque(maxlen=MAX_DEAD_LETTERS)
+        self._idle = threading.Condition()
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, "AUCTION_ORDER_BOOK", False)
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def load(self) -> int:
+        """
+        Loads every LIVE auction, their recent bids and the known buyers
+        (three queries). Returns the auction count.
+        """
+        rows = Item.objects.filter(status=Item.Status.LIVE).values_list(
+            "id", "seller_id", "end_time", "current_price", "highest_bidder_id"
+        )
+        auctions = {
+            item_id: LiveAuction(seller_id, end_time.timestamp(), float(price), highest)
+            for item_id, seller_id, end_time, price, highest in rows
+        }
+        # The newest RECENT_BIDS bids of each LIVE auction, newest first
+        recent = (
+            Bid.objects.filter(item__status=Item.Status.LIVE)
+            .annotate(rank=Window(RowNumber(), partition_by=F("item_id"), order_by=F("id").desc()))
+            .filter(rank__lte=RECENT_BIDS)
+            .order_by("-id")
+            .values_list("item_id", *RECENT_BID_FIELDS)
+        )
+        for item_id, buyer_id, amount, status, timestamp in recent:
+            auction = auctions.get(item_id)
+            if auction is not None:
+                auction.recent_bids.appendleft((buyer_id, float(amount), status, timestamp))
+        buyers = set(Buyer.objects.values_list("id", flat=True))
+        with self._lock:
+            # Auctions already in the book may have unflushed bids: keep them
+            for item_id, auction in auctions.items():
+                self._auctions.setdefault(item_id, auction)
+            self._buyers |= buyers
+        return len(auctions)
+
+    def _auction(self, item_id: int) -> Optional[LiveAuction]:
+        auction = self._auctions.get(item_id)
+        if auction is not None:
+            return auction
+        row = (
+            Item.objects.filter(id=item_id, status=Item.Status.LIVE)
+            .values_list("seller_id", "end_time", "current_price", "highest_bidder_id")
+            .first()
+        )
+        if row is None:
+            return None
+        seller_id, end_time, price, highest = row
+        recent = Bid.objects.filter(item_id=item_id).order_by("-id").values_list(*RECENT_BID_FIELDS)[:RECENT_BIDS]
+        recent_bids = [(buyer_id, float(amount), status, timestamp) for buyer_id, amount, status, timestamp in recent]
+        recent_bids.reverse()
+        with self._lock:
+            return self._auctions.setdefault(
+                item_id, LiveAuction(seller_id, end_time.timestamp(), float(price), highest, recent_bids)
+            )
+
+    def _known_buyer(self, buyer_id: int) -> bool:
+        if buyer_id in self._buyers:
+            return True
+        if not Buyer.objects.filter(id=buyer_id).exists():
+            return False
+        with self._lock:
+            self._buyers.add(buyer_id)
+        return True
+
+    # ------------------------------------------------------------------
+    # Bids
+    # ------------------------------------------------------------------
+
+    def place(self, item_id: int, buyer_id: int, amount: float) -> Optional[BidOutcome]:
+        """
+        Decides a bid on a LIVE auction, with the same rule as the database
+        path: higher than the current price, and not from the current
+        highest bidder. Returns None when the book cannot decide it (unknown
+        buyer, auction not LIVE or past its end); the caller then uses the
+        database path, which reports the error.
+        """
+        auction = self._auction(item_id)
+        if auction is None or not self._known_buyer(buyer_id):
+            return None
+
+        with auction.lock:
+            if time.time() >= auction.end_time:
+                # Ended: the status scheduler flips it; drop it from the book
+                with self._lock:
+                    self._auctions.pop(item_id, None)
+                return None
+            accepted = amount > auction.current_price and auction.highest_bidder_id != buyer_id
+            if accepted:
+                auction.current_price = amount
+                auction.highest_bidder_id = buyer_id
+            outcome = BidOutcome(accepted, auction.seller_id, auction.current_price, auction.highest_bidder_id)
+            status = Bid.Status.ACCEPTED if accepted else Bid.Status.REJECTED
+            # Taken under the auction's lock, so its bids' times follow their order
+            now = timezone.now()
+            auction.recent_bids.append((buyer_id, amount, status, now))
+            with self._idle:
+                self._pending.append((item_id, buyer_id, amount, status, now))
+
+        self._ensure_started()
+        return outcome
+
+    def recent_bids(self, item_id: int) -> Optional[List[RecentBid]]:
+        """The auction's newest bids, newest first, or None if it is not in the book."""
+        auction = self._auctions.get(item_id)
+        if auction is None:
+            return None
+        with auction.lock:
+            return list(reversed(auction.recent_bids))
+
+    # ------------------------------------------------------------------
+    # Write-behind flusher
+    # ------------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every bid placed so far is in the database (or the
+        timeout passes). Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending or self._failed or self._busy:
+                if self._thread is None:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def _ensure_started(self) -> None:
+        with self._idle:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-book", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush, 5.0)
+
+    def _run(self) -> None:
+        delay = self.flush_seconds
+        attempts = 0
+        while True:
+            time.sleep(delay)
+            with self._idle:
+                # A failed batch is retried on its own, ahead of the newer bids
+                if self._failed:
+                    batch, self._failed = self._failed, []
+                else:
+                    batch, self._pending = self._pending, []
+                if not batch:
+                    self._idle.notify_all()
+                    continue
+                self._busy = True
+
+            try:
+                self._write(batch)
+                delay = self.flush_seconds
+                attempts = 0
+            except Exception as e:
+                attempts += 1
+                logger.error(
+                    f"Failed to write {len(batch)} bid(s) from the order book "
+                    f"(attempt {attempts}/{MAX_FLUSH_ATTEMPTS}): {e}"
+                )
+                if attempts < MAX_FLUSH_ATTEMPTS:
+                    with self._idle:
+                        self._failed = batch
+                    delay = min(max(delay * 2, 0.1), MAX_RETRY_DELAY_SECONDS)
+                else:
+                    # Give up on the batch: save what can be saved, one bid at a time
+                    self._write_each(batch)
+                    delay = self.flush_seconds
+                    attempts = 0
+            finally:
+                close_old_connections()
+
+            with self._idle:
+                self._busy = False
+                self._idle.notify_all()
+
+    def _write_each(self, batch: List[PendingBid]) -> None:
+        """Writes the bids one by one; those that fail go to the dead letters."""
+        for pending in batch:
+            try:
+                self._write([pending])
+            except Exception as e:
+                item_id, buyer_id, amount, status, timestamp = pending
+                logger.error(
+                    f"Dropping bid from the order book: item {item_id}, buyer {buyer_id}, "
+                    f"amount {amount}, {status} at {timestamp.isoformat()}: {e}"
+                )
+                self.dead_letters.append(pending)
+
+    def _write(self, batch: List[PendingBid]) -> None:
+        # Highest accepted price per auction; earlier ones are superseded
+        prices: Dict[int, Tuple[float, int]] = {}
+        for item_id, buyer_id, amount, status, _ in batch:
+            if status == Bid.Status.ACCEPTED and amount > prices.get(item_id, (float("-inf"), 0))[0]:
+                prices[item_id] = (amount, buyer_id)
+
+        with transaction.atomic():
+            bids = Bid.objects.bulk_create(
+                Bid(item_id=item_id, buyer_id=buyer_id, amount=amount, status=status, timestamp=timestamp)
+                for item_id, buyer_id, amount, status, timestamp in batch
+            )
+            moved = [
+                item_id
+                for item_id, (amount, buyer_id) in prices.items()
+                if Item.objects.filter(id=item_id, current_price__lt=amount).update(
+                    current_price=amount, highest_bidder_id=buyer_id
+                )
+            ]
+            # Last, once every row is written (see next_change_version)
+            stamp_change_version(
+                Bid.objects.filter(id__in=[bid.id for bid in bids]), Item.objects.filter(id__in=moved)
+            )
+
+        # bulk_create sends no post_save: do what the signals in apps.py do.
+        # The bids are committed, so a failure here must not write them again.
+        try:
+            for bid in bids:
+                interaction_events.bid_created(
+                    bid.id, bid.buyer_id, bid.item_id, bid.amount, bid.timestamp.timestamp()
+                )
+            live_updates.items_changed({pending[0] for pending in batch})
+        except Exception as e:
+            logger.error(f"Failed to announce {len(bids)} bid(s) from the order book: {e}")
+
+
+# Singleton instance, used by place_bid when AUCTION_ORDER_BOOK is enabled
+order_book = OrderBook()
@@ -44,6 +44,8 @@ class AuctionBiddingMonitor:
         DONE           – Final response sent
     """
 
+    __slots__ = ("state",)
+
     def __init__(self):
         self.state = "START"
 
@@ -109,6 +111,8 @@ class AuctionRecommenderMonitor:
         DONE            – One complete request/response cycle finished
     """
 
+    __slots__ = ("state",)
+
     def __init__(self):
         self.state = "IDLE"
 
@@ -1,20 +1,64 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import logging
+import socket
+import threading
 import rpyc
 from django.conf import settings
+from django.db.models import Count, Q
 
 from core.models import Bid,Item
+from .circuit_breaker import CLOSED, CircuitBreaker
+from .connection_pool import ConnectionPool, PoolTimeout
 from .protocol_checker import AuctionRecommenderMonitor
+from .result_cache import TTLCache
+from .wire import pack_interactions, unpack_results
 
 logger = logging.getLogger(__name__)
 
+# A broken connection (e.g. the server restarted); anything else is raised as is
+CONNECTION_ERRORS = (EOFError, ConnectionError, socket.error)
+
+# (last bid id, last item id, *bid ids below the last one not seen yet)
+# already sent to the recommender
+SyncVersion = Tuple[int, ...]
+
+# (bid id, buyer id, item id, amount, Unix timestamp) of a newly created bid
+BidEvent = Tuple[int, int, int, float, float]
+
 class RecommendationClient:
     """
     Robust RPyC client used by Django to talk to the Recommendation Service.
     """
 
     def __init__(self) -> None:
-        self._conn: Optional[rpyc.Connection] = None
+        # One connection per concurrent caller, see connection_pool.py
+        self._pool = ConnectionPool(
+            self._connect,
+            max_size=getattr(settings, "RECOMMENDER_POOL_SIZE", 8),
+            idle_seconds=getattr(settings, "RECOMMENDER_POOL_IDLE_SECONDS", 60),
+            health_check_seconds=getattr(settings, "RECOMMENDER_POOL_HEALTH_CHECK_SECONDS", 30),
+            checkout_timeout=getattr(settings, "RECOMMENDER_POOL_CHECKOUT_TIMEOUT_SECONDS", 2),
+        )
+        # Version acknowledged by the server; None until the first sync
+        self._synced_version: Optional[SyncVersion] = None
+        # How far below the last bid id a missing bid is still waited for
+        self._gap_window: int = getattr(settings, "RECOMMENDER_SYNC_GAP_WINDOW", 1000)
+        self._sync_lock = threading.RLock()
+        # Optional client-side result cache (off unless a TTL is configured)
+        self._results = TTLCache(
+            max_entries=getattr(settings, "RECOMMENDER_CLIENT_CACHE_SIZE", 1000),
+            ttl_seconds=getattr(settings, "RECOMMENDER_CLIENT_CACHE_TTL_SECONDS", 0),
+        )
+        # Fails calls fast while the recommender is down, see circuit_breaker.py
+        self._breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, "RECOMMENDER_BREAKER_FAILURES", 3),
+            reset_seconds=getattr(settings, "RECOMMENDER_BREAKER_RESET_SECONDS", 10),
+        )
+        # Last good result per query, served (degraded mode) when a call fails
+        self._last_good = TTLCache(
+            max_entries=getattr(settings, "RECOMMENDER_CLIENT_CACHE_SIZE", 1000),
+            ttl_seconds=getattr(settings, "RECOMMENDER_DEGRADED_CACHE_SECONDS", 3600),
+        )
 
     # ------------------------------------------------------------------
     # Connection handling
@@ -35,18 +79,41 @@ class RecommendationClient:
             },
         )
 
-    def _get_connection(self) -> rpyc.Connection:
-        if self._conn is None or self._conn.closed:
-            self._conn = self._connect()
-        return self._conn
-
     def _call(self, fn_name: str, *args: Any) -> Any:
+        # Raises CircuitOpen right away while the recommender is known down
+        self._breaker.before_call()
         try:
-            return getattr(self._get_connection().root, fn_name)(*args)
+            result = self._call_with_retry(fn_name, *args)
+        except PoolTimeout:
+            # Every connection is busy: a local limit, not an outage
+            self._breaker.release()
+            raise
         except Exception:
-            # Simple retry logic
-            self._conn = None
-            return getattr(self._get_connection().root, fn_name)(*args)
+            self._breaker.record_failure()
+            raise
+        self._breaker.record_success()
+        return result
+
+    def _call_with_retry(self, fn_name: str, *args: Any) -> Any:
+        try:
+            with self._pool.connection() as conn:
+                return getattr(conn.root, fn_name)(*args)
+        except TimeoutError:
+            raise  # a slow server, not a broken connection: retrying would only wait again
+        except CONNECTION_ERRORS:
+            # Retried once. A broken connection may mean a restarted
+            # server: drop the idle connections to it as well and re-check
+            # its version before the next read.
+            self._pool.close()
+            with self._sync_lock:
+                self._synced_version = None
+            with self._pool.connection() as conn:
+                return getattr(conn.root, fn_name)(*args)
+
+    @property
+    def degraded(self) -> bool:
+        """True while the circuit is not closed (results may be fallbacks)."""
+        return self._breaker.state != CLOSED
 
     # ------------------------------------------------------------------
     # Interaction loader (DB -> plain Python)
@@ -54,60 +121,196 @@ class RecommendationClient:
 
     def build_interactions_from_db(self) -> List[Dict[str, Any]]:
         """
-        Fetches all real bids + injects 'Ghost' interactions for ACTIVE items.
+        Fetches all real bids (open listings without bids are announced
+        separately, see build_interactions_since).
         """
+        interactions, _, _ = self.build_interactions_since(None)
+        return interactions
+
+    def build_interactions_since(
+        self, version: Optional[SyncVersion]
+    ) -> Tuple[List[Dict[str, Any]], List[int], SyncVersion]:
+        """
+        Collects the interactions recorded after `version`, a
+        (last bid id, last item id, *missing bid ids) high-water mark; None
+        means everything.
+
+        Bid ids are taken in one order and committed in another, so a bid
+        below the last id sent may still appear. The ids skipped so far are
+        kept in the version and read again on every sync until they show up
+        or fall more than RECOMMENDER_SYNC_GAP_WINDOW ids behind (rolled
+        back). Each bid is sent exactly once.
+
+        Returns (interactions, newly listed item ids, new high-water mark).
+        """
+        last_bid_id, last_item_id, *gaps = version or (0, 0)
         interactions: List[Dict[str, Any]] = []
 
-        # 1. Real Bids
-        qs = Bid.objects.select_related("buyer", "item").filter(amount__isnull=False)
-        for bid in qs:
+        # 1. Real Bids: the new ones, and the late ones
+        bids = (
+            Bid.objects.filter(Q(id__gt=last_bid_id) | Q(id__in=gaps), amount__isnull=False)
+            .order_by("id")
+            .values_list("id", "buyer_id", "item_id", "amount", "timestamp")
+        )
+        seen = set()
+        newest_bid = last_bid_id
+        for bid_id, buyer_id, item_id, amount, timestamp in bids:
             interactions.append({
-                "user_id": bid.buyer_id,
-                "item_id": bid.item_id,
-                "rating": float(bid.amount),
+                "user_id": buyer_id,
+                "item_id": item_id,
+                "rating": float(amount),
+                "timestamp": timestamp.timestamp(),
             })
+            seen.add(bid_id)
+            newest_bid = max(newest_bid, bid_id)
 
-        # 2. Ghost User Injection
-        # FIX: Include "COMING_SOON" so new items are recommended before they go live.
-        active_items = Item.objects.filter(status__in=["LIVE", "COMING_SOON"])
-        
-        ghost_count = 0
-        for item in active_items:
-            interactions.append({
-                "user_id": 0,          # The "Ghost" User
-                "item_id": item.id,
-                "rating": 1.0          # Minimal positive interaction
-            })
-            ghost_count += 1
+        # Ids still missing: not committed yet, or rolled back
+        oldest_awaited = newest_bid - self._gap_window
+        skipped = range(max(last_bid_id, oldest_awaited) + 1, newest_bid)
+        gaps = [
+            bid_id for bid_id in (*gaps, *skipped)
+            if bid_id > oldest_awaited and bid_id not in seen
+        ]
 
-        # DEBUG: Print to console to prove it's working
-        print(f"[Recommender Client] Interactions built: {len(qs)} real bids + {ghost_count} ghost entries.")
+        # 2. New listings
+        # Announced (once) so the recommender's trending list can show them
+        # before they get bids, including "COMING_SOON" ones.
+        new_items = list(
+            Item.objects.filter(id__gt=last_item_id, status__in=["LIVE", "COMING_SOON"])
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
 
-        return interactions
+        # Items that ended before being announced still move the mark forward
+        newest_item = Item.objects.order_by("-id").values_list("id", flat=True).first()
+        last_item_id = max(last_item_id, newest_item or 0)
 
-    def push_interactions_to_recommender(self) -> None:
-        """Send all interactions to the Recommendation Service."""
-        interactions = self.build_interactions_from_db()
-        # Only push if we actually have data
-        if interactions:
-            self._call("load_interactions", interactions)
+        logger.debug(
+            f"Interactions built since {version}: {len(interactions)} bids, "
+            f"{len(new_items)} new items, {len(gaps)} bid(s) awaited."
+        )
+
+        return interactions, new_items, (newest_bid, last_item_id, *gaps)
 
     # ------------------------------------------------------------------
-    # Helpers
+    # Versioned sync (DB -> Recommender)
     # ------------------------------------------------------------------
 
-    def _materialize_list_of_dicts(self, value: Any) -> List[Dict[str, Any]]:
-        result: List[Dict[str, Any]] = []
-        # Handle cases where RPyC returns None or empty
-        if not value:
-            return []
-            
-        for row in value:
-            result.append({
-                "item_id": int(row["item_id"]),
-                "score": float(row["score"]),
-            })
-        return result
+    def sync_interactions(self, ended_items: Sequence[int] = ()) -> Optional[SyncVersion]:
+        """
+        Sends only the bids/items newer than the version the server has
+        acknowledged. The server replies with the version it now holds;
+        if that is not what we sent (e.g. it restarted or another worker
+        synced first) we resend the delta from the server's version.
+
+        `ended_items` are listings that closed since the last sync (the
+        version does not cover status changes); they leave the trending
+        list. A full snapshot, and this client's first sync (the server may
+        have restored an older model from disk), list every closed listing
+        instead; a server version ahead of the database gets a full
+        snapshot.
+
+        Returns the acknowledged version.
+        """
+        with self._sync_lock:
+            base = self._synced_version
+            bootstrap = base is None
+            if bootstrap:
+                base = self._server_version()
+                if base is not None and self._ahead_of_database(base):
+                    # The database was reset or restored since the server saved its model
+                    logger.warning(
+                        f"Recommender is at version {base[:2]}, ahead of the database: resending everything."
+                    )
+                    base = None
+
+            for _ in range(2):
+                interactions, new_items, version = self.build_interactions_since(base)
+                if base is not None and version == base and not ended_items and not bootstrap:
+                    break  # nothing new since the last sync
+
+                closed = self._closed_items() if base is None or bootstrap else ended_items
+                payload = pack_interactions(interactions, new_items, closed)
+                acked = self._call("sync_interactions_packed", base, payload, version)
+                acked = tuple(acked) if acked is not None else None
+                if acked == version:
+                    base = acked
+                    break
+                base = acked  # out of step: resend from the server's version
+
+            self._synced_version = base
+            return base
+
+    def sync_bids(self, bids: List[BidEvent]) -> Optional[SyncVersion]:
+        """
+        Ships bids the caller already holds (see event_pipeline.py) without
+        reading them back from the database. That is only exact when they
+        directly follow the acknowledged version and no bid is awaited
+        below it; otherwise, or if the server disagrees, this falls back to
+        sync_interactions().
+        """
+        with self._sync_lock:
+            base = self._synced_version
+            bids = sorted(bids)
+            if base is None or len(base) > 2 or not bids or [b[0] for b in bids] != list(
+                range(base[0] + 1, base[0] + 1 + len(bids))
+            ):
+                return self.sync_interactions()
+
+            interactions = [
+                {"user_id": buyer_id, "item_id": item_id, "rating": float(amount), "timestamp": timestamp}
+                for _, buyer_id, item_id, amount, timestamp in bids
+            ]
+            version = (bids[-1][0], base[1])
+            acked = self._call("sync_interactions_packed", base, pack_interactions(interactions), version)
+            self._synced_version = tuple(acked) if acked is not None else None
+            if self._synced_version != version:
+                return self.sync_interactions()  # out of step: resend from the server's version
+            return self._synced_version
+
+    @staticmethod
+    def _closed_items() -> List[int]:
+        """Closed listings that have bids, i.e. that a snapshot would rank as trending."""
+        return list(
+            Item.objects.filter(status=Item.Status.ENDED, id__in=Bid.objects.values("item_id"))
+            .values_list("id", flat=True)
+        )
+
+    @staticmethod
+    def _ahead_of_database(version: SyncVersion) -> bool:
+        """True if `version` covers bids or items the database does not have."""
+        last_bid_id, last_item_id = version[:2]
+        newest_bid = Bid.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        newest_item = Item.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        return last_bid_id > newest_bid or last_item_id > newest_item
+
+    def _server_version(self) -> Optional[SyncVersion]:
+        version = self._call("get_version")
+        return tuple(version) if version is not None else None
+
+    def _ensure_synced(self) -> None:
+        """
+        Bootstraps the server once per connection. In steady state this is
+        a no-op: new bids are pushed by the post_save signal, not by reads.
+        """
+        if self._synced_version is not None:
+            return
+        try:
+            self.sync_interactions()
+        except Exception as e:
+            logger.warning(f"Failed to sync data to recommender: {e}")
+
+    def push_interactions_to_recommender(self) -> None:
+        """
+        Send all interactions to the Recommendation Service (full resync).
+        Goes through the versioned sync as a snapshot, so the server keeps
+        a version that later deltas can build on.
+        """
+        with self._sync_lock:
+            interactions, new_items, version = self.build_interactions_since(None)
+            payload = pack_interactions(interactions, new_items, self._closed_items())
+            acked = self._call("sync_interactions_packed", None, payload, version)
+            self._synced_version = tuple(acked) if acked is not None else None
 
     # ------------------------------------------------------------------
     # Public API used by Django views
@@ -120,38 +323,41 @@ class RecommendationClient:
         self, user_id: int, top_n: int = 10
     ) -> List[Dict[str, Any]]:
         
-        # ### CRITICAL FIX START ###
-        # We MUST push the data before asking for recommendations,
-        # otherwise the separate service has no idea who this user is.
-        try:
-            self.push_interactions_to_recommender()
-        except Exception as e:
-            logger.warning(f"Failed to sync data to recommender: {e}")
-        # ### CRITICAL FIX END ###
+        # The server is kept up to date by the bid signal; reads only
+        # bootstrap it once if it has never been synced.
+        self._ensure_synced()
+
+        key = ("recs", int(user_id), int(top_n), self._synced_version)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
 
         monitor = AuctionRecommenderMonitor()
         monitor.send_get_recs()
 
         try:
-            raw = self._call("recommend_for_user", int(user_id), int(top_n))
-            result = self._materialize_list_of_dicts(raw)
+            raw = self._call("recommend_for_users_packed", (int(user_id),), int(top_n))
+            result = unpack_results(raw).get(int(user_id), [])
             monitor.recv_rec_list()
+            self._results.put(key, result)
+            self._last_good.put(key[:3], result)
             return result
-        except Exception:
+        except Exception as e:
             monitor.recv_rec_error()
-            raise
+            logger.warning(f"Serving fallback recommendations for user {user_id}: {e}")
+            return self._fallback_recommendations(int(user_id), int(top_n))
 
-    def load_interactions(self, interactions: List[Dict[str, Any]]) -> bool:
+    def apply_interactions(self, interactions: List[Dict[str, Any]]) -> bool:
         """
-        Public API for apps.py signals to push specific interactions.
+        Merges new interactions into the recommender's existing model
+        (incremental update, no full rebuild on the server).
         """
         if not interactions:
             return True
         try:
-            # We call the RPyC method exposed in server.py
-            return bool(self._call("load_interactions", interactions))
+            return bool(self._call("apply_interactions_packed", pack_interactions(interactions)))
         except Exception as e:
-            logger.error(f"Failed to push interactions: {e}")
+            logger.error(f"Failed to apply interactions: {e}")
             return False
         
     def get_similar_items(
@@ -160,18 +366,127 @@ class RecommendationClient:
         
         # Note: We don't necessarily need to push data for 'similar items' 
         # if the matrix is already built, but it's safer to keep it consistent.
-        
+
+        key = ("similar", int(item_id), int(top_n), self._synced_version)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
         monitor = AuctionRecommenderMonitor()
         monitor.send_get_similar()
 
         try:
-            raw = self._call("similar_items", int(item_id), int(top_n))
-            result = self._materialize_list_of_dicts(raw)
+            raw = self._call("similar_items_many_packed", (int(item_id),), int(top_n))
+            result = unpack_results(raw).get(int(item_id), [])
             monitor.recv_similar_list()
+            self._results.put(key, result)
+            self._last_good.put(key[:3], result)
             return result
-        except Exception:
+        except Exception as e:
             monitor.recv_rec_error()
-            raise
+            logger.warning(f"Serving fallback similar items for item {item_id}: {e}")
+            return self._fallback_similar(int(item_id), int(top_n))
+
+    # ------------------------------------------------------------------
+    # Batch API (many ids per round trip, e.g. dashboards / precompute jobs)
+    # ------------------------------------------------------------------
+
+    def get_recommendations_for_users(
+        self, user_ids: List[int], top_n: int = 10
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Recommendations for many users in a single RPyC call.
+        Returns {user_id: [{"item_id", "score"}, ...]}.
+        """
+        if not user_ids:
+            return {}
+
+        # A tuple is sent by value, so the server does not iterate a netref
+        ids = tuple(int(u) for u in user_ids)
+
+        self._ensure_synced()
+
+        monitor = AuctionRecommenderMonitor()
+        monitor.send_get_recs()
+
+        try:
+            raw = self._call("recommend_for_users_packed", ids, int(top_n))
+            result = unpack_results(raw)
+            monitor.recv_rec_list()
+            for user_id, recs in result.items():
+                self._last_good.put(("recs", user_id, int(top_n)), recs)
+            return result
+        except Exception as e:
+            monitor.recv_rec_error()
+            logger.warning(f"Serving fallback recommendations for {len(ids)} users: {e}")
+            return {u: self._fallback_recommendations(u, int(top_n)) for u in ids}
+
+    def get_similar_items_many(
+        self, item_ids: List[int], top_n: int = 10
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Similar items for many items in a single RPyC call.
+        Returns {item_id: [{"item_id", "score"}, ...]}.
+        """
+        if not item_ids:
+            return {}
+
+        ids = tuple(int(i) for i in item_ids)
+
+        monitor = AuctionRecommenderMonitor()
+        monitor.send_get_similar()
+
+        try:
+            raw = self._call("similar_items_many_packed", ids, int(top_n))
+            result = unpack_results(raw)
+            monitor.recv_similar_list()
+            for item_id, similar in result.items():
+                self._last_good.put(("similar", item_id, int(top_n)), similar)
+            return result
+        except Exception as e:
+            monitor.recv_rec_error()
+            logger.warning(f"Serving fallback similar items for {len(ids)} items: {e}")
+            return {i: self._fallback_similar(i, int(top_n)) for i in ids}
+
+    # ------------------------------------------------------------------
+    # Degraded mode (recommender unreachable or failing)
+    # ------------------------------------------------------------------
+
+    def _fallback_recommendations(self, user_id: int, top_n: int) -> List[Dict[str, Any]]:
+        """The last result served for this user, else the most bid-on open items."""
+        cached = self._last_good.get(("recs", user_id, top_n))
+        if cached is not None:
+            return cached
+        bid_on = Bid.objects.filter(buyer_id=user_id).values("item_id")
+        return self._popular_items(top_n, Item.objects.exclude(id__in=bid_on))
+
+    def _fallback_similar(self, item_id: int, top_n: int) -> List[Dict[str, Any]]:
+        cached = self._last_good.get(("similar", item_id, top_n))
+        if cached is not None:
+            return cached
+        return self._popular_items(top_n, Item.objects.exclude(id=item_id))
+
+    @staticmethod
+    def _popular_items(top_n: int, items) -> List[Dict[str, Any]]:
+        popular = (
+            items.filter(status__in=[Item.Status.LIVE, Item.Status.COMING_SOON])
+            .annotate(bid_count=Count("bid"))
+            .order_by("-bid_count", "-id")
+            .values_list("id", "bid_count")[:top_n]
+        )
+        return [{"item_id": item_id, "score": float(count)} for item_id, count in popular]
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters of the client cache and of the server's result cache."""
+        stats: Dict[str, Dict[str, Any]] = {
+            "client": self._results.stats(),
+            "breaker": self._breaker.stats(),
+        }
+        try:
+            stats["server"] = dict(self._call("cache_stats"))
+        except Exception as e:
+            logger.warning(f"Failed to read recommender cache stats: {e}")
+        return stats
 
 # Singleton instance
 recommender_client = RecommendationClient()
\ No newline at end of file
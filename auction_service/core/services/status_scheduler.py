@@ -0,0 +1,191 @@
+"""
+Scheduled auction status transitions (COMING_SOON -> LIVE -> ENDED).
+
+Statuses used to be recomputed, and saved one item at a time, by every
+read endpoint. Instead, a background thread keeps a heap of the upcoming
+start and end times of open items and, whenever some fall due, flips them
+with one bulk UPDATE per transition. Reads then just read `status`.
+
+The heap is loaded from the database when the scheduler starts, new items
+are added by the post_save signal in apps.py, and the whole heap is
+reloaded every AUCTION_STATUS_RESCAN_SECONDS to pick up items created by
+other processes. The UPDATEs are conditional on the current status, so
+several processes running a scheduler do not conflict, and an auction the
+seller ended early is never reopened.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import Item, next_change_version
+from .event_pipeline import interaction_events
+from .live_updates import live_updates
+
+logger = logging.getLogger(__name__)
+
+START = "start"
+END = "end"
+
+# (due time, item id, transition)
+Entry = Tuple[datetime, int, str]
+
+
+def apply_due_transitions(due: List[Entry]) -> Dict[str, List[int]]:
+    """
+    Applies the given due transitions in bulk. Returns the ids of the items
+    changed per transition.
+    """
+    starts = [item_id for _, item_id, kind in due if kind == START]
+    ends = [item_id for _, item_id, kind in due if kind == END]
+    changed: Dict[str, List[int]] = {START: [], END: []}
+    now = timezone.now()
+
+    # Bulk updates skip Item.save(), so they stamp the change version
+    # themselves, taken after the rows are locked (see next_change_version)
+    if starts:
+        with transaction.atomic():
+            items = Item.objects.select_for_update().filter(
+                id__in=starts, status=Item.Status.COMING_SOON, start_time__lte=now
+            )
+            changed[START] = list(items.values_list("id", flat=True))
+            version = next_change_version()
+            items.filter(id__in=changed[START]).update(status=Item.Status.LIVE, change_version=version)
+    if ends:
+        with transaction.atomic():
+            items = Item.objects.select_for_update().filter(
+                id__in=ends,
+                status__in=[Item.Status.COMING_SOON, Item.Status.LIVE],
+                end_time__lte=now,
+            )
+            changed[END] = list(items.values_list("id", flat=True))
+            version = next_change_version()
+            items.filter(id__in=changed[END]).update(status=Item.Status.ENDED, change_version=version)
+    return changed
+
+
+class AuctionStatusScheduler:
+    def __init__(self, rescan_seconds: Optional[float] = None) -> None:
+        self.rescan_seconds = (
+            rescan_seconds if rescan_seconds is not None
+            else getattr(settings, "AUCTION_STATUS_RESCAN_SECONDS", 60)
+        )
+        self._heap: List[Entry] = []
+        # Entries scheduled while a reload is running, kept across it
+        self._scheduled: List[Entry] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Starts the scheduler thread (once per process)."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="auction-status", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def schedule(self, item_id: int, start_time: datetime, end_time: datetime, status: str) -> None:
+        """Adds the pending transitions of one item (e.g. a newly listed one)."""
+        entries: List[Entry] = []
+        if status == Item.Status.COMING_SOON:
+            entries.append((start_time, item_id, START))
+        if status != Item.Status.ENDED:
+            entries.append((end_time, item_id, END))
+
+        with self._cond:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+            self._scheduled.extend(entries)
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Scheduler thread
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """Rebuilds the heap from every open item (one query)."""
+        with self._cond:
+            self._scheduled = []
+        open_items = (
+            Item.objects.filter(status__in=[Item.Status.COMING_SOON, Item.Status.LIVE])
+            .values_list("id", "start_time", "end_time", "status")
+        )
+        heap: List[Entry] = []
+        for item_id, start_time, end_time, status in open_items:
+            if status == Item.Status.COMING_SOON:
+                heap.append((start_time, item_id, START))
+            heap.append((end_time, item_id, END))
+
+        with self._cond:
+            heap.extend(self._scheduled)
+            heapq.heapify(heap)
+            self._heap = heap
+            self._scheduled = []
+
+    def _pop_due(self, now: datetime) -> List[Entry]:
+        due: List[Entry] = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    def _run(self) -> None:
+        next_scan = timezone.now()
+        while True:
+            try:
+                if timezone.now() >= next_scan:
+                    close_old_connections()
+                    self._load()
+                    next_scan = timezone.now() + timedelta(seconds=self.rescan_seconds)
+
+                with self._cond:
+                    while not self._stopped:
+                        now = timezone.now()
+                        if (self._heap and self._heap[0][0] <= now) or now >= next_scan:
+                            break
+                        wake = min(self._heap[0][0], next_scan) if self._heap else next_scan
+                        self._cond.wait((wake - now).total_seconds())
+                    if self._stopped:
+                        return
+                    due = self._pop_due(timezone.now())
+
+                if due:
+                    changed = apply_due_transitions(due)
+                    live_updates.items_changed(item_id for _, item_id, _ in due)
+                    for item_id in changed[END]:
+                        interaction_events.item_ended(item_id)
+                    if changed[START] or changed[END]:
+                        logger.info(
+                            f"{len(changed[START])} auction(s) went LIVE, {len(changed[END])} ENDED."
+                        )
+            except Exception as e:
+                # Reload soon: that also recovers the transitions that failed
+                logger.error(f"Auction status scheduler failed: {e}")
+                close_old_connections()
+                next_scan = timezone.now() + timedelta(seconds=min(self.rescan_seconds, 5))
+
+
+# Singleton instance, started by the WSGI/ASGI entry points
+status_scheduler = AuctionStatusScheduler()
@@ -0,0 +1,76 @@
+"""
+Bulk wire format for talking to the Recommendation Service.
+
+Mirror of recommendation_service/rpyc_server/wire.py (the two services
+do not share code): interactions are sent and results received as one
+packed `bytes` payload of little-endian columnar arrays, instead of RPyC
+netrefs that cost a round trip per element access.
+"""
+
+import struct
+import time
+from typing import Any, Dict, List, Sequence
+import numpy as np # type: ignore
+
+
+INTERACTIONS_MAGIC = b"SBI2"
+RESULTS_MAGIC = b"SBR1"
+
+_HEADER = struct.Struct("<4sII")
+_COUNT = struct.Struct("<I")
+
+
+def pack_interactions(
+    interactions: Sequence[Dict[str, Any]], new_items: Sequence[int] = (), ended_items: Sequence[int] = ()
+) -> bytes:
+    """
+    Encodes [{"user_id", "item_id", "rating", "timestamp"}, ...] plus the
+    ids of newly announced and of closed listings as an "SBI2" payload.
+    """
+    n = len(interactions)
+    now = time.time()  # for rows without a timestamp
+    user_ids = np.fromiter((row["user_id"] for row in interactions), dtype="<i8", count=n)
+    item_ids = np.fromiter((row["item_id"] for row in interactions), dtype="<i8", count=n)
+    ratings = np.fromiter((row["rating"] for row in interactions), dtype="<f8", count=n)
+    timestamps = np.fromiter((row.get("timestamp", now) for row in interactions), dtype="<f8", count=n)
+    announced = np.fromiter(new_items, dtype="<i8", count=len(new_items))
+    ended = np.fromiter(ended_items, dtype="<i8", count=len(ended_items))
+
+    return b"".join([
+        _HEADER.pack(INTERACTIONS_MAGIC, n, 4),
+        user_ids.tobytes(),
+        item_ids.tobytes(),
+        ratings.tobytes(),
+        timestamps.tobytes(),
+        _COUNT.pack(len(announced)),
+        announced.tobytes(),
+        _COUNT.pack(len(ended)),
+        ended.tobytes(),
+    ])
+
+
+def unpack_results(payload: bytes) -> Dict[int, List[Dict[str, Any]]]:
+    """Decodes an "SBR1" payload into {id: [{"item_id", "score"}, ...]}."""
+    payload = bytes(payload)
+    magic, n_keys, n_rows = _HEADER.unpack_from(payload, 0)
+    if magic != RESULTS_MAGIC:
+        raise ValueError(f"Not a results payload: {magic!r}")
+
+    offset = _HEADER.size
+    keys = np.frombuffer(payload, dtype="<i8", count=n_keys, offset=offset)
+    offset += n_keys * 8
+    counts = np.frombuffer(payload, dtype="<i8", count=n_keys, offset=offset)
+    offset += n_keys * 8
+    item_ids = np.frombuffer(payload, dtype="<i8", count=n_rows, offset=offset).tolist()
+    offset += n_rows * 8
+    scores = np.frombuffer(payload, dtype="<f8", count=n_rows, offset=offset).tolist()
+
+    result: Dict[int, List[Dict[str, Any]]] = {}
+    start = 0
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        result[key] = [
+            {"item_id": item_id, "score": score}
+            for item_id, score in zip(item_ids[start:start + count], scores[start:start + count])
+        ]
+        start += count
+    return result
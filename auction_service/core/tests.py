@@ -1,3 +1,615 @@
-from django.test import TestCase
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError, connection
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.models import Bid, Buyer, Item, Seller, current_change_version
+from core.services.circuit_breaker import CLOSED, HALF_OPEN, CircuitBreaker, CircuitOpen
+from core.services.connection_pool import PoolTimeout
+from core.services.event_pipeline import interaction_events
+from core.services.monitor_store import DatabaseMonitorStore, MonitorStore
+from core.services.order_book import OrderBook
+from core.services.protocol_checker import ProtocolViolation
+from core.services.recommender_client import RecommendationClient
+from core.services.status_scheduler import END, START, apply_due_transitions
+from core.views import MAX_PAGE_SIZE
+
+
+class SellerAuctionsQueryCountTests(TestCase):
+    """api_seller_auctions must not issue queries per auction or per bid."""
+
+    QUERIES = 4  # seller, change version, auctions, pending bids
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = Seller.objects.create(username="seller")
+        buyers = [Buyer.objects.create(username=f"buyer{i}") for i in range(3)]
+        start = timezone.now() + timedelta(hours=1)
+        # bulk_create skips Item.save(), so end_time is set here
+        Item.objects.bulk_create(
+            Item(
+                name=f"item{i}",
+                seller=cls.seller,
+                starting_price=10,
+                current_price=10,
+                start_time=start,
+                duration_seconds=3600,
+                end_time=start + timedelta(seconds=3600),
+                status=Item.Status.COMING_SOON,
+                highest_bidder=buyers[i % 3] if i % 2 else None,
+            )
+            for i in range(1000)
+        )
+        items = list(Item.objects.filter(seller=cls.seller).order_by("-id")[:150])
+        Bid.objects.bulk_create(
+            Bid(buyer=buyers[j], item=item, amount=11 + j, status=Bid.Status.PENDING)
+            for item in items
+            for j in range(3)
+        )
+
+    def test_page_is_a_fixed_number_of_queries(self):
+        for limit in (1, 20, 100):
+            with self.assertNumQueries(self.QUERIES):
+                response = self.client.get(f"/api/seller/{self.seller.id}/auctions/", {"limit": limit})
+            self.assertEqual(response.status_code, 200)
+            auctions = response.json()["auctions"]
+            self.assertEqual(len(auctions), limit)
+            self.assertTrue(all(len(a["pending_bids"]) == 3 for a in auctions))
+
+    def test_walking_every_page(self):
+        seen = 0
+        cursor = None
+        while True:
+            params = {"limit": 100}
+            if cursor:
+                params["cursor"] = cursor
+            with self.assertNumQueries(self.QUERIES):
+                data = self.client.get(f"/api/seller/{self.seller.id}/auctions/", params).json()
+            seen += len(data["auctions"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, 1000)
+
+
+class ConcurrentLiveBidTests(TransactionTestCase):
+    """Parallel bids on one LIVE auction: the highest one must win."""
+
+    BIDS = 2000
+    WORKERS = 16
+
+    def setUp(self):
+        # Keep the bids away from the recommender (no RPyC pushes)
+        for producer in ("bid_created", "item_created"):
+            patcher = mock.patch.object(interaction_events, producer)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        seller = Seller.objects.create(username="seller")
+        self.item = Item.objects.create(
+            name="item",
+            seller=seller,
+            starting_price=1,
+            current_price=1,
+            start_time=timezone.now() - timedelta(minutes=1),
+            status=Item.Status.LIVE,
+        )
+        # One buyer per bid, so no bid is rejected for its bidder already leading
+        Buyer.objects.bulk_create(Buyer(username=f"buyer{i}") for i in range(self.BIDS))
+        self.buyer_ids = list(Buyer.objects.order_by("id").values_list("id", flat=True))
+
+    def _bid(self, n: int, amount: float) -> int:
+        try:
+            response = Client().post(
+                "/bid/place/",
+                json.dumps(
+                    {"session_id": f"bid{n}", "buyer_id": self.buyer_ids[n], "item_id": self.item.id, "amount": amount}
+                ),
+                content_type="application/json",
+            )
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_final_price_is_the_highest_bid(self):
+        amounts = random.Random(42).sample(range(2, 100000), self.BIDS)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            codes = list(pool.map(self._bid, range(self.BIDS), amounts))
+        self.assertEqual(codes, [200] * self.BIDS)
+
+        top = max(amounts)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_price, top)
+        self.assertEqual(self.item.highest_bidder_id, self.buyer_ids[amounts.index(top)])
+
+        bids = Bid.objects.filter(item=self.item)
+        self.assertEqual(bids.count(), self.BIDS)
+        # Accepted prices only ever went up
+        accepted = list(bids.filter(status=Bid.Status.ACCEPTED).order_by("change_version").values_list("amount", flat=True))
+        self.assertEqual(accepted, sorted(accepted))
+        self.assertEqual(len(set(accepted)), len(accepted))
+        self.assertEqual(accepted[-1], top)
+
+
+class ChangedSinceTests(TestCase):
+    """?since= returns 304, only the changed auctions, or a reset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = Seller.objects.create(username="seller")
+        cls.buyer = Buyer.objects.create(username="buyer")
+        cls.items = [
+            Item.objects.create(
+                name=f"item{i}",
+                seller=cls.seller,
+                starting_price=10,
+                current_price=10,
+                start_time=timezone.now() - timedelta(minutes=1),
+                status=Item.Status.LIVE,
+            )
+            for i in range(3)
+        ]
+
+    def _version(self) -> int:
+        response = self.client.get("/api/auctions/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["version"]
+
+    def test_unchanged_is_not_modified(self):
+        since = self._version()
+        self.assertEqual(self.client.get("/api/auctions/", {"since": since}).status_code, 304)
+        item = self.items[0]
+        self.assertEqual(self.client.get(f"/api/auction/{item.id}/state/", {"since": since}).status_code, 304)
+
+    def test_changed_returns_only_the_changed_auctions(self):
+        since = self._version()
+        item = self.items[1]
+        item.current_price = 20
+        item.save(update_fields=["current_price"])
+        Bid.objects.create(buyer=self.buyer, item=self.items[2], amount=15, status=Bid.Status.PENDING)
+
+        response = self.client.get("/api/auctions/", {"since": since})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([a["id"] for a in body["auctions"]], [item.id])
+        self.assertEqual(body["auctions"][0]["current_price"], 20)
+        self.assertGreater(body["version"], since)
+        self.assertEqual(self.client.get("/api/auctions/", {"since": body["version"]}).status_code, 304)
+
+        # A new bid changes its auction's state, not the others'
+        state = self.client.get(f"/api/auction/{self.items[2].id}/state/", {"since": since})
+        self.assertEqual([b["amount"] for b in state.json()["recent_bids"]], [15])
+        self.assertEqual(self.client.get(f"/api/auction/{self.items[0].id}/state/", {"since": since}).status_code, 304)
+
+    def test_since_ahead_of_the_server_resets(self):
+        since = self._version() + 1
+        self.assertEqual(self.client.get("/api/auctions/", {"since": since}).json(), {"reset": True})
+        item = self.items[0]
+        self.assertEqual(self.client.get(f"/api/auction/{item.id}/state/", {"since": since}).json(), {"reset": True})
+
+    def test_since_too_far_behind_resets(self):
+        since = self._version()
+        for i in range(MAX_PAGE_SIZE + 1):
+            Item.objects.create(name=f"new{i}", seller=self.seller, starting_price=10, current_price=10)
+        self.assertEqual(self.client.get("/api/auctions/", {"since": since}).json(), {"reset": True})
+
+
+class StatusTransitionTests(TestCase):
+    """apply_due_transitions flips due auctions and stamps their change version."""
+
+    def setUp(self):
+        seller = Seller.objects.create(username="seller")
+        now = timezone.now()
+
+        def item(name: str, status: str, start_minutes: int, duration_seconds: int = 3600) -> Item:
+            return Item.objects.create(
+                name=name,
+                seller=seller,
+                starting_price=1,
+                status=status,
+                start_time=now + timedelta(minutes=start_minutes),
+                duration_seconds=duration_seconds,
+            )
+
+        self.starting = item("starting", Item.Status.COMING_SOON, -1)
+        self.not_yet = item("not yet", Item.Status.COMING_SOON, 10)
+        self.ending = item("ending", Item.Status.LIVE, -2, duration_seconds=60)
+        self.sold = item("sold", Item.Status.ENDED, -1)  # ended early by the seller
+
+    def _entry(self, item: Item, kind: str):
+        return (timezone.now(), item.id, kind)
+
+    def test_due_transitions(self):
+        before = current_change_version()
+        changed = apply_due_transitions([
+            self._entry(self.starting, START),
+            self._entry(self.not_yet, START),
+            self._entry(self.ending, END),
+            self._entry(self.sold, START),
+            self._entry(self.sold, END),
+        ])
+        self.assertEqual(changed, {START: [self.starting.id], END: [self.ending.id]})
+
+        statuses = dict(Item.objects.values_list("id", "status"))
+        self.assertEqual(statuses[self.starting.id], Item.Status.LIVE)
+        self.assertEqual(statuses[self.not_yet.id], Item.Status.COMING_SOON)
+        self.assertEqual(statuses[self.ending.id], Item.Status.ENDED)
+        self.assertEqual(statuses[self.sold.id], Item.Status.ENDED)
+
+        versions = dict(Item.objects.values_list("id", "change_version"))
+        self.assertGreater(versions[self.starting.id], before)
+        self.assertGreater(versions[self.ending.id], versions[self.starting.id])
+        self.assertLessEqual(versions[self.not_yet.id], before)
+        self.assertLessEqual(versions[self.sold.id], before)
+        self.assertEqual(current_change_version(), versions[self.ending.id])
+
+
+class ItemEndedSignalTests(TestCase):
+    """item_ended is announced once, when an auction changes to ENDED."""
+
+    def setUp(self):
+        patcher = mock.patch.object(interaction_events, "item_ended")
+        self.item_ended = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.item = Item.objects.create(
+            name="item", seller=Seller.objects.create(username="seller"), starting_price=1, status=Item.Status.LIVE
+        )
+
+    def _save(self, item: Item, **kwargs) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save(**kwargs)
+
+    def test_only_the_change_to_ended_is_announced(self):
+        item = Item.objects.get(id=self.item.id)
+        item.status = Item.Status.ENDED
+        self._save(item, update_fields=["status"])
+        self.assertEqual(self.item_ended.call_args_list, [mock.call(item.id)])
+
+        # Later saves of the ended auction, loaded again or not
+        item.current_price = 5
+        self._save(item)
+        reloaded = Item.objects.get(id=item.id)
+        reloaded.name = "renamed"
+        self._save(reloaded, update_fields=["name"])
+        self._save(reloaded)
+        self.assertEqual(self.item_ended.call_count, 1)
+
+    def test_saves_of_an_open_auction_are_not_announced(self):
+        item = Item.objects.get(id=self.item.id)
+        item.current_price = 5
+        self._save(item, update_fields=["current_price"])
+        self.item_ended.assert_not_called()
+
+
+class OrderBookTests(TransactionTestCase):
+    """LIVE bids decided in memory, then written behind in order."""
+
+    BIDS = 2000
+    WORKERS = 16
+
+    def setUp(self):
+        for producer in ("bid_created", "item_created"):
+            patcher = mock.patch.object(interaction_events, producer)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        seller = Seller.objects.create(username="seller")
+        self.item = Item.objects.create(
+            name="item",
+            seller=seller,
+            starting_price=1,
+            current_price=1,
+            start_time=timezone.now() - timedelta(minutes=1),
+            status=Item.Status.LIVE,
+        )
+        Buyer.objects.bulk_create(Buyer(username=f"buyer{i}") for i in range(self.BIDS))
+        self.buyer_ids = list(Buyer.objects.order_by("id").values_list("id", flat=True))
+
+    def _book(self, flush_ms: int = 20) -> OrderBook:
+        book = OrderBook(flush_ms=flush_ms)
+        book.load()
+        return book
+
+    def test_concurrent_bids_are_flushed_in_order(self):
+        book = self._book()
+        amounts = random.Random(42).sample(range(2, 100000), self.BIDS)
+
+        def place(n: int, amount: float):
+            return book.place(self.item.id, self.buyer_ids[n], amount)
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            outcomes = list(pool.map(place, range(self.BIDS), amounts))
+        self.assertTrue(book.flush(timeout=10))
+
+        top = max(amounts)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_price, top)
+        self.assertEqual(self.item.highest_bidder_id, self.buyer_ids[amounts.index(top)])
+
+        bids = list(Bid.objects.filter(item=self.item).order_by("id"))
+        self.assertEqual(len(bids), self.BIDS)
+        accepted = {self.buyer_ids[n] for n, outcome in enumerate(outcomes) if outcome.accepted}
+        self.assertEqual({b.buyer_id for b in bids if b.status == Bid.Status.ACCEPTED}, accepted)
+        # Written in the order they were decided: prices only went up, times never went back
+        accepted_amounts = [b.amount for b in bids if b.status == Bid.Status.ACCEPTED]
+        self.assertEqual(accepted_amounts, sorted(set(accepted_amounts)))
+        self.assertEqual(accepted_amounts[-1], top)
+        timestamps = [b.timestamp for b in bids]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_bid_keeps_the_time_it_was_placed(self):
+        book = self._book(flush_ms=300)
+        before = timezone.now()
+        self.assertTrue(book.place(self.item.id, self.buyer_ids[0], 5).accepted)
+        after = timezone.now()
+        self.assertTrue(book.flush(timeout=10))
+
+        bid = Bid.objects.get(item=self.item)
+        self.assertTrue(before <= bid.timestamp <= after)
+
+    def test_failed_flush_is_retried(self):
+        book = self._book()
+        bulk_create = Bid.objects.bulk_create
+        calls = []
+
+        def fail_once(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise DatabaseError("disk I/O error")
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Bid.objects, "bulk_create", side_effect=fail_once):
+            with self.assertLogs("core.services.order_book", "ERROR"):
+                for n, amount in enumerate((5, 6, 7)):
+                    self.assertTrue(book.place(self.item.id, self.buyer_ids[n], amount).accepted)
+                self.assertTrue(book.flush(timeout=10))
+
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertEqual(list(Bid.objects.filter(item=self.item).order_by("id").values_list("amount", flat=True)), [5, 6, 7])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_price, 7)
+        self.assertEqual(self.item.highest_bidder_id, self.buyer_ids[2])
+
+    def test_batch_that_keeps_failing_is_written_bid_by_bid(self):
+        book = self._book()
+        bulk_create = Bid.objects.bulk_create
+
+        def fail_on_six(objs, *args, **kwargs):
+            objs = list(objs)
+            if any(b.amount == 6 for b in objs):
+                raise DatabaseError("constraint failed")
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Bid.objects, "bulk_create", side_effect=fail_on_six), \
+                mock.patch("core.services.order_book.MAX_FLUSH_ATTEMPTS", 2):
+            with self.assertLogs("core.services.order_book", "ERROR") as logs:
+                for n, amount in enumerate((5, 6, 7)):
+                    self.assertTrue(book.place(self.item.id, self.buyer_ids[n], amount).accepted)
+                self.assertTrue(book.flush(timeout=10))
+
+        self.assertTrue(any("Dropping bid" in line for line in logs.output))
+        self.assertEqual([pending[2] for pending in book.dead_letters], [6])
+        self.assertEqual(list(Bid.objects.filter(item=self.item).order_by("id").values_list("amount", flat=True)), [5, 7])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.current_price, 7)
+
+    def test_recent_bids_are_loaded_and_kept(self):
+        for n in range(3):
+            Bid.objects.create(item=self.item, buyer_id=self.buyer_ids[n], amount=n + 2, status=Bid.Status.ACCEPTED)
+        with mock.patch("core.services.order_book.RECENT_BIDS", 3):
+            book = self._book()
+            # Rebuilt on first use, from the same query as load()
+            cold = OrderBook()
+            self.assertIsNone(cold.recent_bids(self.item.id))
+            self.assertFalse(cold.place(self.item.id, self.buyer_ids[5], 1).accepted)
+            self.assertEqual([b[1] for b in cold.recent_bids(self.item.id)], [1, 4, 3])
+            self.assertTrue(cold.flush(timeout=10))
+
+            self.assertEqual([b[1] for b in book.recent_bids(self.item.id)], [4, 3, 2])
+            self.assertTrue(book.place(self.item.id, self.buyer_ids[4], 10).accepted)
+            self.assertFalse(book.place(self.item.id, self.buyer_ids[4], 11).accepted)
+            self.assertTrue(book.flush(timeout=10))
+
+        self.assertEqual(
+            [(b[0], b[1], b[2]) for b in book.recent_bids(self.item.id)],
+            [
+                (self.buyer_ids[4], 11, Bid.Status.REJECTED),
+                (self.buyer_ids[4], 10, Bid.Status.ACCEPTED),
+                (self.buyer_ids[2], 4, Bid.Status.ACCEPTED),
+            ],
+        )
+
+
+class MonitorStoreTests(TransactionTestCase):
+    """Concurrent requests of one session cannot both make the same protocol move."""
+
+    def test_memory_store_moves_a_session_once(self):
+        store = MonitorStore()
+        monitors = [store.get("session") for _ in range(16)]
+        barrier = threading.Barrier(len(monitors))
+
+        def bid(monitor) -> bool:
+            barrier.wait()
+            try:
+                monitor.recv_bid_from_buyer()
+                return True
+            except ProtocolViolation:
+                return False
+
+        with ThreadPoolExecutor(max_workers=len(monitors)) as pool:
+            self.assertEqual(sum(pool.map(bid, monitors)), 1)
+        self.assertEqual(store.get("session").state, "BID_RECEIVED")
+
+    def test_database_store_rejects_a_stale_transition(self):
+        store = DatabaseMonitorStore()
+        first, second = store.get("session"), store.get("session")
+        first.recv_bid_from_buyer()
+        with self.assertRaises(ProtocolViolation):
+            second.recv_bid_from_buyer()
+        self.assertEqual(second.state, "START")
+
+        first.send_bidinfo_to_seller()
+        self.assertEqual(store.get("session").state, "WAIT_DECISION")
+
+    def test_database_store_starts_over_after_done(self):
+        store = DatabaseMonitorStore()
+        monitor = store.get("session")
+        for move in ("recv_bid_from_buyer", "send_bidinfo_to_seller", "recv_reject_from_seller", "send_rejectbid_to_buyer"):
+            getattr(monitor, move)()
+        self.assertEqual(store.get("session", strict=True).state, "DONE")
+
+        # A new run from DONE, and a stale one from the same DONE row, race
+        fresh, stale = store.get("session"), store.get("session")
+        fresh.recv_bid_from_buyer()
+        with self.assertRaises(ProtocolViolation):
+            stale.recv_bid_from_buyer()
+
+
+class RecommenderSyncVersionTests(TestCase):
+    """Bids committed out of id order are still sent, exactly once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = Buyer.objects.create(username="buyer")
+        cls.item = Item.objects.create(name="item", seller=Seller.objects.create(username="seller"), starting_price=1)
+
+    def _bid(self, bid_id: int) -> None:
+        Bid.objects.create(id=bid_id, buyer=self.buyer, item=self.item, amount=bid_id)
+
+    def _ratings(self, interactions) -> list:
+        return [i["rating"] for i in interactions]
+
+    def test_late_bid_below_the_mark_is_sent_once(self):
+        client = RecommendationClient()
+        for bid_id in (1, 2, 4, 5):
+            self._bid(bid_id)
+        interactions, _, version = client.build_interactions_since(None)
+        self.assertEqual(self._ratings(interactions), [1, 2, 4, 5])
+        self.assertEqual(version, (5, self.item.id, 3))
+
+        # Bid 3 commits after bids 4 and 5 were sent
+        self._bid(3)
+        self._bid(6)
+        interactions, _, version = client.build_interactions_since(version)
+        self.assertEqual(self._ratings(interactions), [3, 6])
+        self.assertEqual(version, (6, self.item.id))
+
+        interactions, _, same = client.build_interactions_since(version)
+        self.assertEqual((interactions, same), ([], version))
+
+    def test_missing_bid_is_given_up_after_the_window(self):
+        client = RecommendationClient()
+        client._gap_window = 3
+        for bid_id in (1, 3):
+            self._bid(bid_id)
+        _, _, version = client.build_interactions_since(None)
+        self.assertEqual(version, (3, self.item.id, 2))
+
+        for bid_id in (4, 5):
+            self._bid(bid_id)
+        _, _, version = client.build_interactions_since(version)
+        self.assertEqual(version, (5, self.item.id))
+
+
+class RecommenderRestoredVersionTests(TestCase):
+    """The first sync builds on a restored model only if the database has its data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = Buyer.objects.create(username="buyer")
+        seller = Seller.objects.create(username="seller")
+        cls.open = Item.objects.create(name="open", seller=seller, starting_price=1)
+        cls.closed = Item.objects.create(name="closed", seller=seller, starting_price=1, status=Item.Status.ENDED)
+        cls.bids = [Bid.objects.create(buyer=cls.buyer, item=item, amount=2) for item in (cls.open, cls.closed)]
+
+    def _sync(self, server_version):
+        client = RecommendationClient()
+        calls = []
+
+        def call(fn_name, *args):
+            if fn_name == "get_version":
+                return server_version
+            calls.append(args)
+            return args[2]  # acknowledge the version sent
+
+        # The payload stays unpacked: (interactions, new items, closed items)
+        with mock.patch.object(client, "_call", side_effect=call), \
+                mock.patch("core.services.recommender_client.pack_interactions", side_effect=lambda *a: a):
+            client.sync_interactions()
+        return calls
+
+    def test_behind_the_database_gets_the_delta_and_closed_listings(self):
+        server_version = (self.bids[0].id, self.closed.id)
+        [(base, payload, version)] = self._sync(server_version)
+        self.assertEqual(base, server_version)
+        self.assertEqual(version, (self.bids[1].id, self.closed.id))
+        interactions, _, closed = payload
+        self.assertEqual([i["item_id"] for i in interactions], [self.closed.id])
+        self.assertEqual(closed, [self.closed.id])
+
+    def test_ahead_of_the_database_gets_a_full_snapshot(self):
+        with self.assertLogs("core.services.recommender_client", "WARNING"):
+            [(base, payload, _)] = self._sync((self.bids[1].id + 10, self.closed.id))
+        self.assertIsNone(base)
+        self.assertEqual(len(payload[0]), 2)
+
+
+class RecommenderRetryTests(SimpleTestCase):
+    """Only a broken connection is retried; other errors reach the caller untouched."""
+
+    def setUp(self):
+        self.client = RecommendationClient()
+        self.client._synced_version = (1, 1)
+        self.root = mock.Mock()
+        conn = mock.MagicMock(root=self.root)
+        self.pool = mock.Mock()
+        self.pool.connection.return_value.__enter__ = mock.Mock(return_value=conn)
+        self.pool.connection.return_value.__exit__ = mock.Mock(return_value=False)
+        self.client._pool = self.pool
+
+    def test_broken_connection_is_retried_once(self):
+        self.root.get_version.side_effect = [EOFError("closed"), (2, 2)]
+        self.assertEqual(self.client._call_with_retry("get_version"), (2, 2))
+        self.pool.close.assert_called_once()
+        self.assertIsNone(self.client._synced_version)
+
+    def test_other_errors_are_not_retried(self):
+        for error in (ValueError("bad request"), TimeoutError("slow")):
+            self.root.get_version.side_effect = [error, (2, 2)]
+            with self.assertRaises(type(error)):
+                self.client._call_with_retry("get_version")
+        self.pool.close.assert_not_called()
+        self.assertEqual(self.client._synced_version, (1, 1))
+
+
+class RecommenderCircuitBreakerTests(SimpleTestCase):
+    """A half-open trial that never reached the recommender must not wedge the breaker."""
+
+    def setUp(self):
+        self.client = RecommendationClient()
+        self.client._breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        self.client._breaker.record_failure()
+
+    def test_pool_timeout_during_trial_gives_the_slot_back(self):
+        with mock.patch.object(self.client, "_call_with_retry", side_effect=PoolTimeout("busy")):
+            with self.assertRaises(PoolTimeout):
+                self.client._call("get_version")
+        self.assertEqual(self.client._breaker.state, HALF_OPEN)
+
+        with mock.patch.object(self.client, "_call_with_retry", return_value=(1, 1)):
+            self.assertEqual(self.client._call("get_version"), (1, 1))
+        self.assertEqual(self.client._breaker.state, CLOSED)
+
+    def test_trial_slots_are_still_limited(self):
+        breaker = self.client._breaker
+        breaker.before_call()
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+        breaker.release()
+        breaker.before_call()
@@ -14,6 +14,7 @@ from .views import (
     api_auctions,
     api_auction_state,
     api_seller_auctions,
+    api_live_updates,
 )
 
 urlpatterns = [
@@ -40,4 +41,7 @@ urlpatterns = [
     path("api/auctions/", api_auctions, name="api_auctions"),
     path("api/auction/<int:item_id>/state/", api_auction_state, name="api_auction_state"),
     path("api/seller/<int:seller_id>/auctions/", api_seller_auctions, name="api_seller_auctions"),
+
+    # Push channel (Server-Sent Events; needs the ASGI server)
+    path("api/live/", api_live_updates, name="api_live_updates"),
 ]
@@ -1,24 +1,30 @@
+import asyncio
+import base64
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
-from django.http import JsonResponse, HttpRequest
+from django.db.models import Max, Prefetch, Q
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpRequest, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import Buyer, Item, Bid
+from .models import Buyer, Item, Bid, current_change_version, stamp_change_version
 from .services.protocol_checker import AuctionBiddingMonitor, ProtocolViolation
-from .services.recommender_client import recommender_client
+from .services.async_recommender_client import async_recommender_client
+from .services.live_updates import live_updates
+from .services.order_book import order_book
 
-from datetime import timedelta
 from django.shortcuts import redirect
 from django.utils import timezone
 from django.db import transaction
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, aget_object_or_404
 from .models import Buyer, Bid, Item
 
 
 from .models import Seller  # add Seller import
-_BIDDING_MONITORS: Dict[str, AuctionBiddingMonitor] = {}
+from .services.monitor_store import monitor_store
 
 
 def _get_monitor(session_id: str, strict: bool = False) -> AuctionBiddingMonitor:
@@ -28,58 +34,19 @@ def _get_monitor(session_id: str, strict: bool = False) -> AuctionBiddingMonitor
     the monitor automatically once it reaches DONE.
 
     If strict=True, we do NOT reset on DONE (useful to demonstrate violations).
-    """
-    monitor = _BIDDING_MONITORS.get(session_id)
-    if monitor is None:
-        monitor = AuctionBiddingMonitor()
-        _BIDDING_MONITORS[session_id] = monitor
-        return monitor
-
-    if (not strict) and getattr(monitor, "state", None) == "DONE":
-        monitor = AuctionBiddingMonitor()
-        _BIDDING_MONITORS[session_id] = monitor
 
-    return monitor
+    Monitors are kept in a bounded store (services/monitor_store.py), shared
+    by all workers if PROTOCOL_MONITOR_BACKEND = "database".
+    """
+    return monitor_store.get(session_id, strict=strict)
 
 
 
 def hello(request):
     return render(request, "core/hello.html")
 
-# --- ADD these helper functions somewhere near the top (after hello is fine) ---
-def _refresh_item_status(item: Item) -> bool:
-    """
-    Recompute status from timing:
-    - before start_time -> COMING_SOON
-    - between start_time and end_time -> LIVE
-    - after end_time -> ENDED
-
-    Returns True if status changed (and was saved).
-    """
-    now = timezone.now()
-    end_time = item.start_time + timedelta(seconds=int(item.duration_seconds))
-
-    if now < item.start_time:
-        new_status = Item.Status.COMING_SOON
-    elif now >= end_time:
-        new_status = Item.Status.ENDED
-    else:
-        new_status = Item.Status.LIVE
-
-    if item.status != new_status:
-        item.status = new_status
-        item.save(update_fields=["status"])
-        return True
-    return False
-
-
-def _refresh_items_status(items) -> None:
-    # If seller ended it early (direct sale), NEVER override it via timing rules.
-    for it in items:
-        if it.status == Item.Status.ENDED:
-            return False
-        _refresh_item_status(it)
-
+# Statuses (COMING_SOON / LIVE / ENDED) are kept up to date by the
+# scheduler in services/status_scheduler.py, so views only read them.
 
 def _item_time_remaining_seconds(item: Item) -> int:
     """
@@ -89,14 +56,13 @@ def _item_time_remaining_seconds(item: Item) -> int:
     - ENDED: 0
     """
     now = timezone.now()
-    end_time = item.start_time + timedelta(seconds=int(item.duration_seconds))
 
     if item.status == Item.Status.COMING_SOON:
         remaining = int((item.start_time - now).total_seconds())
         return max(0, remaining)
 
     if item.status == Item.Status.LIVE:
-        remaining = int((end_time - now).total_seconds())
+        remaining = int((item.end_time - now).total_seconds())
         return max(0, remaining)
 
     return 0
@@ -191,7 +157,6 @@ def buyer_auction_detail(request: HttpRequest, item_id: int):
     buyers = Buyer.objects.order_by("username")
     try:
         item = Item.objects.select_related("seller", "highest_bidder").get(id=item_id)
-        _refresh_item_status(item)
     except Item.DoesNotExist:
         return render(request, "core/buyer_auction_detail.html", {"buyers": buyers, "error": "Auction not found."}, status=404)
 
@@ -201,17 +166,127 @@ def buyer_auction_detail(request: HttpRequest, item_id: int):
         {"buyers": buyers, "item_id": item.id},
     )
 
-# --- ADD JSON polling endpoints ---
-def api_auctions(request: HttpRequest):
+# --- Keyset pagination for the listing endpoints ---
+# Pages are ordered newest first (-id). The cursor is an opaque token for
+# the last id of the previous page, so a page costs one index range scan
+# however many auctions exist, and new auctions never shift later pages.
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"before_id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token: str) -> int:
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    return int(json.loads(raw)["before_id"])
+
+
+def _listing_filters(request: HttpRequest, items, since: Optional[int] = None):
+    """
+    Applies the shared ?status= filter ("ALL" or absent = no filter).
+    Raises ValueError for unknown statuses. Not applied to ?since= deltas:
+    an auction that left the filter is reported too, so the client can
+    drop it.
+    """
     status_filter = request.GET.get("status")  # LIVE / COMING_SOON / ENDED or None
+    if status_filter and status_filter != "ALL":
+        if status_filter not in Item.Status.values:
+            raise ValueError(f"Unknown status: {status_filter}")
+        if since is None:
+            items = items.filter(status=status_filter)
+    return items
 
-    qs = Item.objects.select_related("seller", "highest_bidder").all().order_by("-id")
-    items = list(qs)
 
-    _refresh_items_status(items)
+def _keyset_page(request: HttpRequest, items) -> Tuple[List[Item], Optional[str]]:
+    """
+    Returns (one page of `items`, cursor of the next page or None), using
+    ?limit= and ?cursor=. Raises ValueError for invalid parameters.
+    """
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            items = items.filter(id__lt=_decode_cursor(cursor))
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+
+    # One extra row tells whether there is a next page
+    page = list(items.order_by("-id")[:limit + 1])
+    next_cursor = _encode_cursor(page[limit - 1].id) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+# --- Delta polling (?since=) ---
+# Every write to an Item or Bid stamps it with a new change version (see
+# models.next_change_version). Responses carry the current "version"; a
+# client passing it back as ?since= gets 304 if nothing changed at all, or
+# only the rows changed after it. When more than MAX_PAGE_SIZE rows changed
+# the response is {"reset": true} and the client reloads from scratch.
+# Deletions are not tracked: the app never deletes auctions or bids.
+
+
+def _parse_since(request: HttpRequest) -> Optional[int]:
+    since = request.GET.get("since")
+    if not since:
+        return None
+    if not since.isdigit():
+        raise ValueError("since must be a change version")
+    return int(since)
+
 
-    if status_filter:
-        items = [it for it in items if it.status == status_filter]
+def _changed_since(items, changed: Q) -> Optional[List[Item]]:
+    """The rows of `items` matching `changed`, or None if there are too many."""
+    rows = list(items.filter(changed).order_by("-id")[:MAX_PAGE_SIZE + 1])
+    return None if len(rows) > MAX_PAGE_SIZE else rows
+
+
+# --- ADD JSON polling endpoints ---
+def api_auctions(request: HttpRequest):
+    """
+    GET /api/auctions/?limit=&cursor=&status=&seller=&ids=&since=
+    One page of auctions, newest first, plus "next_cursor" (null on the
+    last page). `ids` (comma-separated) restricts it to those auctions.
+    With `since`, the auctions changed after that version instead.
+    """
+    items = Item.objects.select_related("seller", "highest_bidder")
+    try:
+        since = _parse_since(request)
+        items = _listing_filters(request, items, since)
+        seller_id = request.GET.get("seller")
+        if seller_id:
+            if not seller_id.isdigit():
+                raise ValueError("seller must be a seller id")
+            items = items.filter(seller_id=int(seller_id))
+        ids = request.GET.get("ids")
+        if ids:
+            if not all(part.strip().isdigit() for part in ids.split(",")):
+                raise ValueError("ids must be comma-separated auction ids")
+            items = items.filter(id__in=[int(part) for part in ids.split(",")])
+
+        # Read before the rows: a change committed in between is sent again, not lost
+        version = current_change_version()
+        next_cursor = None
+        if since is None:
+            items, next_cursor = _keyset_page(request, items)
+        elif since == version:
+            return HttpResponseNotModified()
+        elif since > version:
+            return JsonResponse({"reset": True})
+        else:
+            items = _changed_since(items, Q(change_version__gt=since))
+            if items is None:
+                return JsonResponse({"reset": True})
+    except ValueError as ex:
+        return JsonResponse({"error": str(ex)}, status=400)
 
     data = []
     for it in items:
@@ -228,16 +303,39 @@ def api_auctions(request: HttpRequest):
             }
         )
 
-    return JsonResponse({"auctions": data})
+    return JsonResponse({"auctions": data, "next_cursor": next_cursor, "version": version})
 
 
 def api_auction_state(request: HttpRequest, item_id: int):
+    """
+    GET /api/auction/<item_id>/state/?since=
+    The auction and its 10 most recent bids. "version" is the newest change
+    to the auction or any of its bids; passing it as `since` returns 304
+    until one of them changes, or {"reset": true} if it is from the future
+    (e.g. the database was reset).
+    """
+    try:
+        since = _parse_since(request)
+    except ValueError as ex:
+        return JsonResponse({"error": str(ex)}, status=400)
+    if since is not None:
+        current = current_change_version()
+        if since == current:
+            # Nothing changed anywhere
+            return HttpResponseNotModified()
+        if since > current:
+            return JsonResponse({"reset": True})
+
     try:
         item = Item.objects.select_related("seller", "highest_bidder").get(id=item_id)
-        _refresh_item_status(item)
     except Item.DoesNotExist:
         return JsonResponse({"error": "Auction not found"}, status=404)
 
+    bids_version = Bid.objects.filter(item=item).aggregate(v=Max("change_version"))["v"]
+    version = max(item.change_version, bids_version or 0)
+    if since is not None and version <= since:
+        return HttpResponseNotModified()
+
     bids = (
         Bid.objects.select_related("buyer")
         .filter(item=item)
@@ -267,41 +365,61 @@ def api_auction_state(request: HttpRequest, item_id: int):
                 }
                 for b in bids
             ],
+            "version": version,
         }
     )
 
 
 def api_seller_auctions(request: HttpRequest, seller_id: int):
+    """
+    GET /api/seller/<seller_id>/auctions/?limit=&cursor=&status=&since=
+    One page of the seller's auctions with their pending bids, in a fixed
+    number of queries (seller, version, auctions, pending bids).
+    """
     try:
         seller = Seller.objects.get(id=seller_id)
     except Seller.DoesNotExist:
         return JsonResponse({"error": "Seller not found"}, status=404)
 
-    items = list(
+    # Pending bids, so the seller can confirm/reject from the dashboard: one
+    # query for the whole page, reading only the columns that are sent
+    pending_bids = Prefetch(
+        "bid_set",
+        queryset=Bid.objects.select_related("buyer")
+        .filter(status=Bid.Status.PENDING)
+        .only("id", "item", "amount", "timestamp", "buyer__username")
+        .order_by("-timestamp"),
+        to_attr="pending_bids",
+    )
+    items = (
         Item.objects.select_related("highest_bidder")
         .filter(seller=seller)
-        .order_by("-id")
-    )
-    _refresh_items_status(items)
-
-    # Include pending bids so seller can confirm/reject from dashboard
-    item_ids = [it.id for it in items]
-    pending_bids = (
-        Bid.objects.select_related("buyer", "item")
-        .filter(item_id__in=item_ids, status=Bid.Status.PENDING)
-        .order_by("-timestamp")
+        .only("id", "name", "status", "current_price", "start_time", "end_time", "highest_bidder__username")
+        .prefetch_related(pending_bids)
     )
 
-    pending_by_item: Dict[int, list] = {}
-    for b in pending_bids:
-        pending_by_item.setdefault(b.item_id, []).append(
-            {
-                "id": b.id,
-                "buyer": b.buyer.username,
-                "amount": float(b.amount),
-                "timestamp": b.timestamp.isoformat(),
-            }
-        )
+    # Same ?limit= / ?cursor= / ?status= / ?since= parameters as api_auctions
+    try:
+        since = _parse_since(request)
+        items = _listing_filters(request, items, since)
+        version = current_change_version()
+        next_cursor = None
+        if since is None:
+            items, next_cursor = _keyset_page(request, items)
+        elif since == version:
+            return HttpResponseNotModified()
+        elif since > version:
+            return JsonResponse({"reset": True})
+        else:
+            # A new or decided bid changes the auction's pending bids
+            bid_changes = Bid.objects.filter(item__seller=seller, change_version__gt=since)
+            items = _changed_since(
+                items, Q(change_version__gt=since) | Q(id__in=bid_changes.values("item_id"))
+            )
+            if items is None:
+                return JsonResponse({"reset": True})
+    except ValueError as ex:
+        return JsonResponse({"error": str(ex)}, status=400)
 
     data = []
     for it in items:
@@ -313,29 +431,150 @@ def api_seller_auctions(request: HttpRequest, seller_id: int):
                 "current_price": float(it.current_price),
                 "highest_bidder": it.highest_bidder.username if it.highest_bidder else None,
                 "time_remaining_seconds": _item_time_remaining_seconds(it),
-                "pending_bids": pending_by_item.get(it.id, []),
+                "pending_bids": [
+                    {
+                        "id": b.id,
+                        "buyer": b.buyer.username,
+                        "amount": float(b.amount),
+                        "timestamp": b.timestamp.isoformat(),
+                    }
+                    for b in it.pending_bids
+                ],
             }
         )
 
-    return JsonResponse({"seller": seller.username, "auctions": data})
+    return JsonResponse(
+        {"seller": seller.username, "auctions": data, "next_cursor": next_cursor, "version": version}
+    )
 
-def recommend_for_user(request, user_id: int):
+async def api_live_updates(request: HttpRequest):
+    """
+    GET /api/live/?item=<id> | ?seller=<id>  (Server-Sent Events, ASGI only)
+    Pushes an "auction" event with the full row whenever an auction (or one
+    of its bids) changes, limited to one auction or one seller's auctions
+    if asked. A "reset" event means updates were dropped: reload.
+    """
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for the whole stream: pages keep polling
+        return JsonResponse({"error": "Live updates need the ASGI server"}, status=501)
+
+    filters: Dict[str, int] = {}
+    for param, key in (("item", "item_id"), ("seller", "seller_id")):
+        value = request.GET.get(param)
+        if value:
+            if not value.isdigit():
+                return JsonResponse({"error": f"{param} must be an id"}, status=400)
+            filters[key] = int(value)
+
+    keepalive = getattr(settings, "LIVE_UPDATES_KEEPALIVE_SECONDS", 15)
+    subscription = live_updates.subscribe(**filters)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), keepalive)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event.get('auction'))}\n\n"
+        finally:
+            live_updates.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def recommend_for_user(request, user_id: int):
     top_n = int(request.GET.get("top_n", "10"))
-    recommendations = recommender_client.get_recommendations_for_user(user_id=user_id, top_n=top_n)
+    try:
+        recommendations = await async_recommender_client.get_recommendations_for_user(user_id=user_id, top_n=top_n)
+    except asyncio.TimeoutError:
+        return JsonResponse({"error": "Recommendation Service timed out", "user_id": user_id}, status=504)
     return JsonResponse({"user_id": user_id, "top_n": top_n, "recommendations": recommendations})
 
 
-def _is_auto_accept_live_bid(item: Item, buyer: Buyer, amount: float) -> bool:
-    if item.status != Item.Status.LIVE:
-        return False
+def _place_live_bid(item: Item, buyer: Buyer, amount: float) -> Tuple[Bid, bool]:
+    """
+    Records a bid on a LIVE auction and accepts it if it is higher than the
+    current price and the buyer is not already the highest bidder. The check
+    and the price update are a single conditional UPDATE (compare-and-set)
+    in one short transaction, so concurrent bidders never overwrite a higher
+    price. Returns (bid, accepted); `item` is updated to the stored price.
+    """
+    with transaction.atomic():
+        accepted = bool(
+            Item.objects.filter(id=item.id, status=Item.Status.LIVE, current_price__lt=amount)
+            .exclude(highest_bidder=buyer)
+            .update(current_price=amount, highest_bidder=buyer)
+        )
+        # Bid.save() takes the change version last, after the compare-and-set
+        bid = Bid.objects.create(
+            buyer=buyer,
+            item=item,
+            amount=amount,
+            status=Bid.Status.ACCEPTED if accepted else Bid.Status.REJECTED,
+        )
+        if accepted:
+            Item.objects.filter(id=item.id).update(change_version=bid.change_version)
+        else:
+            item.refresh_from_db(fields=["current_price", "highest_bidder"])
 
-    if amount <= float(item.current_price):
-        return False
+    if accepted:
+        item.current_price = amount
+        item.highest_bidder = buyer
+    return bid, accepted
 
-    if item.highest_bidder is not None and item.highest_bidder.id == buyer.id:
-        return False
 
-    return True
+def _place_bid_in_order_book(
+    monitor: AuctionBiddingMonitor, session_id: str, buyer_id: int, item_id: int, amount: float
+) -> Optional[JsonResponse]:
+    """
+    The LIVE branch of place_bid, decided by the in-memory order book. The
+    bid is written in the background, so "bid_id" is null. Returns None if
+    the book cannot decide the bid (the database path takes over).
+    """
+    try:
+        # Buyer -> Auction: Bid(), then Auction -> Seller: BidInfo()
+        state = monitor.state
+        monitor.recv_bid_from_buyer()
+        outcome = order_book.place(item_id, buyer_id, amount)
+        if outcome is None:
+            # Not decided here: undo Bid() so the database path receives it
+            monitor.state = state
+            return None
+        monitor.send_bidinfo_to_seller()
+
+        if outcome.accepted:
+            monitor.recv_confirm_from_seller()
+            monitor.send_acceptbid_to_buyer()
+        else:
+            monitor.recv_reject_from_seller()
+            monitor.send_rejectbid_to_buyer()
+    except ProtocolViolation as ex:
+        return JsonResponse(
+            {"error": "Protocol violation", "details": str(ex), "session_id": session_id},
+            status=409,
+        )
+
+    data: Dict[str, Any] = {
+        "session_id": session_id,
+        "status": "ACCEPTED" if outcome.accepted else "REJECTED",
+        "bid_id": None,
+        "buyer_id": buyer_id,
+        "seller_id": outcome.seller_id,
+        "item_id": item_id,
+        "amount": amount,
+        "current_price": outcome.current_price,
+        "highest_bidder_id": outcome.highest_bidder_id,
+    }
+    if not outcome.accepted:
+        data["reason"] = "Bid must be higher than current price and bidder must not already be highest bidder."
+    return JsonResponse(data)
 
 
 @csrf_exempt
@@ -369,6 +608,18 @@ def place_bid(request: HttpRequest):
     if buyer_id is None or item_id is None or amount is None:
         return JsonResponse({"error": "Missing required fields: buyer_id, item_id, amount"}, status=400)
 
+    strict = str(request.GET.get("strict", "0")) == "1"
+    monitor = _get_monitor(session_id, strict=strict)
+
+    # LIVE auctions are decided in memory when the order book is enabled
+    if order_book.enabled:
+        try:
+            response = _place_bid_in_order_book(monitor, session_id, int(buyer_id), int(item_id), float(amount))
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invalid types for buyer_id/item_id/amount"}, status=400)
+        if response is not None:
+            return response
+
     try:
         buyer = Buyer.objects.get(id=int(buyer_id))
         item = Item.objects.select_related("seller", "highest_bidder").get(id=int(item_id))
@@ -380,9 +631,6 @@ def place_bid(request: HttpRequest):
     except Exception:
         return JsonResponse({"error": "Invalid types for buyer_id/item_id/amount"}, status=400)
 
-    strict = str(request.GET.get("strict", "0")) == "1"
-    monitor = _get_monitor(session_id, strict=strict)
-
 
     try:
         # Buyer -> Auction: Bid()
@@ -408,22 +656,15 @@ def place_bid(request: HttpRequest):
             )
 
         if item.status == Item.Status.LIVE:
-            bid = Bid.objects.create(buyer=buyer, item=item, amount=bid_amount, status=Bid.Status.PENDING)
-
             # Auction -> Seller: BidInfo() (Option B: conceptual notify)
             monitor.send_bidinfo_to_seller()
 
-            if _is_auto_accept_live_bid(item, buyer, bid_amount):
+            bid, accepted = _place_live_bid(item, buyer, bid_amount)
+
+            if accepted:
                 # Seller -> Auction: Confirm() (auto-confirm)
                 monitor.recv_confirm_from_seller()
 
-                bid.status = Bid.Status.ACCEPTED
-                bid.save()
-
-                item.current_price = bid_amount
-                item.highest_bidder = buyer
-                item.save()
-
                 # Auction -> Buyer: AcceptBid()
                 monitor.send_acceptbid_to_buyer()
 
@@ -443,9 +684,6 @@ def place_bid(request: HttpRequest):
 
             # Auto-reject if not valid
             monitor.recv_reject_from_seller()  # auto-reject (Option B)
-            bid.status = Bid.Status.REJECTED
-            bid.save()
-
             monitor.send_rejectbid_to_buyer()
 
             return JsonResponse(
@@ -459,7 +697,7 @@ def place_bid(request: HttpRequest):
                     "item_id": item.id,
                     "amount": bid.amount,
                     "current_price": item.current_price,
-                    "highest_bidder_id": item.highest_bidder.id if item.highest_bidder else None,
+                    "highest_bidder_id": item.highest_bidder_id,
                 }
             )
 
@@ -526,6 +764,17 @@ def decide_bid(request: HttpRequest, bid_id: int):
                 bid = Bid.objects.select_related("buyer", "item").select_for_update().get(id=bid.id)
                 item = Item.objects.select_for_update().get(id=item.id)
 
+                # Reject all other pending bids for this item. Written before
+                # the saves below, which take the change version: it is the
+                # last lock of every writer
+                rejected = list(
+                    Bid.objects.select_for_update()
+                    .filter(item=item, status=Bid.Status.PENDING)
+                    .exclude(id=bid.id)
+                    .values_list("id", flat=True)
+                )
+                Bid.objects.filter(id__in=rejected).update(status=Bid.Status.REJECTED)
+
                 bid.status = Bid.Status.ACCEPTED
                 bid.save(update_fields=["status"])
 
@@ -537,9 +786,7 @@ def decide_bid(request: HttpRequest, bid_id: int):
                 # IMPORTANT: end listing immediately (direct sale)
                 item.status = Item.Status.ENDED
                 item.save(update_fields=["current_price", "highest_bidder", "status"])
-
-                # Reject all other pending bids for this item
-                Bid.objects.filter(item=item, status=Bid.Status.PENDING).exclude(id=bid.id).update(status=Bid.Status.REJECTED)
+                Bid.objects.filter(id__in=rejected).update(change_version=item.change_version)
 
             monitor.send_acceptbid_to_buyer()
 
@@ -573,7 +820,7 @@ def decide_bid(request: HttpRequest, bid_id: int):
             status=409,
         )
 
-def buyer_dashboard(request: HttpRequest, user_id: int):
+async def buyer_dashboard(request: HttpRequest, user_id: int):
     """
     Buyer Dashboard (demo mode)
     - URL: /buyer/<user_id>/
@@ -581,22 +828,24 @@ def buyer_dashboard(request: HttpRequest, user_id: int):
     - Fetches recommendations from the separate service
     """
     # Get buyer or 404
-    buyer = get_object_or_404(Buyer, id=user_id)
+    buyer = await aget_object_or_404(Buyer, id=user_id)
 
-    # Auctions this buyer has bid on
-    items = (
-        Item.objects.select_related("seller", "highest_bidder")
+    # Auctions this buyer has bid on (evaluated here: templates can't query async)
+    items = [
+        it async for it in Item.objects.select_related("seller", "highest_bidder")
         .filter(bid__buyer=buyer)
         .distinct()
         .order_by("-id")
-    )
+    ]
 
     # Recommendations from Raisa's service
     try:
-        recommendations = recommender_client.get_recommendations_for_user(user_id=buyer.id, top_n=5)
+        recommendations = await async_recommender_client.get_recommendations_for_user(user_id=buyer.id, top_n=5)
         print("Recommender output for buyer", buyer.id, ":", recommendations)
 
-        recommended_items = Item.objects.filter(id__in=[r["item_id"] for r in recommendations])
+        recommended_items = [
+            it async for it in Item.objects.filter(id__in=[r["item_id"] for r in recommendations])
+        ]
     except Exception:
         recommended_items = []
 
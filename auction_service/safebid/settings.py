@@ -78,6 +78,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Seconds a write waits for SQLite's database lock (default 5):
+        # bids on a busy auction queue up briefly instead of failing
+        'OPTIONS': {'timeout': 20},
+        # On disk rather than in memory: SQLite's shared in-memory database
+        # fails concurrent writers at once instead of waiting for the lock,
+        # which the concurrent bidding tests rely on
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -127,3 +134,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 RECOMMENDER_HOST = "127.0.0.1"
 RECOMMENDER_PORT = 18861
 RECOMMENDER_TIMEOUT_SECONDS = 3
+# Client-side result cache; 0 disables it (the recommender keeps its own cache)
+RECOMMENDER_CLIENT_CACHE_TTL_SECONDS = 0
+RECOMMENDER_CLIENT_CACHE_SIZE = 1000
+# RPyC connection pool (one connection per concurrent request)
+RECOMMENDER_POOL_SIZE = 8
+RECOMMENDER_POOL_IDLE_SECONDS = 60
+RECOMMENDER_POOL_HEALTH_CHECK_SECONDS = 30
+RECOMMENDER_POOL_CHECKOUT_TIMEOUT_SECONDS = 2
+# Circuit breaker: after BREAKER_FAILURES failed calls in a row, calls fail
+# fast for BREAKER_RESET_SECONDS; meanwhile the last good result (kept for
+# DEGRADED_CACHE_SECONDS) or the most bid-on open items are served
+RECOMMENDER_BREAKER_FAILURES = 3
+RECOMMENDER_BREAKER_RESET_SECONDS = 10
+RECOMMENDER_DEGRADED_CACHE_SECONDS = 3600
+# Async views: threads running recommender calls, and how long a request waits
+RECOMMENDER_ASYNC_WORKERS = 8
+RECOMMENDER_ASYNC_TIMEOUT_SECONDS = 2
+# New bids/listings are pushed in batches: at most every FLUSH_MS, or as
+# soon as BATCH_SIZE events wait; beyond QUEUE_SIZE a full resync is used
+RECOMMENDER_EVENT_FLUSH_MS = 200
+RECOMMENDER_EVENT_BATCH_SIZE = 100
+RECOMMENDER_EVENT_QUEUE_SIZE = 10000
+
+# Auctions go LIVE / ENDED on schedule (core/services/status_scheduler.py);
+# the heap is also reloaded from the database every RESCAN_SECONDS
+AUCTION_STATUS_SCHEDULER = True
+AUCTION_STATUS_RESCAN_SECONDS = 60
+
+# Bidding protocol monitors per client session (core/services/monitor_store.py):
+# "memory" (per process, LRU-bounded) or "database" (shared by all workers)
+PROTOCOL_MONITOR_BACKEND = "memory"
+PROTOCOL_MONITOR_MAX_SESSIONS = 10000
+PROTOCOL_MONITOR_TTL_SECONDS = 1800  # idle sessions start a new protocol run
+
+# In-memory order book for LIVE bids (core/services/order_book.py), written
+# to the database in batches every FLUSH_MS. Per process: only enable it
+# when a single process serves bids.
+AUCTION_ORDER_BOOK = False
+AUCTION_ORDER_BOOK_FLUSH_MS = 100
+
+# Live update stream (/api/live/, core/services/live_updates.py)
+LIVE_UPDATES_BATCH_MS = 50  # changes collected before one load + fan-out
+LIVE_UPDATES_QUEUE_SIZE = 100  # events a slow client may lag behind before a reset
+LIVE_UPDATES_KEEPALIVE_SECONDS = 15
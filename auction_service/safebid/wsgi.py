@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safebid.settings')
 
 application = get_wsgi_application()
+
+# Background status transitions for the serving process (not started by
+# management commands or the test runner, which never import this module)
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, "AUCTION_STATUS_SCHEDULER", True):
+    from core.services.status_scheduler import status_scheduler  # noqa: E402
+    status_scheduler.start()
+
+if getattr(settings, "AUCTION_ORDER_BOOK", False):
+    from core.services.order_book import order_book  # noqa: E402
+    order_book.load()
@@ -9,13 +9,24 @@ This package contains:
 The main user-facing functions are:
     get_recommendations_for_user(user_id, top_n)
     get_similar_items(item_id, top_n)
+
+and their batch variants:
+    get_recommendations_for_users(user_ids, top_n)
+    get_similar_items_many(item_ids, top_n)
 """
 
-from .algorithms import get_recommendations_for_user, get_similar_items
+from .algorithms import (
+    get_recommendations_for_user,
+    get_recommendations_for_users,
+    get_similar_items,
+    get_similar_items_many,
+)
 from .data_loader import load_interactions
 
 __all__ = [
     "get_recommendations_for_user",
+    "get_recommendations_for_users",
     "get_similar_items",
+    "get_similar_items_many",
     "load_interactions",
 ]
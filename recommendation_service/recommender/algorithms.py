@@ -1,113 +1,586 @@
-from typing import List, Dict, Any
+import os
+import threading
+import time
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence, Set, Tuple
 import numpy as np # type: ignore
-import pandas as pd # type: ignore
-from sklearn.metrics.pairwise import cosine_similarity # type: ignore
 
-from .data_loader import load_interactions
+from .builder import BuildJob, ModelBuilder
+from .cache import ResultCache
+from .data_loader import (
+    Interactions, ended_items, interaction_columns, interaction_timestamps, load_interactions, new_items,
+)
+from .dense import DenseModel
+from . import persistence
+from .neighbours import TopKModel
+from .sparse import SparseModel
+from .trending import TrendingIndex
 
 
-# Cached data structures (lazy-loaded)
-_INTERACTION_MATRIX = None
-_ITEM_IDS = None
-_USER_IDS = None
-_ITEM_SIMILARITY = None
+# Which engine serves queries:
+#   "auto"   – dense up to DENSE_MAX_ITEMS items, sparse above (default)
+#   "dense"  – pandas pivot table + full item×item similarity matrix
+#   "sparse" – scipy CSR user×item matrix, similarities computed on demand
+#   "topk"   – CSR user×item matrix + pruned top-K neighbour index per item
+ENGINE = os.getenv("RECOMMENDER_ENGINE", "auto").lower()
 
+# Every incremental update of the dense engine copies both of its
+# matrices (see dense.py), so "auto" only picks it for small catalogs.
+# The choice is made on each full rebuild.
+DENSE_MAX_ITEMS = int(os.getenv("RECOMMENDER_DENSE_MAX_ITEMS", "1000"))
 
-def _ensure_models_loaded():
+# fallback mock data so service still works
+_FALLBACK_INTERACTIONS = [
+    {"user_id": 1, "item_id": 101, "rating": 5},
+    {"user_id": 1, "item_id": 102, "rating": 3},
+    {"user_id": 2, "item_id": 101, "rating": 4},
+    {"user_id": 2, "item_id": 103, "rating": 2},
+    {"user_id": 3, "item_id": 104, "rating": 5},
+]
+
+_MODEL_ENGINES = {"dense": DenseModel, "sparse": SparseModel, "topk": TopKModel}
+
+
+class Snapshot(NamedTuple):
+    """
+    A complete model as served to queries. Never modified once published;
+    updates build a new one and replace the module reference.
+    """
+    model: Any
+    # Version of the auction-service data the model holds (chosen by the
+    # client, e.g. its (last bid id, last item id) high-water mark).
+    # None = not synced (CSV / mock data).
+    version: Optional[Tuple[int, ...]]
+    # Bumped on every full rebuild; part of every result cache key
+    generation: int
+    # Fallback ranking for unknown / cold-start users
+    trending: TrendingIndex
+
+
+# The snapshot queries read. Only the builder thread assigns it, and a
+# module attribute assignment is atomic, so readers never see a torn model.
+_SNAPSHOT: Optional[Snapshot] = None
+
+# Version the queued builds will reach; what sync callers build on.
+# Guarded by _MODEL_LOCK together with the order jobs are submitted in.
+_ACCEPTED_VERSION: Optional[Tuple[int, ...]] = None
+_MODEL_LOCK = threading.RLock()
+
+# Saved snapshot bookkeeping (builder thread only): when the last one was
+# written, its name, and which users / items changed since then
+_LAST_SAVE = 0.0
+_SNAPSHOT_NAME: Optional[str] = None
+_UNSAVED_USERS: Set[int] = set()
+_UNSAVED_ITEMS: Set[int] = set()
+
+# Multi-process serving (see rpyc_server/workers.py): the leader saves
+# every update so followers, which never build, can map it
+_SAVE_EVERY_UPDATE = False
+_FOLLOWER = False
+
+# Recent query results, invalidated per user / item on incremental updates
+_RESULT_CACHE = ResultCache(
+    max_entries=int(os.getenv("RECOMMENDER_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("RECOMMENDER_CACHE_TTL_SECONDS", "300")),
+)
+
+
+def _new_model(interactions: Interactions):
+    """Builds a model of the configured engine from a list of interactions."""
+    users, items, ratings = interaction_columns(interactions)
+    if len(users) == 0:
+        users, items, ratings = interaction_columns(_FALLBACK_INTERACTIONS)
+
+    engine = _MODEL_ENGINES.get(ENGINE)
+    if engine is None:
+        engine = DenseModel if len(np.unique(items)) <= DENSE_MAX_ITEMS else SparseModel
+    return engine.from_interactions({"user_id": users, "item_id": items, "rating": ratings})
+
+
+def _merge_deltas(deltas: List[Interactions]) -> Dict[str, np.ndarray]:
+    """Concatenates several interaction batches into one columnar batch."""
+    columns: Dict[str, List[np.ndarray]] = {
+        "user_id": [], "item_id": [], "rating": [], "timestamp": [], "new_items": [], "ended_items": [],
+    }
+    for delta in deltas:
+        users, items, ratings = interaction_columns(delta)
+        columns["user_id"].append(users)
+        columns["item_id"].append(items)
+        columns["rating"].append(ratings)
+        columns["timestamp"].append(interaction_timestamps(delta))
+        columns["new_items"].append(new_items(delta))
+        columns["ended_items"].append(ended_items(delta))
+    return {
+        key: np.concatenate(parts) if parts else np.empty(0)
+        for key, parts in columns.items()
+    }
+
+
+# ---------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------
+
+# Saved next to the model's own arrays
+_TRENDING_PREFIX = "trending."
+
+def _restore(name: Optional[str] = None) -> Optional[Tuple[Snapshot, Dict[str, Any]]]:
     """
-    Lazily loads and builds the item similarity model.
-    This prevents recomputation on every request.
+    Memory-maps the named (default: current) saved model of this engine.
+    Returns (snapshot, manifest), or None if there is none.
     """
-    global _INTERACTION_MATRIX, _ITEM_IDS, _USER_IDS, _ITEM_SIMILARITY
+    if persistence.SNAPSHOT_DIR is None:
+        return None
+
+    # "auto" saves whichever engine it picked
+    engines = [ENGINE] if ENGINE in _MODEL_ENGINES else ["dense", "sparse"]
+    try:
+        for engine in engines:
+            loaded = persistence.load_snapshot(engine, persistence.SNAPSHOT_DIR, name)
+            if loaded is not None:
+                break
+        else:
+            return None
+        arrays, manifest = loaded
+        model = _MODEL_ENGINES[engine].from_arrays(arrays)
+        trending = TrendingIndex.from_arrays({
+            key[len(_TRENDING_PREFIX):]: array
+            for key, array in arrays.items() if key.startswith(_TRENDING_PREFIX)
+        })
+    except Exception as e:
+        print(f"[Recommender] Ignoring unreadable model snapshot: {e}")
+        return None
 
-    if _INTERACTION_MATRIX is not None:
-        return  # already loaded
+    generation = int(manifest.get("generation", 1))
+    return Snapshot(model, manifest["version"], generation, trending), manifest
 
-    interactions = load_interactions()
 
-    if not interactions:
-        # fallback mock data so service still works
-        data = pd.DataFrame(
-            {
-                "user_id": [1, 1, 2, 2, 3],
-                "item_id": [101, 102, 101, 103, 104],
-                "rating": [5, 3, 4, 2, 5],
-            }
+def _save(snapshot: Snapshot, rebuilt: bool) -> None:
+    """Persists a freshly published snapshot (builder thread)."""
+    global _LAST_SAVE, _SNAPSHOT_NAME
+
+    if persistence.SNAPSHOT_DIR is None:
+        return
+    now = time.monotonic()
+    interval = 0.0 if _SAVE_EVERY_UPDATE else persistence.SAVE_INTERVAL_SECONDS
+    if not rebuilt and now - _LAST_SAVE < interval:
+        return
+
+    engine = next(name for name, cls in _MODEL_ENGINES.items() if isinstance(snapshot.model, cls))
+    extra = {
+        "generation": snapshot.generation,
+        # Lets a follower holding `previous` drop only what changed since
+        "previous": _SNAPSHOT_NAME,
+        "invalidated_users": sorted(_UNSAVED_USERS),
+        "invalidated_items": sorted(_UNSAVED_ITEMS),
+    }
+    try:
+        trending = {
+            _TRENDING_PREFIX + key: array for key, array in snapshot.trending.to_arrays().items()
+        }
+        _SNAPSHOT_NAME = persistence.save_snapshot(
+            snapshot.model, engine, snapshot.version, persistence.SNAPSHOT_DIR, extra, trending
         )
+        _LAST_SAVE = now
+        _UNSAVED_USERS.clear()
+        _UNSAVED_ITEMS.clear()
+    except Exception as e:
+        print(f"[Recommender] Failed to save model snapshot: {e}")
+
+
+def _check_writable() -> None:
+    if _FOLLOWER:
+        raise RuntimeError("This process serves a read-only model; send updates to the leader")
+
+
+# ---------------------------------------------------------------------
+# Background builder
+# ---------------------------------------------------------------------
+
+def _build(jobs: List[BuildJob]) -> None:
+    """
+    Builder-thread handler: turns a batch of queued jobs into one new
+    snapshot. Only the last full rebuild in the batch is built, and the
+    deltas queued after it are merged in one `apply` on a private copy.
+    """
+    global _SNAPSHOT, _ACCEPTED_VERSION
+
+    current = _SNAPSHOT
+    try:
+        model = None
+        version = current.version if current else None
+        generation = current.generation if current else 0
+        trending = current.trending if current else None
+
+        rebuilds = [k for k, job in enumerate(jobs) if job.kind != "apply"]
+        if rebuilds:
+            job = jobs[rebuilds[-1]]
+            interactions = load_interactions() if job.kind == "reload" else job.interactions
+            model = _new_model(interactions)
+            trending = TrendingIndex.from_interactions(interactions)
+            version = job.version
+            generation += 1
+            jobs = jobs[rebuilds[-1] + 1:]
+
+        deltas = []
+        for job in jobs:
+            if job.version is not None:
+                if job.base != version:
+                    continue  # its base was never published (an earlier build failed)
+                version = job.version
+            deltas.append(job.interactions)
+
+        delta = _merge_deltas(deltas)
+        users = delta["user_id"].astype(np.int64)
+        touched: List[int] = []
+        if len(users) or len(delta["new_items"]) or len(delta["ended_items"]):
+            if trending is None:
+                interactions = load_interactions()
+                model = _new_model(interactions)
+                trending = TrendingIndex.from_interactions(interactions)
+                generation += 1
+            # Copying is O(1): apply builds new arrays
+            trending = trending.copy()
+            trending.apply(delta)
+        if len(users):
+            if model is None:
+                model = current.model.copy()
+            touched = model.apply(delta)
+    except Exception:
+        # Let the next sync resend from what is actually published
+        with _MODEL_LOCK:
+            _ACCEPTED_VERSION = current.version if current else None
+        raise
+
+    if model is None:
+        if current is not None and trending is not current.trending:
+            # Only listings were announced or closed: the model is unchanged
+            _SNAPSHOT = current._replace(version=version, trending=trending)
+            _save(_SNAPSHOT, False)
+        elif current is not None and version != current.version:
+            _SNAPSHOT = current._replace(version=version)
+        return
+
+    _SNAPSHOT = Snapshot(model, version, generation, trending)
+
+    # Invalidate after the swap: results computed on the old snapshot
+    # started before this and are rejected by the cache's epoch check.
+    rebuilt = current is None or generation != current.generation
+    if rebuilt:
+        _RESULT_CACHE.clear()
     else:
-        data = pd.DataFrame(interactions)
+        # Similarities of the touched items changed, and with them the
+        # scores of every item co-rated with them.
+        affected = {int(i) for i in touched} | {int(i) for i in model.co_rated_items(touched)}
+        changed_users = set(users.tolist())
+        _RESULT_CACHE.invalidate(user_ids=changed_users, item_ids=affected)
+        _UNSAVED_USERS.update(changed_users)
+        _UNSAVED_ITEMS.update(affected)
 
-    # Pivot into user–item matrix
-    matrix = data.pivot_table(
-        index="user_id",
-        columns="item_id",
-        values="rating",
-        fill_value=0,
-    )
+    _save(_SNAPSHOT, rebuilt)
 
-    _INTERACTION_MATRIX = matrix
-    _USER_IDS = matrix.index.to_list()
-    _ITEM_IDS = matrix.columns.to_list()
 
-    # Compute cosine similarity between all item vectors
-    item_vectors = matrix.T  # shape: items × users
-    sim = cosine_similarity(item_vectors)
+_BUILDER = ModelBuilder(_build)
 
-    _ITEM_SIMILARITY = pd.DataFrame(sim, index=_ITEM_IDS, columns=_ITEM_IDS)
 
+def _current() -> Snapshot:
+    """
+    Returns the latest published snapshot. Only before the very first
+    build completes does this wait (there is nothing to serve yet).
+    """
+    snapshot = _SNAPSHOT
+    if snapshot is not None:
+        return snapshot
 
-def get_recommendations_for_user(user_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+    if _FOLLOWER:
+        # The leader publishes the first snapshot; there is nothing to build here
+        deadline = time.monotonic() + 60
+        while _SNAPSHOT is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if _SNAPSHOT is None:
+            raise RuntimeError("No model snapshot was published")
+        return _SNAPSHOT
+
+    preload()
+    _BUILDER.wait()
+    if _SNAPSHOT is None:
+        raise RuntimeError("Recommendation model could not be built")
+    return _SNAPSHOT
+
+
+def preload() -> None:
     """
-    Item-based collaborative filtering recommendation.
-    Looks at items the user interacted with and finds similar items.
+    Makes the initial model available: restores the saved snapshot if
+    there is one (memory-mapped, no training), otherwise starts building
+    it in the background.
     """
-    _ensure_models_loaded()
+    global _SNAPSHOT, _ACCEPTED_VERSION, _SNAPSHOT_NAME
 
-    if user_id not in _USER_IDS:
-        return []  # unknown user
+    with _MODEL_LOCK:
+        if _SNAPSHOT is not None or not _BUILDER.idle():
+            return
+        restored = _restore()
+        if restored is not None:
+            _SNAPSHOT, manifest = restored
+            _SNAPSHOT_NAME = manifest["name"]
+            _ACCEPTED_VERSION = _SNAPSHOT.version
+            print(f"[Recommender] Restored {manifest['engine']} model snapshot at version {_SNAPSHOT.version}.")
+        else:
+            _BUILDER.submit(BuildJob("reload"))
 
-    user_vector = _INTERACTION_MATRIX.loc[user_id]
-    interacted_items = user_vector[user_vector > 0].index.tolist()
 
-    if not interacted_items:
-        return []  # cold start user
+def lead() -> None:
+    """
+    Makes this process the single writer of a multi-process deployment:
+    every published update is saved right away for the followers.
+    """
+    global _SAVE_EVERY_UPDATE
 
-    # Aggregate similarity scores across all items the user liked
-    scores = np.zeros(len(_ITEM_IDS))
+    if persistence.SNAPSHOT_DIR is None:
+        raise RuntimeError("Multi-process serving needs RECOMMENDER_SNAPSHOT_DIR")
+    _SAVE_EVERY_UPDATE = True
+    preload()
 
-    for item in interacted_items:
-        scores += _ITEM_SIMILARITY.loc[item].values * user_vector[item]
 
-    # Remove items the user already interacted with
-    for item in interacted_items:
-        idx = _ITEM_IDS.index(item)
-        scores[idx] = -np.inf
+def follow_snapshots(poll_seconds: float = 0.05) -> None:
+    """
+    Makes this process a read-only follower: it never builds, and serves
+    whatever snapshot the leader saved last, re-mapping it when it changes.
+    """
+    global _FOLLOWER
 
-    # Get top items
-    top_indices = np.argsort(scores)[::-1][:top_n]
+    if persistence.SNAPSHOT_DIR is None:
+        raise RuntimeError("Multi-process serving needs RECOMMENDER_SNAPSHOT_DIR")
+    _FOLLOWER = True
+    threading.Thread(
+        target=_follow, args=(poll_seconds,), name="snapshot-follower", daemon=True
+    ).start()
 
-    recommendations = [
-        {"item_id": _ITEM_IDS[i], "score": float(scores[i])}
-        for i in top_indices
-        if scores[i] != -np.inf
-    ]
 
-    return recommendations
+def _follow(poll_seconds: float) -> None:
+    while True:
+        name = persistence.current_name(persistence.SNAPSHOT_DIR)
+        if name is not None and name != _SNAPSHOT_NAME:
+            _switch_to(name)
+        time.sleep(poll_seconds)
+
+
+def _switch_to(name: str) -> None:
+    """Follower: swaps in a newly saved snapshot (retried on the next poll if unreadable)."""
+    global _SNAPSHOT, _SNAPSHOT_NAME
+
+    restored = _restore(name)
+    if restored is None:
+        return
+    snapshot, manifest = restored
+
+    previous = _SNAPSHOT
+    _SNAPSHOT = snapshot
+    if (
+        previous is not None
+        and previous.generation == snapshot.generation
+        and manifest.get("previous") == _SNAPSHOT_NAME
+    ):
+        _RESULT_CACHE.invalidate(
+            user_ids=manifest.get("invalidated_users", ()),
+            item_ids=manifest.get("invalidated_items", ()),
+        )
+    else:
+        _RESULT_CACHE.clear()
+    _SNAPSHOT_NAME = name
+
+
+def wait_for_builds(timeout: Optional[float] = None) -> bool:
+    """Blocks until every build submitted so far has been published."""
+    return _BUILDER.wait(timeout)
+
+
+def _finish(job: BuildJob, wait: bool) -> BuildJob:
+    if wait:
+        job.wait()
+        if job.error is not None:
+            raise job.error
+    return job
+
+
+# ---------------------------------------------------------------------
+# Model updates (all executed by the builder thread)
+# ---------------------------------------------------------------------
+
+def reset_models(wait: bool = False) -> BuildJob:
+    """
+    Rebuilds the model from disk. The current snapshot keeps serving
+    queries until the new one is published.
+    """
+    global _ACCEPTED_VERSION
+
+    _check_writable()
+    with _MODEL_LOCK:
+        job = _BUILDER.submit(BuildJob("reload"))
+        _ACCEPTED_VERSION = None
+    return _finish(job, wait)
+
+
+def rebuild_models(
+    interactions: Interactions,
+    version: Optional[Tuple[int, ...]] = None,
+    wait: bool = False,
+) -> BuildJob:
+    """
+    Replaces the whole model with one built from the given interactions.
+    """
+    global _ACCEPTED_VERSION
+
+    _check_writable()
+    with _MODEL_LOCK:
+        job = _BUILDER.submit(BuildJob("rebuild", interactions, version))
+        _ACCEPTED_VERSION = version
+    return _finish(job, wait)
+
+
+def get_data_version() -> Optional[Tuple[int, ...]]:
+    """Returns the data version acknowledged by the last sync."""
+    return _ACCEPTED_VERSION
+
+
+def sync_interactions(
+    base_version: Optional[Tuple[int, ...]],
+    interactions: Interactions,
+    version: Tuple[int, ...],
+    wait: bool = False,
+) -> Optional[Tuple[int, ...]]:
+    """
+    Versioned sync from the auction service.
+
+    - base_version None: `interactions` is a full snapshot, rebuild from it.
+    - base_version equal to the held version: `interactions` is the delta
+      since then, merge it incrementally.
+    - anything else: the sender is out of step (e.g. this process
+      restarted); nothing is applied.
+
+    Always returns the version now held, so the sender can resume from it.
+    The version is acknowledged as soon as the build is queued; queries
+    see the data once the builder publishes it.
+    """
+    global _ACCEPTED_VERSION
+
+    _check_writable()
+    job = None
+    with _MODEL_LOCK:
+        if base_version is None:
+            job = _BUILDER.submit(BuildJob("rebuild", interactions, version))
+            _ACCEPTED_VERSION = version
+        elif base_version == _ACCEPTED_VERSION:
+            job = _BUILDER.submit(BuildJob("apply", interactions, version, base_version))
+            _ACCEPTED_VERSION = version
+        held = _ACCEPTED_VERSION
+
+    if job is not None:
+        _finish(job, wait)
+    return held
+
+
+def apply_interactions(interactions: Interactions, wait: bool = False) -> BuildJob:
+    """
+    Incrementally merges new interactions into the model.
+
+    Only the touched parts of the model are recomputed (see the engines'
+    `apply`), on a copy built in the background, so one new bid costs
+    O(affected items) instead of a full rebuild and never blocks queries.
+    Repeated (user, item) pairs keep the mean semantics of a full build.
+    """
+    _check_writable()
+    return _finish(_BUILDER.submit(BuildJob("apply", interactions)), wait)
+
+
+# ---------------------------------------------------------------------
+# Public query API (cached)
+# ---------------------------------------------------------------------
+
+def get_recommendations_for_user(user_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+    """
+    Item-based collaborative filtering recommendation.
+    Looks at items the user interacted with and finds similar items.
+    """
+    return get_recommendations_for_users([user_id], top_n)[user_id]
+
+
+def get_recommendations_for_users(
+    user_ids: Sequence[int], top_n: int = 10
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Batch version of get_recommendations_for_user: cache misses are scored
+    together in one matrix operation. Unknown and cold-start users get the
+    trending items instead (see trending.py).
+    """
+    return _cached_many("recs", user_ids, top_n)
 
 
 def get_similar_items(item_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
     """
     Returns items with highest cosine similarity to the given item.
     """
-    _ensure_models_loaded()
+    return get_similar_items_many([item_id], top_n)[item_id]
+
+
+def get_similar_items_many(
+    item_ids: Sequence[int], top_n: int = 10
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Batch version of get_similar_items. Unknown items map to an empty list.
+    """
+    return _cached_many("similar", item_ids, top_n)
+
+
+def cache_stats() -> Dict[str, int]:
+    """Hit / miss / eviction / invalidation counters of the result cache."""
+    return _RESULT_CACHE.stats()
+
+
+def _cached_many(kind: str, ids: Sequence[int], top_n: int) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Serves `ids` from the result cache and computes the misses on one
+    snapshot (one at a time or as a batch). A recommendation depends on
+    the user's history, a similar-items list on its own item.
+    """
+    # Read the epoch before the snapshot, so a result computed on a
+    # snapshot that gets replaced meanwhile is never stored
+    epoch = _RESULT_CACHE.epoch
+    snapshot = _current()
+    model = snapshot.model
+
+    results: Dict[int, List[Dict[str, Any]]] = {}
+    misses: List[int] = []
+
+    for key_id in ids:
+        if key_id in results:
+            continue
+        cached = _RESULT_CACHE.get((kind, key_id, top_n, snapshot.generation))
+        if cached is None:
+            misses.append(key_id)
+        else:
+            results[key_id] = cached
 
-    if item_id not in _ITEM_IDS:
-        return []
+    if misses:
+        if kind == "recs":
+            if len(misses) == 1:
+                computed = {misses[0]: model.recommend(misses[0], top_n)}
+            else:
+                computed = model.recommend_many(misses, top_n)
+        elif len(misses) == 1:
+            computed = {misses[0]: model.similar(misses[0], top_n)}
+        else:
+            computed = model.similar_many(misses, top_n)
 
-    sims = _ITEM_SIMILARITY.loc[item_id].drop(item_id)  # remove itself
-    top = sims.sort_values(ascending=False).head(top_n)
+        for key_id, value in computed.items():
+            if kind == "recs":
+                user_id, items = key_id, model.interacted_items(key_id)
+                if not value:
+                    # Nothing to go on: serve trending items. They are read
+                    # in O(top_n) and change with every bid, so not cached.
+                    results[key_id] = snapshot.trending.top(top_n, exclude=items)
+                    continue
+            else:
+                user_id, items = None, [key_id]
+            results[key_id] = value
+            _RESULT_CACHE.put((kind, key_id, top_n, snapshot.generation), value, epoch, user_id, items)
 
-    return [
-        {"item_id": int(idx), "score": float(score)}
-        for idx, score in top.items()
-    ]
\ No newline at end of file
+    return {key_id: results[key_id] for key_id in ids}
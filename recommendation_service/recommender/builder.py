@@ -0,0 +1,94 @@
+"""
+Background model builder.
+
+All model writes (full rebuilds and incremental updates) are queued here
+and executed by one daemon thread, never on a request thread. Whatever
+has piled up while the previous build ran is handed to the handler as a
+single batch, so a burst of updates costs one model copy, not one each.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, List, Optional
+
+
+class BuildJob:
+    """
+    One queued write.
+
+    kind: "reload"  – rebuild from load_interactions()
+          "rebuild" – rebuild from `interactions`
+          "apply"   – merge `interactions` into the current model
+
+    A versioned apply only makes sense on top of `base`; the handler
+    drops it if the model it would land on holds another version.
+    """
+
+    def __init__(
+        self, kind: str, interactions: Any = None, version: Any = None, base: Any = None
+    ) -> None:
+        self.kind = kind
+        self.interactions = interactions
+        self.version = version
+        self.base = base
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job has been built and published (or failed)."""
+        return self.done.wait(timeout)
+
+
+class ModelBuilder:
+    """Runs `handler(jobs)` on a background thread for every batch of queued jobs."""
+
+    def __init__(self, handler: Callable[[List[BuildJob]], None], name: str = "model-builder") -> None:
+        self._handler = handler
+        self._name = name
+        self._queue: "queue.Queue[BuildJob]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._last_job: Optional[BuildJob] = None
+
+    def submit(self, job: BuildJob) -> BuildJob:
+        self._ensure_started()
+        self._last_job = job
+        self._queue.put(job)
+        return job
+
+    def idle(self) -> bool:
+        job = self._last_job
+        return job is None or job.done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every job submitted so far is done."""
+        job = self._last_job
+        return job is None or job.wait(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            jobs = [self._queue.get()]
+            # Coalesce everything that queued up behind the first job
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._handler(jobs)
+            except Exception as e:
+                print(f"[Recommender] Model build failed: {e}")
+                for job in jobs:
+                    job.error = e
+            finally:
+                for job in jobs:
+                    job.done.set()
@@ -0,0 +1,133 @@
+"""
+LRU + TTL cache for recommendation / similar-item results.
+
+Entries are keyed by (kind, id, top_n, model version) and remember the
+item ids their result depends on, so an incremental update only drops
+the entries it can actually change instead of flushing everything.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    Lookups that race with an invalidation are never stored: `put` takes
+    the epoch read before the result was computed and ignores the value
+    if any invalidation happened in between.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, value, user_id, dependent item ids)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Optional[int], Set[int]]]" = OrderedDict()
+        self._by_item: Dict[int, Set[Hashable]] = {}
+        self._by_user: Dict[int, Set[Hashable]] = {}
+        self._epoch = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        epoch: int,
+        user_id: Optional[int] = None,
+        items: Iterable[int] = (),
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if epoch != self._epoch:
+                return  # the model changed while this result was computed
+            if key in self._entries:
+                self._remove(key)
+
+            deps = set(items)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, user_id, deps)
+            for item_id in deps:
+                self._by_item.setdefault(item_id, set()).add(key)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_ids: Iterable[int] = (), item_ids: Iterable[int] = ()) -> int:
+        """Drops every entry for the given users or depending on the given items."""
+        with self._lock:
+            self._epoch += 1
+            keys: Set[Hashable] = set()
+            for user_id in user_ids:
+                keys |= self._by_user.get(user_id, set())
+            for item_id in item_ids:
+                keys |= self._by_item.get(item_id, set())
+
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_item.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, user_id, deps = self._entries.pop(key)
+        for item_id in deps:
+            keys = self._by_item.get(item_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_item[item_id]
+        if user_id is not None:
+            keys = self._by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[user_id]
@@ -3,8 +3,10 @@ Utilities for loading interactions (views, bids, purchases)
 from CSV / database / mock data.
 """
 
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, List, Mapping, Tuple, Union
 from pathlib import Path
+import time
+import numpy as np # type: ignore
 import pandas as pd # type: ignore
 
 
@@ -13,6 +15,14 @@ DATA_DIR = Path(__file__).parent / "data"
 INTERACTIONS_CSV = DATA_DIR / "interactions.csv"
 
 
+# Interactions are either a list of {"user_id", "item_id", "rating"} dicts
+# or a columnar mapping of the same keys to arrays (bulk wire format).
+# Both may carry a "timestamp" (Unix seconds) per interaction; the
+# columnar form may also list "new_items", listings announced without bids,
+# and "ended_items", listings that closed.
+Interactions = Union[Iterable[Dict[str, Any]], Mapping[str, Any]]
+
+
 def load_interactions() -> List[Dict[str, Any]]:
     """
     Loads user–item interactions used by the recommender.
@@ -72,4 +82,51 @@ def _load_mock_data() -> List[Dict[str, Any]]:
         {"user_id": 2, "item_id": 103, "rating": 2.0},
         {"user_id": 3, "item_id": 104, "rating": 5.0},
         {"user_id": 3, "item_id": 101, "rating": 1.0},
-    ]
\ No newline at end of file
+    ]
+
+
+def interaction_columns(interactions: Interactions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Normalises interactions to (user_ids, item_ids, ratings) arrays.
+    """
+    if isinstance(interactions, Mapping):
+        return (
+            np.asarray(interactions["user_id"], dtype=np.int64),
+            np.asarray(interactions["item_id"], dtype=np.int64),
+            np.asarray(interactions["rating"], dtype=float),
+        )
+
+    rows = list(interactions)
+    users = np.fromiter((int(r["user_id"]) for r in rows), dtype=np.int64, count=len(rows))
+    items = np.fromiter((int(r["item_id"]) for r in rows), dtype=np.int64, count=len(rows))
+    ratings = np.fromiter((float(r["rating"]) for r in rows), dtype=float, count=len(rows))
+    return users, items, ratings
+
+
+def interaction_timestamps(interactions: Interactions) -> np.ndarray:
+    """
+    Unix timestamps of the interactions, aligned with interaction_columns.
+    Interactions without one (CSV / mock data) count as happening now.
+    """
+    now = time.time()
+    if isinstance(interactions, Mapping):
+        if "timestamp" in interactions:
+            return np.asarray(interactions["timestamp"], dtype=float)
+        return np.full(len(interactions["user_id"]), now)
+
+    rows = list(interactions)
+    return np.fromiter((float(r.get("timestamp", now)) for r in rows), dtype=float, count=len(rows))
+
+
+def new_items(interactions: Interactions) -> np.ndarray:
+    """Ids of the newly listed items announced alongside the interactions."""
+    if isinstance(interactions, Mapping) and "new_items" in interactions:
+        return np.asarray(interactions["new_items"], dtype=np.int64)
+    return np.empty(0, dtype=np.int64)
+
+
+def ended_items(interactions: Interactions) -> np.ndarray:
+    """Ids of the listings announced as closed alongside the interactions."""
+    if isinstance(interactions, Mapping) and "ended_items" in interactions:
+        return np.asarray(interactions["ended_items"], dtype=np.int64)
+    return np.empty(0, dtype=np.int64)
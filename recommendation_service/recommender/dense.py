@@ -0,0 +1,255 @@
+"""
+Dense item-based collaborative filtering engine.
+
+The original engine of the service: a pandas user × item pivot table and
+the full item × item cosine similarity matrix, both held in memory.
+
+Known limit: a published model is never modified, so every incremental
+update first copies both matrices, O(users × items + items²) per batch
+(about 0.2 s at 3000 × 3000). Large catalogs should use the sparse or
+top-K engine; the default "auto" engine switches to sparse above
+RECOMMENDER_DENSE_MAX_ITEMS items (see algorithms.py).
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+from sklearn.metrics.pairwise import cosine_similarity # type: ignore
+
+from .data_loader import Interactions, interaction_columns
+from .ranking import ranked
+
+
+class DenseModel:
+    """
+    User × item matrix plus the full item similarity matrix, as DataFrames.
+    """
+
+    def __init__(
+        self,
+        matrix: pd.DataFrame,
+        similarity: pd.DataFrame,
+        pair_counts: Dict[Tuple[int, int], int],
+    ) -> None:
+        self.matrix = matrix
+        self.similarity = similarity
+        self.user_ids: List[int] = matrix.index.to_list()
+        self.item_ids: List[int] = matrix.columns.to_list()
+
+        # O(1) id -> row/column position in the matrices above
+        self.user_index: Dict[int, int] = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index: Dict[int, int] = {it: i for i, it in enumerate(self.item_ids)}
+
+        # Number of raw interactions averaged into each (user_id, item_id) cell.
+        # Needed so incremental updates keep the same mean the pivot table computes.
+        self.pair_counts = pair_counts
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_interactions(cls, interactions: Interactions) -> "DenseModel":
+        users, items, ratings = interaction_columns(interactions)
+        data = pd.DataFrame({"user_id": users, "item_id": items, "rating": ratings})
+
+        # Pivot into user–item matrix
+        matrix = data.pivot_table(
+            index="user_id",
+            columns="item_id",
+            values="rating",
+            fill_value=0,
+        ).astype(float)
+
+        counts = data.groupby(["user_id", "item_id"]).size()
+
+        # Compute cosine similarity between all item vectors
+        item_vectors = matrix.T  # shape: items × users
+        sim = cosine_similarity(item_vectors)
+
+        return cls(
+            matrix,
+            pd.DataFrame(sim, index=matrix.columns, columns=matrix.columns),
+            {(int(u), int(i)): int(c) for (u, i), c in counts.items()},
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        pairs = np.array(list(self.pair_counts), dtype=np.int64).reshape(-1, 2)
+        return {
+            "user_ids": np.asarray(self.user_ids, dtype=np.int64),
+            "item_ids": np.asarray(self.item_ids, dtype=np.int64),
+            "matrix": self.matrix.to_numpy(dtype=float),
+            "similarity": self.similarity.to_numpy(dtype=float),
+            "pairs": pairs,
+            "pair_counts": np.fromiter(self.pair_counts.values(), dtype=np.int64, count=len(pairs)),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "DenseModel":
+        """Wraps (possibly memory-mapped) arrays in DataFrames without copying them."""
+        user_ids = arrays["user_ids"].tolist()
+        item_ids = arrays["item_ids"].tolist()
+        pairs = arrays["pairs"].tolist()
+        return cls(
+            pd.DataFrame(arrays["matrix"], index=user_ids, columns=item_ids, copy=False),
+            pd.DataFrame(arrays["similarity"], index=item_ids, columns=item_ids, copy=False),
+            {(u, i): c for (u, i), c in zip(pairs, arrays["pair_counts"].tolist())},
+        )
+
+    def copy(self) -> "DenseModel":
+        """
+        Independent copy that `apply` can modify while this one is served.
+        Copies both full matrices (see the module docstring).
+        """
+        return DenseModel(self.matrix.copy(), self.similarity.copy(), dict(self.pair_counts))
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def apply(self, interactions: Interactions) -> List[int]:
+        """
+        Merges new interactions in place. Only the touched cells and the
+        similarity rows/columns of the touched items are recomputed.
+        Returns the touched item ids.
+        """
+        users, items, ratings = interaction_columns(interactions)
+        if len(users) == 0:
+            return []
+
+        # Aggregate the delta per cell first: (sum of ratings, count)
+        delta: Dict[Tuple[int, int], List[float]] = {}
+        for user_id, item_id, rating in zip(users.tolist(), items.tolist(), ratings.tolist()):
+            cell = delta.setdefault((user_id, item_id), [0.0, 0])
+            cell[0] += rating
+            cell[1] += 1
+
+        matrix = self.matrix
+        sim = self.similarity
+
+        new_users = sorted({u for u, _ in delta if u not in self.user_index})
+        new_items = sorted({i for _, i in delta if i not in self.item_index})
+
+        # Grow the matrices only when unseen ids arrive
+        if new_users or new_items:
+            user_ids = self.user_ids + new_users
+            item_ids = self.item_ids + new_items
+            matrix = matrix.reindex(index=user_ids, columns=item_ids, fill_value=0.0)
+            if new_items:
+                sim = sim.reindex(index=item_ids, columns=item_ids, fill_value=0.0)
+            for u in new_users:
+                self.user_index[u] = len(self.user_index)
+            for i in new_items:
+                self.item_index[i] = len(self.item_index)
+            self.user_ids = user_ids
+            self.item_ids = item_ids
+
+        for (user_id, item_id), (total, count) in delta.items():
+            old_count = self.pair_counts.get((user_id, item_id), 0)
+            old_value = float(matrix.at[user_id, item_id]) if old_count else 0.0
+            new_count = old_count + count
+            matrix.at[user_id, item_id] = (old_value * old_count + total) / new_count
+            self.pair_counts[(user_id, item_id)] = new_count
+
+        # Recompute only the similarity entries of the touched items
+        touched = sorted({i for _, i in delta})
+        item_vectors = matrix.T  # shape: items × users
+        rows = cosine_similarity(item_vectors.loc[touched].values, item_vectors.values)
+
+        sim.loc[touched, :] = rows
+        sim.loc[:, touched] = rows.T
+
+        self.matrix = matrix
+        self.similarity = sim
+        return touched
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def interacted_items(self, user_id: int) -> List[int]:
+        """Ids of the items the user rated positively."""
+        u = self.user_index.get(user_id)
+        if u is None:
+            return []
+        ratings = self.matrix.iloc[u].to_numpy()
+        return [self.item_ids[i] for i in np.flatnonzero(ratings > 0)]
+
+    def co_rated_items(self, item_ids: Sequence[int]) -> List[int]:
+        """Ids of every item sharing at least one rater with the given items."""
+        cols = [self.item_index[i] for i in item_ids if i in self.item_index]
+        if not cols:
+            return []
+        raters = np.flatnonzero((self.matrix.iloc[:, cols].to_numpy() > 0).any(axis=1))
+        rated = (self.matrix.iloc[raters].to_numpy() > 0).any(axis=0)
+        return [self.item_ids[i] for i in np.flatnonzero(rated)]
+
+    def recommend(self, user_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        u = self.user_index.get(user_id)
+        if u is None:
+            return []  # unknown user
+
+        ratings = self.matrix.iloc[u].to_numpy()
+        interacted = ratings > 0
+
+        if not interacted.any():
+            return []  # cold start user
+
+        # Aggregate similarity scores across all items the user liked:
+        # one (history × items) matrix-vector product instead of a Python loop
+        liked = np.flatnonzero(interacted)
+        scores = ratings[liked] @ self.similarity.iloc[liked].to_numpy()
+
+        # Remove items the user already interacted with
+        scores[interacted] = -np.inf
+
+        # Get top items
+        return ranked(scores, self.item_ids, top_n)
+
+    def recommend_many(self, user_ids: Sequence[int], top_n: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        All requested users are scored in one
+        (batch × history) @ (history × items) matrix product.
+        """
+        results: Dict[int, List[Dict[str, Any]]] = {u: [] for u in user_ids}
+        known = [u for u in results if u in self.user_index]
+        if not known:
+            return results
+
+        ratings = self.matrix.iloc[[self.user_index[u] for u in known]].to_numpy()
+        interacted = ratings > 0
+
+        # Only the items someone in the batch liked contribute to the scores
+        liked = np.flatnonzero(interacted.any(axis=0))
+        weights = np.where(interacted[:, liked], ratings[:, liked], 0.0)
+        scores = weights @ self.similarity.iloc[liked].to_numpy()  # batch × items
+        scores[interacted] = -np.inf
+
+        for b, user_id in enumerate(known):
+            if interacted[b].any():
+                results[user_id] = ranked(scores[b], self.item_ids, top_n)
+        return results
+
+    def similar(self, item_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        i = self.item_index.get(item_id)
+        if i is None:
+            return []
+
+        sims = self.similarity.iloc[i].to_numpy(copy=True)
+        sims[i] = -np.inf  # remove itself
+
+        return ranked(sims, self.item_ids, top_n)
+
+    def similar_many(self, item_ids: Sequence[int], top_n: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        results: Dict[int, List[Dict[str, Any]]] = {i: [] for i in item_ids}
+        known = [i for i in results if i in self.item_index]
+        if not known:
+            return results
+
+        idx = [self.item_index[i] for i in known]
+        sims = self.similarity.iloc[idx].to_numpy(copy=True)  # batch × items
+        sims[np.arange(len(idx)), idx] = -np.inf  # remove themselves
+
+        for b, item_id in enumerate(known):
+            results[item_id] = ranked(sims[b], self.item_ids, top_n)
+        return results
@@ -0,0 +1,281 @@
+"""
+Top-K nearest-neighbour item similarity engine.
+
+Instead of keeping every pairwise item similarity, each item stores only
+its K strongest neighbours in two fixed-width arrays:
+
+    neighbours : (items × K) int32   – neighbour item indices, -1 = empty
+    scores     : (items × K) float32 – cosine similarity, best first
+
+The index is computed blockwise from the sparse interaction matrix, so
+peak memory is bounded by `block_size × items` floats, and both query
+functions cost O(K) per item instead of O(items).
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np # type: ignore
+import scipy.sparse as sp # type: ignore
+
+from .data_loader import Interactions
+from .ranking import ranked
+from .sparse import SparseModel
+
+
+DEFAULT_TOP_K = int(os.getenv("RECOMMENDER_TOP_K", "50"))
+DEFAULT_BLOCK_SIZE = int(os.getenv("RECOMMENDER_BLOCK_SIZE", "1024"))
+
+
+class TopKNeighbourIndex:
+    """
+    Pruned per-item neighbour lists. Only strictly positive similarities
+    are kept, since zero-similarity items never contribute to a score.
+    """
+
+    def __init__(self, neighbours: np.ndarray, scores: np.ndarray) -> None:
+        self.neighbours = neighbours
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        normalized_t: sp.csr_matrix,
+        k: int = DEFAULT_TOP_K,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        normalized: Optional[sp.csr_matrix] = None,
+    ) -> "TopKNeighbourIndex":
+        """
+        Builds the index from the items × users column-normalised matrix
+        (and its users × items transpose, when the caller already has it).
+        """
+        n_items = normalized_t.shape[0]
+        index = cls(
+            np.full((n_items, k), -1, dtype=np.int32),
+            np.zeros((n_items, k), dtype=np.float32),
+        )
+        index.update_rows(normalized_t, np.arange(n_items), block_size, normalized)
+        return index
+
+    def copy(self) -> "TopKNeighbourIndex":
+        return TopKNeighbourIndex(self.neighbours.copy(), self.scores.copy())
+
+    def grow(self, n_items: int) -> None:
+        """Appends empty neighbour lists for newly seen items."""
+        missing = n_items - self.neighbours.shape[0]
+        if missing <= 0:
+            return
+        self.neighbours = np.vstack(
+            [self.neighbours, np.full((missing, self.k), -1, dtype=np.int32)]
+        )
+        self.scores = np.vstack(
+            [self.scores, np.zeros((missing, self.k), dtype=np.float32)]
+        )
+
+    def update_rows(
+        self,
+        normalized_t: sp.csr_matrix,
+        rows: np.ndarray,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        normalized: Optional[sp.csr_matrix] = None,
+    ) -> None:
+        """
+        Recomputes the neighbour lists of the given item indices,
+        `block_size` items at a time. Pass the users × items `normalized`
+        matrix if it is at hand; otherwise it is transposed from
+        `normalized_t`, which costs a pass over the whole matrix.
+        """
+        n_items = normalized_t.shape[0]
+        k = min(self.k, n_items - 1)
+        others_t = normalized if normalized is not None else normalized_t.T.tocsr()  # users × items
+
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            sims = (normalized_t[block] @ others_t).toarray()  # block × items
+            sims[np.arange(len(block)), block] = -np.inf  # remove itself
+
+            self.neighbours[block] = -1
+            self.scores[block] = 0.0
+            if k <= 0:
+                continue
+
+            # Top-k per row, then order the k candidates best first (ties by index)
+            part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            part.sort(axis=1)
+            vals = np.take_along_axis(sims, part, axis=1)
+            order = np.argsort(-vals, axis=1, kind="stable")
+            part = np.take_along_axis(part, order, axis=1)
+            vals = np.take_along_axis(vals, order, axis=1)
+
+            keep = vals > 0
+            self.neighbours[block, :k] = np.where(keep, part, -1)
+            self.scores[block, :k] = np.where(keep, vals, 0.0)
+
+    def to_csr(self) -> sp.csr_matrix:
+        """The index as a sparse items × items matrix (at most K entries per row)."""
+        n_items = self.neighbours.shape[0]
+        valid = self.neighbours >= 0
+        rows = np.repeat(np.arange(n_items), valid.sum(axis=1))
+        return sp.csr_matrix(
+            (self.scores[valid].astype(float), (rows, self.neighbours[valid])),
+            shape=(n_items, n_items),
+        )
+
+
+class TopKModel:
+    """
+    Item-based collaborative filtering served from a top-K neighbour index.
+
+    User histories come from a SparseModel; scores only consider each
+    interacted item's K nearest neighbours, so unlike the dense engine,
+    items with zero similarity are never returned as filler.
+    """
+
+    def __init__(
+        self,
+        interactions: SparseModel,
+        k: int = DEFAULT_TOP_K,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        self.interactions = interactions
+        self.block_size = block_size
+        self.index = TopKNeighbourIndex.build(
+            interactions.normalized_t, k, block_size, interactions.normalized
+        )
+        self._neighbour_matrix: Optional[sp.csr_matrix] = None
+
+    @classmethod
+    def from_interactions(cls, interactions: Interactions) -> "TopKModel":
+        return cls(SparseModel.from_interactions(interactions))
+
+    def copy(self) -> "TopKModel":
+        """Independent copy that `apply` can modify while this one is served."""
+        model = TopKModel.__new__(TopKModel)
+        model.interactions = self.interactions.copy()
+        model.block_size = self.block_size
+        model.index = self.index.copy()
+        model._neighbour_matrix = self._neighbour_matrix
+        return model
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = self.interactions.to_arrays()
+        arrays["neighbours"] = self.index.neighbours
+        arrays["scores"] = self.index.scores
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "TopKModel":
+        model = cls.__new__(cls)
+        model.interactions = SparseModel.from_arrays(arrays)
+        model.block_size = DEFAULT_BLOCK_SIZE
+        model.index = TopKNeighbourIndex(arrays["neighbours"], arrays["scores"])
+        model._neighbour_matrix = None
+        return model
+
+    @property
+    def item_ids(self) -> List[int]:
+        return self.interactions.item_ids
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def apply(self, interactions: Interactions) -> List[int]:
+        """
+        Merges new interactions and refreshes only the neighbour lists that
+        can change: the touched items and every item co-rated with them.
+        """
+        touched = self.interactions.apply(interactions)
+        if not touched:
+            return []
+
+        model = self.interactions
+        self.index.grow(len(model.item_ids))
+
+        touched_idx = np.array([model.item_index[i] for i in touched], dtype=np.int64)
+        affected = np.union1d(touched_idx, model.co_rated_indices(touched_idx))
+
+        self.index.update_rows(model.normalized_t, affected, self.block_size, model.normalized)
+        self._neighbour_matrix = None
+        return touched
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def interacted_items(self, user_id: int) -> List[int]:
+        return self.interactions.interacted_items(user_id)
+
+    def co_rated_items(self, item_ids: Sequence[int]) -> List[int]:
+        return self.interactions.co_rated_items(item_ids)
+
+    def recommend(self, user_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        u = self.interactions.user_index.get(user_id)
+        if u is None:
+            return []  # unknown user
+
+        row = self.interactions.matrix.getrow(u)
+        liked = row.data > 0
+        interacted = row.indices[liked]
+        if len(interacted) == 0:
+            return []  # cold start user
+
+        # Scatter each interacted item's neighbour scores, weighted by rating
+        neighbours = self.index.neighbours[interacted].ravel()
+        weights = (self.index.scores[interacted] * row.data[liked][:, None]).ravel()
+        valid = neighbours >= 0
+        candidates, inverse = np.unique(neighbours[valid], return_inverse=True)
+        scores = np.bincount(inverse, weights=weights[valid], minlength=len(candidates))
+
+        scores[np.isin(candidates, interacted)] = -np.inf
+
+        return ranked(scores, [self.item_ids[c] for c in candidates], top_n)
+
+    def recommend_many(self, user_ids: Sequence[int], top_n: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Scores a batch of users in one product of their rating rows with
+        the sparse neighbour matrix.
+        """
+        results: Dict[int, List[Dict[str, Any]]] = {u: [] for u in user_ids}
+        user_index = self.interactions.user_index
+        known = [u for u in results if u in user_index]
+        if not known:
+            return results
+
+        if self._neighbour_matrix is None:
+            self._neighbour_matrix = self.index.to_csr()
+
+        rows = self.interactions.matrix[[user_index[u] for u in known]]
+        liked = rows.multiply(rows > 0).tocsr()
+        scores = (liked @ self._neighbour_matrix).tocsr()  # batch × items, sparse
+        scores.sort_indices()  # candidates in index order, so ties rank like recommend()
+
+        for b, user_id in enumerate(known):
+            interacted = liked.indices[liked.indptr[b]:liked.indptr[b + 1]]
+            if len(interacted) == 0:
+                continue  # cold start user
+            row = scores.getrow(b)
+            row_scores = row.data.copy()
+            row_scores[np.isin(row.indices, interacted)] = -np.inf
+            results[user_id] = ranked(row_scores, [self.item_ids[c] for c in row.indices], top_n)
+        return results
+
+    def similar(self, item_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        i = self.interactions.item_index.get(item_id)
+        if i is None:
+            return []
+
+        neighbours = self.index.neighbours[i, :top_n]
+        scores = self.index.scores[i, :top_n]
+        return [
+            {"item_id": int(self.item_ids[j]), "score": float(s)}
+            for j, s in zip(neighbours, scores)
+            if j >= 0
+        ]
+
+    def similar_many(self, item_ids: Sequence[int], top_n: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        # Each lookup is a single O(top_n) row read, so no batching trick is needed
+        return {i: self.similar(i, top_n) for i in item_ids}
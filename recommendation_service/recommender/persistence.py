@@ -0,0 +1,149 @@
+"""
+On-disk model snapshots.
+
+A snapshot is a directory of plain `.npy` arrays plus a manifest:
+
+    <SNAPSHOT_DIR>/
+        CURRENT                  – name of the latest complete snapshot
+        snapshot-<ms>/
+            manifest.json        – engine, data version, array names
+            <array>.npy          – one file per array (id maps, CSR parts, ...)
+
+`.npy` files (unlike `.npz` archives) can be opened with
+np.load(mmap_mode="r"), so loading costs no parsing or copying and every
+server process mapping the same snapshot shares one copy in the page
+cache. Models never write into loaded arrays: updates copy first.
+
+Snapshots are written to a fresh directory and published by atomically
+replacing CURRENT, so a reader never sees a half-written model.
+
+Snapshots are opt-in: nothing is saved or restored unless
+RECOMMENDER_SNAPSHOT_DIR is set (multi-process serving requires it).
+
+A restored model keeps the data version it was saved at, and answers
+queries from that data until the auction service's first sync, which
+checks the version against the database:
+
+    behind it (the usual restart)  – the bids recorded since are replayed
+                                     as a delta, together with every closed
+                                     listing, so none stays trending;
+    ahead of it (database reset or – the client sends a full snapshot
+    restored from a backup)          instead, which replaces the model.
+
+A snapshot saved in another format or by another engine is ignored and
+the model is rebuilt.
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import numpy as np # type: ignore
+
+
+# Unset or empty RECOMMENDER_SNAPSHOT_DIR disables snapshots
+_SNAPSHOT_DIR = os.getenv("RECOMMENDER_SNAPSHOT_DIR", "")
+SNAPSHOT_DIR: Optional[Path] = Path(_SNAPSHOT_DIR) if _SNAPSHOT_DIR else None
+
+# Minimum seconds between saves after incremental updates (full rebuilds
+# are always saved). A restart replays anything newer via the versioned sync.
+SAVE_INTERVAL_SECONDS = float(os.getenv("RECOMMENDER_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+FORMAT_VERSION = 2
+_CURRENT = "CURRENT"
+_MANIFEST = "manifest.json"
+
+
+def save_snapshot(
+    model: Any,
+    engine: str,
+    version: Optional[Tuple[int, ...]],
+    directory: Path,
+    extra: Optional[Dict[str, Any]] = None,
+    extra_arrays: Optional[Dict[str, np.ndarray]] = None,
+) -> str:
+    """
+    Writes `model.to_arrays()` (plus `extra_arrays`) as a new snapshot and
+    makes it current. `extra` is stored in the manifest. Returns the
+    snapshot name.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"snapshot-{int(time.time() * 1000):015d}-{os.getpid()}"
+    tmp = directory / f".{name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    arrays: Dict[str, np.ndarray] = dict(model.to_arrays(), **(extra_arrays or {}))
+    for key, array in arrays.items():
+        np.save(tmp / f"{key}.npy", np.ascontiguousarray(array), allow_pickle=False)
+
+    manifest = dict(extra or {})
+    manifest.update({
+        "format": FORMAT_VERSION,
+        "engine": engine,
+        "version": list(version) if version is not None else None,
+        "arrays": sorted(arrays),
+    })
+    (tmp / _MANIFEST).write_text(json.dumps(manifest))
+
+    os.replace(tmp, directory / name)
+    pointer = directory / f".{_CURRENT}.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, directory / _CURRENT)
+
+    _remove_old(directory)
+    return name
+
+
+def current_name(directory: Path) -> Optional[str]:
+    """Name of the current snapshot, or None if nothing was saved yet."""
+    try:
+        return (directory / _CURRENT).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def load_snapshot(
+    engine: str,
+    directory: Path,
+    name: Optional[str] = None,
+    mmap: bool = True,
+) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """
+    Returns (arrays, manifest) of the named (default: current) snapshot,
+    or None if there is none for this engine. Arrays are read-only memory
+    maps; the manifest's "version" is a tuple and "name" is filled in.
+    """
+    name = name or current_name(directory)
+    if name is None:
+        return None
+    try:
+        path = directory / name
+        manifest = json.loads((path / _MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("format") != FORMAT_VERSION or manifest.get("engine") != engine:
+        return None
+
+    arrays = {
+        key: np.load(path / f"{key}.npy", mmap_mode="r" if mmap else None, allow_pickle=False)
+        for key in manifest["arrays"]
+    }
+    version = manifest["version"]
+    manifest["version"] = tuple(version) if version is not None else None
+    manifest["name"] = name
+    return arrays, manifest
+
+
+def _remove_old(directory: Path, keep: int = 2) -> None:
+    # Keeps the newest snapshots so a reader that just looked up CURRENT can
+    # still open it. Processes already mapping an older one keep their pages
+    # after the unlink.
+    current = current_name(directory)
+    names = sorted(path.name for path in directory.glob("snapshot-*"))
+    for name in names[:-keep]:
+        if name != current:
+            shutil.rmtree(directory / name, ignore_errors=True)
@@ -0,0 +1,41 @@
+"""
+Ranking helpers shared by the recommendation engines.
+"""
+
+from typing import Any, Dict, List, Sequence
+import numpy as np # type: ignore
+
+
+def top_indices(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Returns the indices of the `top_n` highest scores, best first.
+
+    Uses np.partition so only the candidates are sorted, and breaks
+    ties by the lower index so every engine ranks identical scores in
+    the same order.
+    """
+    n = len(scores)
+    if top_n <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if top_n < n:
+        # Keep every score tied with the k-th best so tie-breaking stays stable
+        kth = np.partition(scores, n - top_n)[n - top_n]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order][:top_n]
+
+
+def ranked(scores: np.ndarray, item_ids: Sequence[int], top_n: int) -> List[Dict[str, Any]]:
+    """
+    Turns a score vector into the `[{"item_id", "score"}, ...]` result
+    format, best first, skipping masked (-inf) entries.
+    """
+    return [
+        {"item_id": int(item_ids[i]), "score": float(scores[i])}
+        for i in top_indices(scores, top_n)
+        if scores[i] != -np.inf
+    ]
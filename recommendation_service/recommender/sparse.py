@@ -0,0 +1,381 @@
+"""
+Sparse item-based collaborative filtering engine.
+
+The user × item ratings live in a scipy.sparse CSR matrix with integer
+id <-> index maps, so memory stays proportional to the number of
+interactions. Item–item cosine similarities are never materialised:
+they are computed on demand from the column-normalised matrix.
+
+An incremental update only recomputes what it changes: the rows of the
+users who bid, and the norms and columns of the items they bid on. The
+published matrices are never written into, so the untouched rows are
+copied as they are (no arithmetic) into the new ones.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np # type: ignore
+import scipy.sparse as sp # type: ignore
+
+from .data_loader import Interactions, interaction_columns
+from .ranking import ranked
+
+# An update touching more than this share of the users or items rebuilds
+# the derived matrices in one go instead of patching them row by row
+FULL_REFRESH_FRACTION = 0.1
+
+
+class SparseModel:
+    """
+    User × item interaction model backed by CSR matrices.
+
+    Ratings for repeated (user, item) pairs are averaged, matching the
+    pivot table used by the dense engine.
+    """
+
+    def __init__(
+        self,
+        user_ids: List[int],
+        item_ids: List[int],
+        sums: sp.csr_matrix,
+        counts: sp.csr_matrix,
+    ) -> None:
+        self.user_ids = list(user_ids)
+        self.item_ids = list(item_ids)
+        self.user_index: Dict[int, int] = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index: Dict[int, int] = {it: i for i, it in enumerate(self.item_ids)}
+
+        self._sums = sums
+        self._counts = counts
+        self._refresh()
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_interactions(cls, interactions: Interactions) -> "SparseModel":
+        users, items, ratings = interaction_columns(interactions)
+
+        user_ids, rows = np.unique(users, return_inverse=True)
+        item_ids, cols = np.unique(items, return_inverse=True)
+        shape = (len(user_ids), len(item_ids))
+        # Duplicate (user, item) pairs are summed by the CSR constructor
+        return cls(
+            user_ids.tolist(),
+            item_ids.tolist(),
+            sp.csr_matrix((ratings.astype(float), (rows, cols)), shape=shape),
+            sp.csr_matrix((np.ones(len(ratings)), (rows, cols)), shape=shape),
+        )
+
+    def copy(self) -> "SparseModel":
+        """
+        Independent copy that `apply` can modify while this one is served.
+        `apply` replaces the matrices instead of writing into them, so
+        only the id maps are duplicated.
+        """
+        model = SparseModel.__new__(SparseModel)
+        model.__dict__.update(self.__dict__)
+        model.user_ids = list(self.user_ids)
+        model.item_ids = list(self.item_ids)
+        model.user_index = dict(self.user_index)
+        model.item_index = dict(self.item_index)
+        return model
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Flat arrays for persistence.save_snapshot (derived matrices included)."""
+        arrays = {
+            "user_ids": np.asarray(self.user_ids, dtype=np.int64),
+            "item_ids": np.asarray(self.item_ids, dtype=np.int64),
+        }
+        for name in ("_sums", "_counts", "matrix", "normalized", "normalized_t"):
+            arrays.update(_csr_arrays(name.lstrip("_"), getattr(self, name)))
+        arrays["inv_norms"] = self._inv_norms
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "SparseModel":
+        """
+        Rebuilds a model around (possibly memory-mapped) arrays without
+        copying them; nothing is recomputed.
+        """
+        model = cls.__new__(cls)
+        model.user_ids = arrays["user_ids"].tolist()
+        model.item_ids = arrays["item_ids"].tolist()
+        model.user_index = {u: i for i, u in enumerate(model.user_ids)}
+        model.item_index = {it: i for i, it in enumerate(model.item_ids)}
+        model._sums = _csr_from_arrays(arrays, "sums")
+        model._counts = _csr_from_arrays(arrays, "counts")
+        model.matrix = _csr_from_arrays(arrays, "matrix")
+        model.normalized = _csr_from_arrays(arrays, "normalized")
+        model.normalized_t = _csr_from_arrays(arrays, "normalized_t")
+        if "inv_norms" in arrays:
+            model._inv_norms = arrays["inv_norms"]
+        else:  # saved before the norms were
+            model._inv_norms = _inv_norms(model.matrix)
+        return model
+
+    def _refresh(self) -> None:
+        """Recomputes the averaged ratings and the normalised item vectors."""
+        matrix = self._sums.multiply(self._counts.power(-1)).tocsr()
+        self.matrix: sp.csr_matrix = matrix
+
+        # One per item: 1 / length of its column, 0 for empty columns
+        self._inv_norms: np.ndarray = _inv_norms(matrix)
+
+        # users × items, every item column scaled to unit length
+        self.normalized: sp.csr_matrix = (matrix @ sp.diags(self._inv_norms)).tocsr()
+        # items × users, for fast per-item row access
+        self.normalized_t: sp.csr_matrix = self.normalized.T.tocsr()
+
+    def _refresh_rows(self, users: np.ndarray, items: np.ndarray) -> None:
+        """
+        Updates the derived matrices after the cells of `users` × `items`
+        (sorted matrix positions) changed in the sums and counts.
+        """
+        n_users, n_items = len(self.user_ids), len(self.item_ids)
+
+        # Averaged ratings: only the rows of the users who bid changed
+        rows = self._sums[users].multiply(self._counts[users].power(-1)).tocsr()
+        matrix = _replace_rows(_resized(self.matrix, (n_users, n_items)), users, rows)
+
+        # Every (user, item) pair that can change: the items' raters
+        # before this update, plus the users who just bid
+        normalized_t = _resized(self.normalized_t, (n_items, n_users))
+        raters = np.union1d(normalized_t[items].indices, users)
+
+        # The items' columns, their new norms, and their normalised rows
+        columns = matrix[raters][:, items]  # raters × items
+        norms = np.sqrt(np.asarray(columns.multiply(columns).sum(axis=0)).ravel())
+        inv_norms = np.zeros(n_items)
+        inv_norms[:len(self._inv_norms)] = self._inv_norms
+        inv_norms[items] = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+        item_rows = (columns @ sp.diags(inv_norms[items])).T.tocsr()  # items × raters
+        item_rows = sp.csr_matrix(
+            (item_rows.data, raters[item_rows.indices], item_rows.indptr), shape=(len(items), n_users)
+        )
+
+        self.matrix = matrix
+        self._inv_norms = inv_norms
+        self.normalized_t = _replace_rows(normalized_t, items, item_rows)
+        self.normalized = _replace_rows(
+            _resized(self.normalized, (n_users, n_items)),
+            raters,
+            (matrix[raters] @ sp.diags(inv_norms)).tocsr(),
+        )
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def apply(self, interactions: Interactions) -> List[int]:
+        """
+        Merges new interactions into the model. Returns the touched item ids.
+        """
+        return self.apply_columns(*interaction_columns(interactions))
+
+    def apply_columns(
+        self, users: np.ndarray, items: np.ndarray, ratings: np.ndarray
+    ) -> List[int]:
+        if len(users) == 0:
+            return []
+
+        rows = _positions(users, self.user_ids, self.user_index)
+        cols = _positions(items, self.item_ids, self.item_index)
+        shape = (len(self.user_ids), len(self.item_ids))
+
+        delta_sums = sp.csr_matrix((ratings, (rows, cols)), shape=shape)
+        delta_counts = sp.csr_matrix((np.ones(len(ratings)), (rows, cols)), shape=shape)
+
+        users = np.unique(rows)
+        sums = _resized(self._sums, shape)
+        counts = _resized(self._counts, shape)
+        self._sums = _replace_rows(sums, users, sums[users] + delta_sums[users])
+        self._counts = _replace_rows(counts, users, counts[users] + delta_counts[users])
+
+        touched = np.unique(cols)
+        if len(users) > FULL_REFRESH_FRACTION * shape[0] or len(touched) > FULL_REFRESH_FRACTION * shape[1]:
+            self._refresh()
+        else:
+            self._refresh_rows(users, touched)
+
+        return sorted(set(items.tolist()))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def interacted_items(self, user_id: int) -> List[int]:
+        """Ids of the items the user rated positively."""
+        u = self.user_index.get(user_id)
+        if u is None:
+            return []
+        row = self.matrix.getrow(u)
+        return [self.item_ids[i] for i in row.indices[row.data > 0]]
+
+    def co_rated_indices(self, item_idx: np.ndarray) -> np.ndarray:
+        """Indices of every item sharing at least one rater with the given items."""
+        raters = np.unique(self.normalized_t[item_idx].indices)
+        return np.unique(self.matrix[raters].indices)
+
+    def co_rated_items(self, item_ids: Sequence[int]) -> List[int]:
+        idx = np.array([self.item_index[i] for i in item_ids if i in self.item_index], dtype=np.int64)
+        return [self.item_ids[i] for i in self.co_rated_indices(idx)]
+
+    def user_scores(self, user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (scores over all items, indices of interacted items) for a
+        user, or two empty arrays for unknown / cold-start users.
+        """
+        u = self.user_index.get(user_id)
+        if u is None:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        row = self.matrix.getrow(u)
+        interacted = row.indices[row.data > 0]
+        if len(interacted) == 0:
+            return np.empty(0), interacted
+
+        # scores_j = sum_i r_ui * cos(i, j) = n_j . (sum_i r_ui * n_i)
+        user_profile = self.normalized @ row.toarray().ravel()  # users
+        scores = self.normalized_t @ user_profile  # items
+        return np.asarray(scores, dtype=float), interacted
+
+    def recommend(self, user_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        scores, interacted = self.user_scores(user_id)
+        if len(interacted) == 0:
+            return []
+
+        scores[interacted] = -np.inf
+        return ranked(scores, self.item_ids, top_n)
+
+    def recommend_many(self, user_ids: Sequence[int], top_n: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Scores every known user in one sparse matrix product:
+        (items × users) @ ((users × items) @ (items × batch)).
+        """
+        results: Dict[int, List[Dict[str, Any]]] = {u: [] for u in user_ids}
+        known = [u for u in results if u in self.user_index]
+        if not known:
+            return results
+
+        rows = self.matrix[[self.user_index[u] for u in known]]
+        liked = rows.multiply(rows > 0).tocsr()
+        profiles = self.normalized @ liked.T  # users × batch
+        scores = (self.normalized_t @ profiles).T.toarray()  # batch × items
+
+        for b, user_id in enumerate(known):
+            interacted = liked.indices[liked.indptr[b]:liked.indptr[b + 1]]
+            if len(interacted) == 0:
+                continue  # cold start user
+            scores[b, interacted] = -np.inf
+            results[user_id] = ranked(scores[b], self.item_ids, top_n)
+        return results
+
+    def similar(self, item_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        i = self.item_index.get(item_id)
+        if i is None:
+            return []
+
+        item_vector = self.normalized_t.getrow(i).toarray().ravel()
+        sims = np.asarray(self.normalized_t @ item_vector, dtype=float)
+        sims[i] = -np.inf  # remove itself
+
+        return ranked(sims, self.item_ids, top_n)
+
+    def similar_many(self, item_ids: Sequence[int], top_n: int = 10) -> Dict[int, List[Dict[str, Any]]]:
+        """Similar items for a batch of items in one sparse matrix product."""
+        results: Dict[int, List[Dict[str, Any]]] = {i: [] for i in item_ids}
+        known = [i for i in results if i in self.item_index]
+        if not known:
+            return results
+
+        idx = np.array([self.item_index[i] for i in known], dtype=np.int64)
+        sims = (self.normalized_t[idx] @ self.normalized_t.T).toarray()  # batch × items
+        sims[np.arange(len(idx)), idx] = -np.inf  # remove themselves
+
+        for b, item_id in enumerate(known):
+            results[item_id] = ranked(sims[b], self.item_ids, top_n)
+        return results
+
+
+def _positions(ids: np.ndarray, id_list: List[int], index: Dict[int, int]) -> np.ndarray:
+    """
+    Maps ids to matrix positions, appending unseen ids to `id_list` /
+    `index`. Only the distinct ids go through the Python dict.
+    """
+    distinct, inverse = np.unique(ids, return_inverse=True)
+    positions = np.empty(len(distinct), dtype=np.int64)
+    for k, value in enumerate(distinct.tolist()):
+        pos = index.get(value)
+        if pos is None:
+            pos = index[value] = len(id_list)
+            id_list.append(value)
+        positions[k] = pos
+    return positions[inverse]
+
+
+def _resized(matrix: sp.csr_matrix, shape: Tuple[int, int]) -> sp.csr_matrix:
+    """The matrix grown to `shape` (new rows empty), sharing its arrays."""
+    if matrix.shape == shape:
+        return matrix
+    extra = shape[0] - matrix.shape[0]
+    indptr = np.concatenate([matrix.indptr, np.full(extra, matrix.indptr[-1], dtype=matrix.indptr.dtype)])
+    return sp.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape, copy=False)
+
+
+def _replace_rows(matrix: sp.csr_matrix, rows: np.ndarray, new_rows: sp.csr_matrix) -> sp.csr_matrix:
+    """
+    A new matrix equal to `matrix` except for the given rows (sorted
+    positions), which are taken from `new_rows` in the same order. The
+    other rows are copied slice by slice; `matrix` is left untouched.
+    """
+    new_rows = new_rows.tocsr()
+    new_rows.sum_duplicates()
+    indptr = matrix.indptr
+    lengths = np.diff(indptr)
+    lengths[rows] = np.diff(new_rows.indptr)
+
+    data: List[np.ndarray] = []
+    indices: List[np.ndarray] = []
+    start = 0
+    for k, row in enumerate(rows.tolist()):
+        data.append(matrix.data[indptr[start]:indptr[row]])
+        indices.append(matrix.indices[indptr[start]:indptr[row]])
+        data.append(new_rows.data[new_rows.indptr[k]:new_rows.indptr[k + 1]])
+        indices.append(new_rows.indices[new_rows.indptr[k]:new_rows.indptr[k + 1]])
+        start = row + 1
+    data.append(matrix.data[indptr[start]:])
+    indices.append(matrix.indices[indptr[start]:])
+
+    return sp.csr_matrix(
+        (
+            np.concatenate(data).astype(float, copy=False),
+            np.concatenate(indices).astype(matrix.indices.dtype, copy=False),
+            np.concatenate([[0], np.cumsum(lengths)]),
+        ),
+        shape=matrix.shape,
+    )
+
+
+def _inv_norms(matrix: sp.csr_matrix) -> np.ndarray:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    return np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+
+def _csr_arrays(name: str, matrix: sp.csr_matrix) -> Dict[str, np.ndarray]:
+    return {
+        f"{name}.data": matrix.data,
+        f"{name}.indices": matrix.indices,
+        f"{name}.indptr": matrix.indptr,
+        f"{name}.shape": np.asarray(matrix.shape, dtype=np.int64),
+    }
+
+
+def _csr_from_arrays(arrays: Dict[str, np.ndarray], name: str) -> sp.csr_matrix:
+    shape = tuple(int(n) for n in arrays[f"{name}.shape"])
+    return sp.csr_matrix(
+        (arrays[f"{name}.data"], arrays[f"{name}.indices"], arrays[f"{name}.indptr"]),
+        shape=shape,
+        copy=False,
+    )
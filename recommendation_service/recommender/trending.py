@@ -0,0 +1,151 @@
+"""
+Trending items: the fallback ranking for unknown and cold-start users.
+
+Every bid adds a weight that halves every RECOMMENDER_TRENDING_HALF_LIFE_HOURS,
+so an item's score is its time-decayed bid count. All scores decay by the
+same factor, so the ranking only changes when bids arrive: it is kept
+precomputed (ids sorted by score) and a query just reads its head, in
+O(top_n). Newly listed items are announced by the auction service and
+enter the ranking with a score of 0, newest first, until they get bids;
+listings it announces as closed leave the ranking.
+
+An update only re-ranks the items it changes: they are taken out and
+merged back in by binary search, instead of sorting every item again.
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np # type: ignore
+
+from .data_loader import Interactions, ended_items, interaction_columns, interaction_timestamps, new_items
+
+HALF_LIFE_SECONDS = float(os.getenv("RECOMMENDER_TRENDING_HALF_LIFE_HOURS", "24")) * 3600
+
+
+class TrendingIndex:
+    """
+    Item ids ranked by decayed bid count. `weights` are expressed at the
+    `reference` time (the newest bid seen), which keeps them <= the raw
+    counts; the arrays are never modified, updates build new ones.
+    """
+
+    def __init__(self, item_ids: np.ndarray, weights: np.ndarray, reference: float) -> None:
+        self.item_ids = item_ids  # ranked, best first
+        self.weights = weights
+        self.reference = reference
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def empty(cls) -> "TrendingIndex":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=float), time.time())
+
+    @classmethod
+    def from_interactions(cls, interactions: Interactions) -> "TrendingIndex":
+        index = cls.empty()
+        index.apply(interactions)
+        return index
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "item_ids": self.item_ids,
+            "weights": self.weights,
+            "reference": np.array([self.reference], dtype=float),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "TrendingIndex":
+        return cls(arrays["item_ids"], arrays["weights"], float(arrays["reference"][0]))
+
+    def copy(self) -> "TrendingIndex":
+        # `apply` replaces the arrays instead of writing into them
+        return TrendingIndex(self.item_ids, self.weights, self.reference)
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def apply(self, interactions: Interactions) -> None:
+        """
+        Adds the decayed weight of new bids and the announced items, drops
+        the closed ones, then re-ranks the changed items.
+        """
+        _, items, _ = interaction_columns(interactions)
+        timestamps = interaction_timestamps(interactions)
+        announced = new_items(interactions)
+        closed = set(ended_items(interactions).tolist())
+        if len(items) == 0 and len(announced) == 0 and not closed:
+            return
+
+        reference = max(self.reference, float(timestamps.max()) if len(items) else self.reference)
+        # Re-express the existing weights at the new reference time (the
+        # same factor for all of them, so their order is kept)
+        weights = self.weights * _decay(reference - self.reference)
+
+        changed: Dict[int, float] = {}
+        for item_id in announced.tolist():
+            changed.setdefault(item_id, 0.0)
+        for item_id, weight in zip(items.tolist(), _decay(reference - timestamps).tolist()):
+            changed[item_id] = changed.get(item_id, 0.0) + weight
+
+        # Take the changed and closed items out of the ranking
+        taken = np.isin(self.item_ids, np.fromiter(changed.keys() | closed, dtype=np.int64))
+        for item_id, weight in zip(self.item_ids[taken].tolist(), weights[taken].tolist()):
+            if item_id in changed:
+                changed[item_id] += weight
+        for item_id in closed:
+            changed.pop(item_id, None)
+        ids = self.item_ids[~taken]
+        weights = weights[~taken]
+
+        # ... and merge the changed ones back in. Highest weight first;
+        # ties (e.g. unbid new listings) newest first.
+        new_ids = np.fromiter(changed.keys(), dtype=np.int64, count=len(changed))
+        new_weights = np.fromiter(changed.values(), dtype=float, count=len(changed))
+        order = np.lexsort((-new_ids, -new_weights))
+        new_ids, new_weights = new_ids[order], new_weights[order]
+
+        descending = -weights  # ascending, for searchsorted
+        positions = np.empty(len(new_ids), dtype=np.int64)
+        for k, (item_id, weight) in enumerate(zip(new_ids.tolist(), new_weights.tolist())):
+            lo = int(np.searchsorted(descending, -weight, side="left"))
+            hi = int(np.searchsorted(descending, -weight, side="right"))
+            # Ids in a run of equal weights are descending
+            positions[k] = hi - int(np.searchsorted(ids[lo:hi][::-1], item_id, side="right"))
+
+        self.item_ids = np.insert(ids, positions, new_ids)
+        self.weights = np.insert(weights, positions, new_weights)
+        self.reference = reference
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def top(self, top_n: int = 10, exclude: Iterable[int] = (), now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        The `top_n` trending items not in `exclude`, scored by their
+        decayed bid count at `now`.
+        """
+        skip = set(exclude)
+        # At most len(skip) of the head can be excluded
+        head = top_n + len(skip)
+        ids: Sequence[int] = self.item_ids[:head].tolist()
+        scale = _decay((time.time() if now is None else now) - self.reference)
+        weights = (self.weights[:head] * scale).tolist()
+
+        results: List[Dict[str, Any]] = []
+        for item_id, weight in zip(ids, weights):
+            if item_id in skip:
+                continue
+            results.append({"item_id": item_id, "score": weight})
+            if len(results) == top_n:
+                break
+        return results
+
+
+def _decay(age_seconds):
+    """Remaining fraction of a bid's weight after `age_seconds`."""
+    return np.exp2(-np.asarray(age_seconds, dtype=float) / HALF_LIFE_SECONDS)
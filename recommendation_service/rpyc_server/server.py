@@ -1,8 +1,39 @@
 import os
+from typing import Any, Dict, List, Optional, Tuple
 import rpyc
 from rpyc.utils.server import ThreadedServer
 from recommender import algorithms
-from recommender import data_loader
+from rpyc_server import wire
+
+
+def _deserialize_interactions(interactions_netref) -> List[Dict[str, Any]]:
+    """Copies RPyC objects into plain Python dicts."""
+    clean_data = []
+    for item in interactions_netref:
+        clean_data.append({
+            "user_id": int(item["user_id"]),
+            "item_id": int(item["item_id"]),
+            "rating": float(item["rating"])
+        })
+    return clean_data
+
+
+def _row_count(interactions) -> int:
+    if isinstance(interactions, dict):
+        return len(interactions["user_id"])
+    return len(interactions)
+
+
+def _pack_batch(results: Dict[int, List[Dict[str, Any]]]) -> Tuple:
+    """
+    Converts {id: [{"item_id", "score"}, ...]} into nested tuples of plain
+    ints/floats, which RPyC sends by value instead of as netrefs.
+    """
+    return tuple(
+        (key, tuple((row["item_id"], row["score"]) for row in rows))
+        for key, rows in results.items()
+    )
+
 
 class RecommendationService(rpyc.Service):
     """
@@ -10,82 +41,144 @@ class RecommendationService(rpyc.Service):
     """
 
     def exposed_warmup(self) -> bool:
-        algorithms._INTERACTION_MATRIX = None
-        algorithms._ITEM_SIMILARITY = None
+        # Rebuilt in the background; queries keep using the current model
+        algorithms.reset_models()
         return True
 
     def exposed_load_interactions(self, interactions_netref) -> bool:
         """
-        Receives live data from Auction Service and injects it into the
-        algorithm's memory.
+        Receives live data from Auction Service and replaces the
+        algorithm's model with one built from it.
+        """
+        return self._rebuild(_deserialize_interactions(interactions_netref))
+
+    def exposed_apply_interactions(self, interactions_netref) -> bool:
+        """
+        Receives new interactions (e.g. a freshly placed bid) and merges them
+        into the existing model without a full rebuild.
+        """
+        return self._apply(_deserialize_interactions(interactions_netref))
+
+    def exposed_get_version(self):
+        """Returns the data version the model holds (None = never synced)."""
+        return algorithms.get_data_version()
+
+    def exposed_sync_interactions(self, base_version, interactions_netref, version):
+        """
+        Versioned sync: applies the interactions recorded after `base_version`
+        (or a full snapshot when `base_version` is None) and acknowledges the
+        version now held. A mismatched base is not applied; the caller
+        resends from the returned version.
         """
-        # 1. Deserialize RPyC objects
-        clean_data = []
-        for item in interactions_netref:
-            clean_data.append({
-                "user_id": int(item["user_id"]),
-                "item_id": int(item["item_id"]),
-                "rating": float(item["rating"])
-            })
-
-        print(f"[Server] Received {len(clean_data)} interactions from Auction Service.")
-
-        # 2. INJECTION: Create the closure that returns our live data
-        def injected_loader():
-            return clean_data
-            
-        # 3. SAVE ORIGINAL REFERENCES
-        # We must save the function from BOTH locations to be safe
-        original_loader_source = data_loader.load_interactions
-        original_loader_dest = getattr(algorithms, "load_interactions", None)
+        return self._sync(base_version, _deserialize_interactions(interactions_netref), version)
+
+    # ---------- Packed variants (one bytes payload, see wire.py) ----------
+
+    def exposed_load_interactions_packed(self, payload: bytes) -> bool:
+        return self._rebuild(wire.unpack_interactions(payload))
+
+    def exposed_apply_interactions_packed(self, payload: bytes) -> bool:
+        return self._apply(wire.unpack_interactions(payload))
+
+    def exposed_sync_interactions_packed(self, base_version, payload: bytes, version):
+        return self._sync(base_version, wire.unpack_interactions(payload), version)
+
+    def _rebuild(self, interactions) -> bool:
+        print(f"[Server] Received {_row_count(interactions)} interactions from Auction Service.")
 
         try:
-            # 4. APPLY MONKEY PATCH
-            # Patch the source module
-            data_loader.load_interactions = injected_loader
-            
-            # CRITICAL FIX: Patch the destination module where it was imported!
-            if hasattr(algorithms, "load_interactions"):
-                algorithms.load_interactions = injected_loader
-            
-            # 5. FORCE REBUILD
-            algorithms._INTERACTION_MATRIX = None
-            algorithms._ITEM_SIMILARITY = None
-            
-            # This will now call our injected_loader()
-            algorithms._ensure_models_loaded()
-            print("[Server] Models rebuilt successfully with live data.")
-            
+            algorithms.rebuild_models(interactions)
+            print("[Server] Model rebuild with live data queued.")
         except Exception as e:
             print(f"[Server] Error processing interactions: {e}")
             return False
-        finally:
-            # 6. RESTORE ORIGINALS (Cleanup)
-            data_loader.load_interactions = original_loader_source
-            if original_loader_dest:
-                algorithms.load_interactions = original_loader_dest
 
         return True
 
+    def _apply(self, interactions) -> bool:
+        try:
+            algorithms.apply_interactions(interactions)
+            print(f"[Server] Queued {_row_count(interactions)} interactions for the model.")
+        except Exception as e:
+            print(f"[Server] Error applying interactions: {e}")
+            return False
+
+        return True
+
+    def _sync(self, base_version, interactions, version):
+        base = tuple(int(v) for v in base_version) if base_version is not None else None
+        new = tuple(int(v) for v in version)
+
+        try:
+            held = algorithms.sync_interactions(base, interactions, new)
+        except Exception as e:
+            print(f"[Server] Error syncing interactions: {e}")
+            return algorithms.get_data_version()
+
+        print(f"[Server] Sync {base} -> {new}: {_row_count(interactions)} interactions, holding {held}.")
+        return held
+
     def exposed_recommend_for_user(self, user_id: int, top_n: int = 10):
         return algorithms.get_recommendations_for_user(int(user_id), int(top_n))
 
     def exposed_similar_items(self, item_id: int, top_n: int = 10):
         return algorithms.get_similar_items(int(item_id), int(top_n))
 
+    # ---------- Batch endpoints (many ids per round trip) ----------
+
+    def exposed_recommend_for_users(self, user_ids, top_n: int = 10):
+        """
+        Recommendations for many users at once. Returns a compact,
+        pass-by-value tuple: ((user_id, ((item_id, score), ...)), ...)
+        """
+        ids = [int(u) for u in tuple(user_ids)]
+        return _pack_batch(algorithms.get_recommendations_for_users(ids, int(top_n)))
+
+    def exposed_similar_items_many(self, item_ids, top_n: int = 10):
+        """Similar items for many items at once, in the same compact format."""
+        ids = [int(i) for i in tuple(item_ids)]
+        return _pack_batch(algorithms.get_similar_items_many(ids, int(top_n)))
+
+    def exposed_recommend_for_users_packed(self, user_ids, top_n: int = 10) -> bytes:
+        """Batch recommendations as one "SBR1" bytes payload."""
+        ids = [int(u) for u in tuple(user_ids)]
+        return wire.pack_results(algorithms.get_recommendations_for_users(ids, int(top_n)))
+
+    def exposed_similar_items_many_packed(self, item_ids, top_n: int = 10) -> bytes:
+        """Batch similar items as one "SBR1" bytes payload."""
+        ids = [int(i) for i in tuple(item_ids)]
+        return wire.pack_results(algorithms.get_similar_items_many(ids, int(top_n)))
+
+    def exposed_cache_stats(self):
+        """Result cache counters as ((name, value), ...)."""
+        return tuple(algorithms.cache_stats().items())
+
 # ---------- Server Bootstrap ----------
 
-def run_server(host: str = "127.0.0.1", port: int = 18861) -> None:
+PROTOCOL_CONFIG = {
+    "allow_public_attrs": False,
+    "allow_all_attrs": False,
+    "allow_pickle": False,
+}
+
+
+def run_server(host: str = "127.0.0.1", port: int = 18861, workers: Optional[int] = None) -> None:
+    if workers is None:
+        workers = int(os.getenv("RECOMMENDER_WORKERS", "1"))
+    if workers > 1:
+        # Pre-forked worker processes sharing one memory-mapped model
+        from rpyc_server.workers import run_prefork
+        run_prefork(host, port, workers)
+        return
+
     server = ThreadedServer(
         RecommendationService,
         hostname=host,
         port=port,
-        protocol_config={
-            "allow_public_attrs": False,
-            "allow_all_attrs": False,
-            "allow_pickle": False,
-        },
+        protocol_config=dict(PROTOCOL_CONFIG),
     )
+    # Build the initial model in the background instead of on the first request
+    algorithms.preload()
     print(f"[Recommender] RPyC server listening on {host}:{port}")
     server.start()
 
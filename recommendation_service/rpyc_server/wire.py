@@ -0,0 +1,120 @@
+"""
+Bulk wire format between the Auction Service and the recommender.
+
+Sending Python lists/dicts over RPyC turns every element access into a
+network round trip (netrefs). Instead, bulk data travels as one `bytes`
+payload (passed by value) holding little-endian columnar arrays that are
+decoded with np.frombuffer, without a per-row Python loop.
+
+Interactions ("SBI2"):
+    header   <4sII : magic, n_rows, n_columns
+    columns        : user_id int64[n], item_id int64[n], rating float64[n],
+                     timestamp float64[n] (Unix seconds)
+    new items <I   : n_items, then item_id int64[n_items] – listings
+                     announced since the last sync (they have no bids yet)
+    ended     <I   : n_items, then item_id int64[n_items] – listings that
+                     closed (optional: older senders stop after new items)
+
+"SBI1" payloads (the first three columns only) are still accepted.
+
+Results ("SBR1"), for one or many query ids:
+    header   <4sII : magic, n_keys, n_rows
+    keys           : int64[n_keys]   – the queried user/item ids
+    counts         : int64[n_keys]   – number of results per key
+    item_ids       : int64[n_rows]
+    scores         : float64[n_rows]
+
+The Auction Service keeps a mirror of this module in core/services/wire.py.
+"""
+
+import struct
+from typing import Any, Dict, List
+import numpy as np # type: ignore
+
+from recommender.data_loader import (
+    Interactions, ended_items, interaction_columns, interaction_timestamps, new_items,
+)
+
+
+INTERACTIONS_MAGIC = b"SBI2"
+LEGACY_INTERACTIONS_MAGIC = b"SBI1"
+RESULTS_MAGIC = b"SBR1"
+
+_HEADER = struct.Struct("<4sII")
+_COUNT = struct.Struct("<I")
+_INTERACTION_COLUMNS = (
+    ("user_id", "<i8"), ("item_id", "<i8"), ("rating", "<f8"), ("timestamp", "<f8"),
+)
+
+
+def unpack_interactions(payload: bytes) -> Dict[str, np.ndarray]:
+    """
+    Decodes an "SBI2" (or "SBI1") payload into {"user_id", "item_id",
+    "rating", "timestamp", "new_items", "ended_items"} arrays; an "SBI1"
+    payload has no timestamps and no new or ended items.
+    """
+    payload = bytes(payload)
+    magic, n_rows, n_columns = _HEADER.unpack_from(payload, 0)
+    legacy = magic == LEGACY_INTERACTIONS_MAGIC
+    expected = 3 if legacy else len(_INTERACTION_COLUMNS)
+    if (magic != INTERACTIONS_MAGIC and not legacy) or n_columns < expected:
+        raise ValueError(f"Not an interactions payload: {magic!r}, {n_columns} columns")
+
+    offset = _HEADER.size
+    columns: Dict[str, np.ndarray] = {}
+    for name, dtype in _INTERACTION_COLUMNS[:expected]:
+        columns[name] = np.frombuffer(payload, dtype=dtype, count=n_rows, offset=offset)
+        offset += n_rows * 8
+    if legacy:
+        return columns
+
+    offset += (n_columns - expected) * n_rows * 8  # columns added by newer senders
+    for name in ("new_items", "ended_items"):
+        if offset >= len(payload):
+            columns[name] = np.empty(0, dtype="<i8")
+            continue
+        (n_items,) = _COUNT.unpack_from(payload, offset)
+        offset += _COUNT.size
+        columns[name] = np.frombuffer(payload, dtype="<i8", count=n_items, offset=offset)
+        offset += n_items * 8
+    return columns
+
+
+def pack_interactions(interactions: Interactions) -> bytes:
+    """Encodes interactions (rows or columns) as an "SBI2" payload."""
+    users, items, ratings = interaction_columns(interactions)
+    announced = new_items(interactions)
+    ended = ended_items(interactions)
+    return b"".join([
+        _HEADER.pack(INTERACTIONS_MAGIC, len(users), len(_INTERACTION_COLUMNS)),
+        users.astype("<i8").tobytes(),
+        items.astype("<i8").tobytes(),
+        ratings.astype("<f8").tobytes(),
+        interaction_timestamps(interactions).astype("<f8").tobytes(),
+        _COUNT.pack(len(announced)),
+        announced.astype("<i8").tobytes(),
+        _COUNT.pack(len(ended)),
+        ended.astype("<i8").tobytes(),
+    ])
+
+
+def pack_results(results: Dict[int, List[Dict[str, Any]]]) -> bytes:
+    """Encodes {id: [{"item_id", "score"}, ...]} as an "SBR1" payload."""
+    keys = np.fromiter(results.keys(), dtype="<i8", count=len(results))
+    counts = np.fromiter((len(rows) for rows in results.values()), dtype="<i8", count=len(results))
+    n_rows = int(counts.sum())
+
+    item_ids = np.fromiter(
+        (row["item_id"] for rows in results.values() for row in rows), dtype="<i8", count=n_rows
+    )
+    scores = np.fromiter(
+        (row["score"] for rows in results.values() for row in rows), dtype="<f8", count=n_rows
+    )
+
+    return b"".join([
+        _HEADER.pack(RESULTS_MAGIC, len(keys), n_rows),
+        keys.tobytes(),
+        counts.tobytes(),
+        item_ids.tobytes(),
+        scores.tobytes(),
+    ])
@@ -0,0 +1,165 @@
+"""
+Multi-process serving (RECOMMENDER_WORKERS > 1).
+
+One ThreadedServer scores every request under a single GIL. In this mode
+the process layout is:
+
+    leader  – the parent process. Owns the model builder (the only
+              writer), saves every update as a snapshot (persistence.py)
+              and serves updates on a private Unix socket.
+    workers – N forked children accepting on the shared public port. They
+              map the leader's latest snapshot read-only, so the model
+              pages are shared, score queries in parallel, and forward
+              updates to the leader.
+
+The workers are forked before any thread or model exists, and all accept
+on the one listening socket inherited from the parent, so the kernel
+spreads connections across them. POSIX only (needs os.fork).
+"""
+
+import os
+import signal
+import threading
+from typing import List, Optional
+
+import rpyc
+from rpyc.utils.factory import unix_connect
+from rpyc.utils.server import ThreadedServer
+
+from recommender import algorithms, persistence
+from rpyc_server import wire
+from rpyc_server.server import PROTOCOL_CONFIG, RecommendationService, _deserialize_interactions
+
+
+def leader_socket_path() -> str:
+    return str(persistence.SNAPSHOT_DIR / "leader.sock")
+
+
+# ---------- Worker side ----------
+
+_LEADER: Optional[rpyc.Connection] = None
+_LEADER_LOCK = threading.Lock()
+
+
+def _leader():
+    """Connection to the leader's control socket (reconnects on demand)."""
+    global _LEADER
+
+    with _LEADER_LOCK:
+        if _LEADER is None or _LEADER.closed:
+            _LEADER = unix_connect(
+                leader_socket_path(),
+                config={"sync_request_timeout": 30, "allow_pickle": False},
+            )
+        return _LEADER.root
+
+
+def _as_version(version):
+    return tuple(int(v) for v in version) if version is not None else None
+
+
+class WorkerService(RecommendationService):
+    """
+    Serves queries from the mapped snapshot; every update is forwarded to
+    the leader as one packed payload.
+    """
+
+    def exposed_warmup(self) -> bool:
+        return bool(_leader().warmup())
+
+    def exposed_get_version(self):
+        return _as_version(_leader().get_version())
+
+    def exposed_load_interactions(self, interactions_netref) -> bool:
+        payload = wire.pack_interactions(_deserialize_interactions(interactions_netref))
+        return self.exposed_load_interactions_packed(payload)
+
+    def exposed_apply_interactions(self, interactions_netref) -> bool:
+        payload = wire.pack_interactions(_deserialize_interactions(interactions_netref))
+        return self.exposed_apply_interactions_packed(payload)
+
+    def exposed_sync_interactions(self, base_version, interactions_netref, version):
+        payload = wire.pack_interactions(_deserialize_interactions(interactions_netref))
+        return self.exposed_sync_interactions_packed(base_version, payload, version)
+
+    def exposed_load_interactions_packed(self, payload: bytes) -> bool:
+        return bool(_leader().load_interactions_packed(bytes(payload)))
+
+    def exposed_apply_interactions_packed(self, payload: bytes) -> bool:
+        return bool(_leader().apply_interactions_packed(bytes(payload)))
+
+    def exposed_sync_interactions_packed(self, base_version, payload: bytes, version):
+        acked = _leader().sync_interactions_packed(
+            _as_version(base_version), bytes(payload), _as_version(version)
+        )
+        return _as_version(acked)
+
+
+def _run_worker(server: ThreadedServer) -> None:
+    algorithms.follow_snapshots()
+    print(f"[Recommender] Worker {os.getpid()} serving on {server.host}:{server.port}")
+    server.start()
+
+
+# ---------- Leader side ----------
+
+def _run_leader(children: List[int]) -> None:
+    path = leader_socket_path()
+    if os.path.exists(path):
+        os.unlink(path)
+
+    control = ThreadedServer(
+        RecommendationService, socket_path=path, protocol_config=dict(PROTOCOL_CONFIG)
+    )
+
+    def _stop(signum, frame):
+        control.close()
+
+    signal.signal(signal.SIGTERM, _stop)
+
+    algorithms.lead()
+    print(f"[Recommender] Leader {os.getpid()} accepting updates on {path}")
+    try:
+        control.start()
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+def run_prefork(host: str, port: int, workers: int) -> None:
+    if not hasattr(os, "fork") or persistence.SNAPSHOT_DIR is None:
+        print("[Recommender] Multi-process serving needs os.fork and a snapshot directory; "
+              "starting a single process.")
+        from rpyc_server.server import run_server
+        run_server(host, port, workers=1)
+        return
+
+    persistence.SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Bound once here; every worker accepts on this same inherited socket
+    server = ThreadedServer(
+        WorkerService, hostname=host, port=port, protocol_config=dict(PROTOCOL_CONFIG)
+    )
+    print(f"[Recommender] RPyC server listening on {host}:{port} with {workers} workers")
+
+    children: List[int] = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(server)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    # The leader never serves the public port
+    server.listener.close()
+    _run_leader(children)
@@ -0,0 +1,63 @@
+"""Result cache invalidation."""
+
+import unittest
+
+from recommender.cache import ResultCache
+
+
+class ResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache(max_entries=10, ttl_seconds=60)
+        epoch = self.cache.epoch
+        self.cache.put(("recs", 1), "recs 1", epoch, user_id=1, items=[10, 11])
+        self.cache.put(("recs", 2), "recs 2", epoch, user_id=2, items=[12])
+        self.cache.put(("similar", 11), "similar 11", epoch, items=[11, 13])
+
+    def test_invalidate_user(self):
+        self.assertEqual(self.cache.invalidate(user_ids=[1]), 1)
+
+        self.assertIsNone(self.cache.get(("recs", 1)))
+        self.assertEqual(self.cache.get(("recs", 2)), "recs 2")
+        self.assertEqual(self.cache.get(("similar", 11)), "similar 11")
+
+    def test_invalidate_item_drops_every_dependent_entry(self):
+        self.assertEqual(self.cache.invalidate(item_ids=[11]), 2)
+
+        self.assertIsNone(self.cache.get(("recs", 1)))
+        self.assertIsNone(self.cache.get(("similar", 11)))
+        self.assertEqual(self.cache.get(("recs", 2)), "recs 2")
+
+    def test_invalidate_unrelated_ids_keeps_entries(self):
+        self.assertEqual(self.cache.invalidate(user_ids=[3], item_ids=[99]), 0)
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+    def test_put_with_a_stale_epoch_is_ignored(self):
+        epoch = self.cache.epoch
+        self.cache.invalidate(item_ids=[99])  # the model changed meanwhile
+
+        self.cache.put(("recs", 3), "recs 3", epoch, user_id=3)
+
+        self.assertIsNone(self.cache.get(("recs", 3)))
+        self.cache.put(("recs", 3), "recs 3", self.cache.epoch, user_id=3)
+        self.assertEqual(self.cache.get(("recs", 3)), "recs 3")
+
+    def test_clear_drops_everything_and_bumps_the_epoch(self):
+        epoch = self.cache.epoch
+
+        self.cache.clear()
+
+        self.assertGreater(self.cache.epoch, epoch)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.cache.put(("recs", 1), "recs 1", epoch, user_id=1)
+        self.assertIsNone(self.cache.get(("recs", 1)))
+
+    def test_invalidated_entry_no_longer_indexed(self):
+        self.cache.invalidate(user_ids=[1])
+        self.cache.put(("recs", 1), "new recs 1", self.cache.epoch, user_id=1, items=[14])
+
+        self.assertEqual(self.cache.invalidate(item_ids=[10]), 0)
+        self.assertEqual(self.cache.get(("recs", 1)), "new recs 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Incremental `apply` must give the same model as a rebuild from all the data."""
+
+import unittest
+from typing import Any, Dict, List
+import numpy as np # type: ignore
+
+from recommender.dense import DenseModel
+from recommender.neighbours import TopKModel
+from recommender.sparse import SparseModel
+
+
+def _interactions(rng: np.random.Generator, n: int, users: int, items: int) -> Dict[str, np.ndarray]:
+    return {
+        "user_id": rng.integers(0, users, n),
+        "item_id": rng.integers(100, 100 + items, n),
+        "rating": rng.integers(1, 6, n).astype(float),
+    }
+
+
+def _concat(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {key: np.concatenate([a[key], b[key]]) for key in a}
+
+
+def _user_ids(model) -> List[int]:
+    # TopKModel keeps its ratings in a SparseModel
+    return list(getattr(model, "interactions", model).user_ids)
+
+
+def _scores(results: List[Dict[str, Any]]) -> Dict[int, float]:
+    return {int(r["item_id"]): round(float(r["score"]), 6) for r in results}
+
+
+class ApplyMatchesRebuildTests(unittest.TestCase):
+    ENGINES = (DenseModel, SparseModel, TopKModel)
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.base = _interactions(rng, 300, users=40, items=25)
+        # Known users and items, repeated (user, item) pairs, and new ones of both
+        self.deltas = [
+            _interactions(rng, 1, users=40, items=25),
+            _interactions(rng, 20, users=45, items=28),
+            {"user_id": np.array([99, 99]), "item_id": np.array([200, 100]), "rating": np.array([4.0, 2.0])},
+        ]
+
+    def _assert_same(self, model, rebuilt) -> None:
+        self.assertEqual(sorted(model.item_ids), sorted(rebuilt.item_ids))
+        n = len(rebuilt.item_ids)
+        users = sorted(set(_user_ids(rebuilt)) | {12345})  # plus an unknown one
+        for user_id in users:
+            self.assertEqual(
+                _scores(model.recommend(user_id, n)), _scores(rebuilt.recommend(user_id, n)), f"user {user_id}"
+            )
+        for user_id, results in model.recommend_many(users, n).items():
+            self.assertEqual(_scores(results), _scores(rebuilt.recommend(user_id, n)), f"user {user_id}")
+        for item_id in rebuilt.item_ids:
+            self.assertEqual(_scores(model.similar(item_id, n)), _scores(rebuilt.similar(item_id, n)), f"item {item_id}")
+
+    def test_apply_matches_rebuild(self):
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                model = engine.from_interactions(self.base)
+                seen = self.base
+                for delta in self.deltas:
+                    model = model.copy()
+                    touched = model.apply(delta)
+                    self.assertEqual(sorted(touched), sorted(set(delta["item_id"].tolist())))
+                    seen = _concat(seen, delta)
+                    self._assert_same(model, engine.from_interactions(seen))
+
+    def test_apply_leaves_the_copied_model_unchanged(self):
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                served = engine.from_interactions(self.base)
+                before = {u: _scores(served.recommend(u, 30)) for u in _user_ids(served)}
+                served.copy().apply(self.deltas[1])
+                self.assertEqual({u: _scores(served.recommend(u, 30)) for u in _user_ids(served)}, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
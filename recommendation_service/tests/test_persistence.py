@@ -0,0 +1,81 @@
+"""Model snapshots: saved, memory-mapped back and updated like a built model."""
+
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np # type: ignore
+
+from recommender import persistence
+from recommender.dense import DenseModel
+from recommender.neighbours import TopKModel
+from recommender.sparse import SparseModel
+
+ENGINES = {"dense": DenseModel, "sparse": SparseModel, "topk": TopKModel}
+
+
+class SnapshotRoundTripTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.interactions = {
+            "user_id": rng.integers(0, 30, 200),
+            "item_id": rng.integers(100, 120, 200),
+            "rating": rng.integers(1, 6, 200).astype(float),
+        }
+        self.delta = {"user_id": np.array([2, 50]), "item_id": np.array([130, 101]), "rating": np.array([4.0, 3.0])}
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+
+    def _results(self, model):
+        return [model.recommend(user_id, 5) for user_id in range(0, 60, 7)] + [
+            model.similar(item_id, 5) for item_id in (100, 105, 130)
+        ]
+
+    def test_round_trip(self):
+        for name, engine in ENGINES.items():
+            with self.subTest(engine=name):
+                model = engine.from_interactions(self.interactions)
+                persistence.save_snapshot(model, name, (7, 3), self.directory, extra={"generation": 4})
+
+                arrays, manifest = persistence.load_snapshot(name, self.directory)
+
+                self.assertEqual(manifest["version"], (7, 3))
+                self.assertEqual(manifest["generation"], 4)
+                self.assertTrue(all(isinstance(a, np.memmap) for a in arrays.values()))
+                self.assertEqual(self._results(engine.from_arrays(arrays)), self._results(model))
+
+    def test_apply_on_a_memory_mapped_model(self):
+        for name, engine in ENGINES.items():
+            with self.subTest(engine=name):
+                model = engine.from_interactions(self.interactions)
+                persistence.save_snapshot(model, name, None, self.directory)
+                arrays, _ = persistence.load_snapshot(name, self.directory)
+                restored = engine.from_arrays(arrays)
+
+                # The mapped arrays are read-only: apply must work on a copy
+                updated = restored.copy()
+                updated.apply(self.delta)
+                model.apply(self.delta)
+
+                self.assertEqual(self._results(updated), self._results(model))
+                self.assertEqual(self._results(restored), self._results(engine.from_arrays(arrays)))
+
+    def test_snapshot_of_another_engine_is_not_loaded(self):
+        persistence.save_snapshot(DenseModel.from_interactions(self.interactions), "dense", None, self.directory)
+
+        self.assertIsNone(persistence.load_snapshot("sparse", self.directory))
+        self.assertIsNone(persistence.load_snapshot("dense", self.directory / "missing"))
+
+    def test_latest_snapshot_is_current(self):
+        model = SparseModel.from_interactions(self.interactions)
+        first = persistence.save_snapshot(model, "sparse", (1, 1), self.directory)
+        second = persistence.save_snapshot(model, "sparse", (2, 1), self.directory)
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(persistence.current_name(self.directory), second)
+        self.assertEqual(persistence.load_snapshot("sparse", self.directory)[1]["version"], (2, 1))
+        self.assertEqual(persistence.load_snapshot("sparse", self.directory, first)[1]["version"], (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Versioned sync between the auction service and the served model."""
+
+import unittest
+import numpy as np # type: ignore
+
+from recommender import algorithms
+
+
+def _bids(users, items, ratings=None):
+    ratings = ratings if ratings is not None else [5.0] * len(users)
+    return {"user_id": np.array(users), "item_id": np.array(items), "rating": np.array(ratings, dtype=float)}
+
+
+class SyncInteractionsTests(unittest.TestCase):
+    def setUp(self):
+        algorithms.rebuild_models(
+            _bids([1, 1, 2, 2, 3], [10, 11, 10, 12, 11]), version=(5, 12), wait=True
+        )
+
+    def _rated_items(self, user_id):
+        return {r["item_id"] for r in algorithms.get_recommendations_for_user(user_id, 10)}
+
+    def test_rebuild_sets_the_version(self):
+        self.assertEqual(algorithms.get_data_version(), (5, 12))
+
+    def test_matching_base_applies_the_delta(self):
+        held = algorithms.sync_interactions((5, 12), _bids([3], [12]), (6, 12), wait=True)
+
+        self.assertEqual(held, (6, 12))
+        self.assertEqual(algorithms.get_data_version(), (6, 12))
+        # User 3 now rated 12, so it is no longer recommended to them
+        self.assertNotIn(12, self._rated_items(3))
+
+    def test_mismatched_base_is_rejected(self):
+        before = self._rated_items(3)
+
+        held = algorithms.sync_interactions((4, 12), _bids([3], [12]), (6, 12), wait=True)
+
+        self.assertEqual(held, (5, 12))
+        self.assertEqual(algorithms.get_data_version(), (5, 12))
+        algorithms.wait_for_builds()
+        self.assertEqual(self._rated_items(3), before)
+
+    def test_sender_resumes_from_the_returned_version(self):
+        algorithms.sync_interactions((5, 12), _bids([4], [10]), (6, 12), wait=True)
+        stale = algorithms.sync_interactions((5, 12), _bids([4], [11]), (7, 12), wait=True)
+
+        held = algorithms.sync_interactions(stale, _bids([4], [11]), (7, 12), wait=True)
+
+        self.assertEqual(held, (7, 12))
+
+    def test_no_base_rebuilds_from_the_snapshot(self):
+        held = algorithms.sync_interactions(None, _bids([7, 8], [20, 20]), (2, 20), wait=True)
+
+        self.assertEqual(held, (2, 20))
+        self.assertEqual(algorithms.get_similar_items(10, 10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Trending fallback ranking."""
+
+import time
+import unittest
+import numpy as np # type: ignore
+
+from recommender import algorithms
+from recommender.trending import TrendingIndex
+
+
+def _ids(results):
+    return [r["item_id"] for r in results]
+
+
+class TrendingIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.now = time.time()
+        self.index = TrendingIndex.from_interactions({
+            "user_id": np.array([1, 2, 3, 1, 2, 1]),
+            "item_id": np.array([10, 10, 10, 11, 11, 12]),
+            "rating": np.ones(6),
+            "timestamp": np.full(6, self.now),
+        })
+
+    def test_ranked_by_bid_count(self):
+        self.assertEqual(_ids(self.index.top(10, now=self.now)), [10, 11, 12])
+        self.assertEqual(_ids(self.index.top(2, exclude=[10], now=self.now)), [11, 12])
+
+    def test_closed_auctions_drop_out(self):
+        closed = self.index.copy()
+        closed.apply({"user_id": [], "item_id": [], "rating": [], "ended_items": np.array([10, 12])})
+
+        self.assertEqual(_ids(closed.top(10, now=self.now)), [11])
+        # The index being served is not modified
+        self.assertEqual(_ids(self.index.top(10, now=self.now)), [10, 11, 12])
+
+    def test_closed_auction_in_the_same_batch_as_bids(self):
+        self.index.apply({
+            "user_id": np.array([4, 5]),
+            "item_id": np.array([12, 13]),
+            "rating": np.ones(2),
+            "timestamp": np.full(2, self.now),
+            "ended_items": np.array([12]),
+        })
+
+        self.assertNotIn(12, _ids(self.index.top(10, now=self.now)))
+        self.assertIn(13, _ids(self.index.top(10, now=self.now)))
+
+
+class TrendingFallbackTests(unittest.TestCase):
+    def setUp(self):
+        now = time.time()
+        algorithms.rebuild_models({
+            "user_id": np.array([1, 2, 3, 1, 2]),
+            "item_id": np.array([10, 10, 10, 11, 11]),
+            "rating": np.ones(5),
+            "timestamp": np.full(5, now),
+        }, version=(5, 11), wait=True)
+
+    def test_closed_auction_is_no_longer_recommended_to_new_users(self):
+        self.assertEqual(_ids(algorithms.get_recommendations_for_user(999, 10)), [10, 11])
+
+        algorithms.sync_interactions(
+            (5, 11), {"user_id": [], "item_id": [], "rating": [], "ended_items": np.array([10])}, (5, 11, 0), wait=True
+        )
+
+        self.assertEqual(_ids(algorithms.get_recommendations_for_user(999, 10)), [11])
+
+
+if __name__ == "__main__":
+    unittest.main()